@@ -0,0 +1,36 @@
+"""Compares the memory held by a parsed program as ast objects and as an AstArena.
+
+    poetry run python benchmarks/ast_memory_benchmark.py [statements]
+"""
+import sys
+import tracemalloc
+
+from compiler.compact_parser import CompactParser
+from compiler.objects.ast_arena import AstArena
+from compiler.parser import Parser
+from compiler.tokenizer import Tokenizer
+from programs import generate_source
+
+
+def retained(parse, buffer) -> tuple[object, int, int]:
+    """Returns the result of `parse(buffer)`, the memory it retains and the peak while parsing."""
+    tracemalloc.start()
+    result = parse(buffer)
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, current, peak
+
+
+def main() -> None:
+    statements = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    buffer = Tokenizer.tokenize_compact(generate_source(statements))
+    tree, tree_bytes, tree_peak = retained(Parser.parse, buffer)
+    arena, arena_bytes, arena_peak = retained(CompactParser.parse, buffer)
+    assert isinstance(arena, AstArena)
+    nodes = len(arena)
+    print(f"{'objects':>8}: {nodes} nodes, {tree_bytes / nodes:.0f} bytes/node, peak {tree_peak / 1e6:.1f} MB")
+    print(f"{'arena':>8}: {nodes} nodes, {arena_bytes / nodes:.0f} bytes/node, peak {arena_peak / 1e6:.1f} MB")
+
+
+if __name__ == "__main__":
+    main()
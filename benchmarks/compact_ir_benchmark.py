@@ -0,0 +1,68 @@
+"""Compares building and scanning IR with 10^6 temporaries as instruction objects and
+as a CompactIR. Both are built by hand: generate_ir only emits instruction objects, so
+this measures the storage formats, not the compiler.
+
+    poetry run python benchmarks/compact_ir_benchmark.py [temporaries]
+"""
+import sys
+import time
+import tracemalloc
+
+from compiler.assembly_generator import get_all_ir_variables
+from compiler.objects.compact_ir import CompactIR
+from compiler.objects.ir_variables import IRVar
+from compiler.objects.node_types import Int
+from compiler.objects.source_location import Source_location
+import compiler.objects.ir_instructions as ir
+
+
+def build_objects(temporaries: int) -> tuple[list[ir.Instruction], dict[IRVar, object]]:
+    """Emits `x1 = 1; x2 = x1 + x1; x3 = x2 + x2...` the way generate_ir does."""
+    loc = Source_location("bench", 1, 1)
+    plus = IRVar("+")
+    var_types: dict[IRVar, object] = {plus: None}
+    var = IRVar("x1")
+    var_types[var] = Int
+    ins: list[ir.Instruction] = [ir.LoadIntConst(loc, 1, var)]
+    for number in range(2, temporaries + 1):
+        dest = IRVar("x" + str(number))
+        var_types[dest] = Int
+        ins.append(ir.Call(loc, plus, [var, var], dest))
+        var = dest
+    return ins, var_types
+
+
+def build_compact(temporaries: int) -> CompactIR:
+    loc = Source_location("bench", 1, 1)
+    compact = CompactIR()
+    plus = compact.var("+")
+    var = compact.new_var(Int)
+    compact.load_int_const(loc, 1, var)
+    for _ in range(2, temporaries + 1):
+        dest = compact.new_var(Int)
+        compact.call(loc, plus, (var, var), dest)
+        var = dest
+    return compact
+
+
+def measure(name: str, build, scan, temporaries: int) -> None:
+    tracemalloc.start()
+    start = time.perf_counter()
+    built = build(temporaries)
+    built_time = time.perf_counter() - start
+    retained, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    start = time.perf_counter()
+    scan(built)
+    scan_time = time.perf_counter() - start
+    print(f"{name:>8}: build {built_time:.2f} s, {retained / 1e6:.0f} MB, variable scan {scan_time:.2f} s")
+
+
+def main() -> None:
+    temporaries = int(sys.argv[1]) if len(sys.argv) > 1 else 10**6
+    measure("objects", build_objects, lambda built: get_all_ir_variables(built[0]), temporaries)
+    measure("compact", build_compact, lambda built: built.variables(), temporaries)
+
+
+if __name__ == "__main__":
+    main()
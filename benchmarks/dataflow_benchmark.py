@@ -0,0 +1,42 @@
+"""Measures building the control-flow graph, finding dominators and solving liveness
+and reaching definitions on the IR of a large generated program.
+
+    poetry run python benchmarks/dataflow_benchmark.py [statements]
+"""
+import sys
+import time
+
+from compiler.assets.builtins import rt_types
+from compiler.cfg import build_cfg
+from compiler.dataflow import liveness, reaching_definitions
+from compiler.ir_generator import generate_ir
+from compiler.parser import Parser
+from compiler.tokenizer import Tokenizer
+from compiler.typechecker import typechecker
+from programs import generate_source
+
+
+def timed(name: str, count: int, run):
+    start = time.perf_counter()
+    result = run()
+    elapsed = time.perf_counter() - start
+    print(f"{name:>20}: {elapsed * 1000:.0f} ms, {count / elapsed / 1e6:.2f} M instructions/s")
+    return result
+
+
+def main() -> None:
+    statements = int(sys.argv[1]) if len(sys.argv) > 1 else 6000
+    tree = Parser.parse(Tokenizer.tokenize(generate_source(statements)))
+    typechecker(tree)
+    instructions = generate_ir(rt_types, tree)
+    count = len(instructions)
+    print(f"{count} instructions")
+    cfg = timed("cfg", count, lambda: build_cfg(instructions))
+    print(f"{len(cfg.blocks)} blocks")
+    timed("dominators", count, cfg.dominators)
+    timed("liveness", count, lambda: liveness(cfg))
+    timed("reaching definitions", count, lambda: reaching_definitions(cfg))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,40 @@
+"""Compares typechecking and IR generation as two passes and as the fused pass.
+
+    poetry run python benchmarks/fused_pass_benchmark.py [statements]
+"""
+import sys
+import time
+
+from compiler.assets.builtins import rt_types
+from compiler.fused_pass import typecheck_and_generate_ir
+from compiler.ir_generator import generate_ir
+from compiler.parser import Parser
+from compiler.tokenizer import Tokenizer
+from compiler.typechecker import typechecker
+from programs import generate_source
+
+
+def two_pass(tree) -> None:
+    typechecker(tree)
+    generate_ir(rt_types, tree)
+
+
+def fused(tree) -> None:
+    typecheck_and_generate_ir(rt_types, tree)
+
+
+def main() -> None:
+    statements = int(sys.argv[1]) if len(sys.argv) > 1 else 3000
+    tokens = Tokenizer.tokenize(generate_source(statements))
+    for name, run in [("two-pass", two_pass), ("fused", fused)]:
+        best = float("inf")
+        for _ in range(5):
+            tree = Parser.parse(tokens)
+            start = time.perf_counter()
+            run(tree)
+            best = min(best, time.perf_counter() - start)
+        print(f"{name:>8}: {statements} statements, {best * 1000:.0f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,41 @@
+"""Compares typechecking a large program again after a one-statement edit, from scratch
+and with the IncrementalTypechecker, both on the tree from the IncrementalParser.
+
+    poetry run python benchmarks/incremental_typechecker_benchmark.py [statements]
+"""
+import sys
+import time
+
+from compiler.incremental_parser import IncrementalParser
+from compiler.incremental_typechecker import IncrementalTypechecker
+from compiler.tokenizer import Tokenizer
+from compiler.typechecker import typechecker
+from programs import generate_source
+
+
+def main() -> None:
+    statements = int(sys.argv[1]) if len(sys.argv) > 1 else 3000
+    source = generate_source(statements)
+    parser = IncrementalParser()
+    checker = IncrementalTypechecker()
+    buffer = Tokenizer.tokenize_compact(source)
+    checker.check(parser.parse(buffer))
+    offset = source.index("var v0: Int = ") + len("var v0: Int = ")
+    runs = [
+        ("full", typechecker),
+        ("incremental", checker.check),
+        ("types only", lambda tree: checker.check(tree, bind=False)),
+    ]
+    for name, check in runs:
+        best = float("inf")
+        for edit in range(3):
+            buffer = Tokenizer.relex(buffer, offset, 0, f"{edit} + ")
+            tree = parser.parse(buffer)
+            start = time.perf_counter()
+            check(tree)
+            best = min(best, time.perf_counter() - start)
+        print(f"{name:>12}: {statements} statements, {best * 1000:.0f} ms")
+
+
+if __name__ == "__main__":
+    main()
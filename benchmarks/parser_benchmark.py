@@ -0,0 +1,27 @@
+"""Measures parser throughput in tokens per second on expression-heavy input.
+
+    poetry run python benchmarks/parser_benchmark.py [statements]
+"""
+import sys
+import time
+
+from compiler.parser import Parser
+from compiler.stack_parser import StackParser
+from compiler.tokenizer import Tokenizer
+from programs import generate_expressions
+
+
+def main() -> None:
+    statements = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    tokens = Tokenizer.tokenize(generate_expressions(statements))
+    for parser in [Parser, StackParser]:
+        best = float("inf")
+        for _ in range(3):
+            start = time.perf_counter()
+            parser.parse(tokens)
+            best = min(best, time.perf_counter() - start)
+        print(f"{parser.__name__:>12}: {len(tokens)} tokens, {len(tokens) / best / 1e6:.3f} M tokens/s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,40 @@
+"""Generators for large synthetic source programs used by the benchmarks."""
+import random
+
+
+def statement(rng: random.Random, index: int) -> str:
+    """Returns one top-level statement that exercises most of the lexical grammar."""
+    name = f"v{index}"
+    a = rng.randint(0, 1000)
+    b = rng.randint(1, 1000)
+    return (
+        f"var {name}: Int = {a} * ({b} + {index}) - {a} % {b};\n"
+        f"if {name} >= {b} and not ({name} == {a}) then {{\n"
+        f"    {name} = {name} / 2; // halve it\n"
+        f"}} else {{ print_int({name}); }}\n"
+        f"/* counter\n   loop */ while {name} > 0 do {name} = {name} - {b};\n"
+    )
+
+
+def generate_source(statements: int, seed: int = 0) -> str:
+    """Returns a program of roughly 140 bytes per statement."""
+    rng = random.Random(seed)
+    return "".join(statement(rng, i) for i in range(statements))
+
+
+def expression(rng: random.Random, depth: int) -> str:
+    """Returns a random arithmetic/boolean expression over literals and a few variables."""
+    if depth == 0 or rng.random() < 0.2:
+        return rng.choice(["a", "b", "c", str(rng.randint(0, 99))])
+    op = rng.choice(["+", "-", "*", "/", "%", "<", "<=", "==", "!=", "and", "or"])
+    left = expression(rng, depth - 1)
+    right = expression(rng, depth - 1)
+    if rng.random() < 0.3:
+        return f"({left} {op} {right})"
+    return f"{left} {op} {right}"
+
+
+def generate_expressions(statements: int, depth: int = 5, seed: int = 0) -> str:
+    """Returns a program of assignments with large operator expressions on their right side."""
+    rng = random.Random(seed)
+    return "".join(f"a = {expression(rng, depth)};\n" for _ in range(statements))
@@ -0,0 +1,129 @@
+"""Measures tokenizer throughput in tokens per second.
+
+The tokenizer that tried every regex in turn at each position is kept below as
+`legacy_tokenize`, so the numbers before and after the single-pass rewrite can be
+compared on the same input. The memory column is what the result keeps alive:
+
+    poetry run python benchmarks/tokenizer_benchmark.py [statements]
+"""
+import re
+import sys
+import time
+import tracemalloc
+from typing import Any, Callable, Sized
+
+from compiler.objects.source_location import Source_location
+from compiler.objects.token import Token
+from compiler.tokenizer import Tokenizer
+from programs import generate_source
+
+identifier_keyword_re = re.compile(r"([a-z]|[A-Z]|_)([a-z]|[A-Z]|_|[0-9])*")
+integer_literal_re = re.compile(r"([1-9][0-9]*|[0-9])")
+whitespace_re = re.compile(r"[ \t\r\f\v]+")
+newline_re = re.compile(r"\n")
+operators_re = re.compile(r"(==|!=|<=|>=|=>|<|>|\+|-|\*|/|=|%|not)")
+punctuation_re = re.compile(r"(\(|\)|{|}|,|;|:)")
+oneline_comment_re = re.compile(r"(//|#).+($|\n)")
+multiline_comment_re = re.compile(r"/[*](\s|.)+?[*]/")
+
+
+def legacy_tokenize(source_code: str, file_name: str = "tester") -> list[Token]:
+    tokens = []
+    line = 1
+    indx = 0
+    column = 1
+    regexes = [(identifier_keyword_re, "identifier"), (integer_literal_re, "int_literal"), (operators_re, "operator"), (punctuation_re, "punctuation")]
+
+    def regex_matcher() -> bool:
+        nonlocal indx
+        nonlocal column
+        for regex in regexes:
+            match = regex[0].match(source_code, indx)
+            if match:
+                source = Source_location(file_name, line, column)
+                tokens.append(Token(source, regex[1], match.group()))  # type: ignore[arg-type]
+                indx = match.end()
+                column += len(match.group())
+                return True
+        return False
+
+    def line_matcher() -> bool:
+        nonlocal indx
+        nonlocal column
+        nonlocal line
+        line_regexes = [newline_re, oneline_comment_re]
+        for regex in line_regexes:
+            match = regex.match(source_code, indx)
+            if match:
+                column = 1
+                line += 1
+                indx = match.end()
+                return True
+        return False
+
+    while indx < len(source_code):
+        whites = whitespace_re.match(source_code, indx)
+        if whites:
+            indx = whites.end()
+            column += len(whites.group())
+            continue
+        if line_matcher():
+            continue
+        multiline = multiline_comment_re.match(source_code, indx)
+        if multiline:
+            line += len(newline_re.findall(source_code, indx, multiline.end()))
+            indx = multiline.end()
+            column = 0
+            continue
+        if regex_matcher():
+            continue
+        indx += 1
+        column += 1
+    tokens.append(Token(Source_location(file_name, line + 1, 0), "end", "ending"))
+    return tokens
+
+
+def measure(tokenize: Callable[[str], Sized], source: str, repeats: int = 3) -> tuple[int, float]:
+    """Returns the token count and the best tokens/second over `repeats` runs."""
+    best = float("inf")
+    count = 0
+    for _ in range(repeats):
+        start = time.perf_counter()
+        count = len(tokenize(source))
+        best = min(best, time.perf_counter() - start)
+    return count, count / best
+
+
+def retained_memory(tokenize: Callable[[str], Any], source: str) -> int:
+    """Returns the bytes still allocated for the tokenizer's result."""
+    tracemalloc.start()
+    result = tokenize(source)
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del result
+    return size
+
+
+def main() -> None:
+    statements = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    source = generate_source(statements)
+    print(f"source: {len(source) / 1e6:.1f} MB, {statements} statements")
+    tokenizers: list[tuple[str, Callable[[str], Sized]]] = [
+        ("before (legacy)", legacy_tokenize),
+        ("after (single pass)", Tokenizer.tokenize),
+        ("compact buffer", Tokenizer.tokenize_compact),
+    ]
+    for name, tokenize in tokenizers:
+        count, rate = measure(tokenize, source)
+        memory = retained_memory(tokenize, source)
+        print(f"{name:>20}: {count} tokens, {rate / 1e6:.2f} M tokens/s, {memory / 1e6:.1f} MB")
+
+    buffer = Tokenizer.tokenize_compact(source)
+    offset = len(source) // 2
+    start = time.perf_counter()
+    Tokenizer.relex(buffer, offset, 1, "x + 1")
+    print(f"{'relex one edit':>20}: {(time.perf_counter() - start) * 1e3:.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,18 +1,23 @@
 from base64 import b64encode
 import json
+import mmap
 import re
 import sys
 from socketserver import ForkingTCPServer, StreamRequestHandler
 from traceback import format_exception
-from typing import Any
+from typing import Any, Iterable
 from compiler.tokenizer import Tokenizer
 from compiler.parser import Parser
 from compiler.typechecker import typechecker
 from compiler.ir_generator import generate_ir
+from compiler.fused_pass import typecheck_and_generate_ir
+from compiler.optimizations import optimize
 from compiler.assembly_generator import generate_assembly
 from compiler.objects.node_types import Type, BasicType, Bool, Int, Unit, FunType
 import compiler.objects.ir_variables as ir
 from compiler.assembler import assemble_and_get_executable
+from compiler.assets.builtins import rt_types
+from compiler.objects.token import TokenLike
 
 
 def call_compiler(source_code: str, input_file_name: str) -> bytes:
@@ -23,18 +28,33 @@ def call_compiler(source_code: str, input_file_name: str) -> bytes:
     # The input file name is informational only: you can optionally include in your source locations and error messages,
     # or you can ignore it.
     # *** TODO ***
-    tok = Tokenizer()
-    par = Parser()
-    print(tok.tokenize(source_code, input_file_name))
-    inp = par.parse(tok.tokenize(source_code, input_file_name))
-    typechecker(inp)
-    rt_types = {ir.IRVar("+"): FunType([Int, Int], Int), ir.IRVar("*"): FunType([Int, Int], Int), ir.IRVar("print_int"): FunType([Int], Unit), ir.IRVar("print_bool"): FunType([Bool], Unit), ir.IRVar("read_int"): FunType([], Int), ir.IRVar("unary_not"): FunType([Bool], Bool), ir.IRVar("unary_-"): FunType([Int], Int), ir.IRVar("<"): FunType([Int, Int], Bool), ir.IRVar(">"): FunType([Int, Int], Bool), ir.IRVar("<="): FunType([Int, Int], Bool), ir.IRVar(">="): FunType([Int, Int], Bool), ir.IRVar("-"): FunType([Int, Int], Int), ir.IRVar("/"): FunType([Int, Int], Int), ir.IRVar("%"): FunType([Int, Int], Int), ir.IRVar("=="): FunType([BasicType, BasicType], Bool), ir.IRVar("!="): FunType([BasicType, BasicType], Bool)}
-    all_ir = generate_ir(rt_types, inp)
-    assembly = generate_assembly(all_ir)
+    return compile_tokens(Tokenizer.tokenize_compact(source_code, input_file_name))
+
+
+def compile_tokens(tokens: Iterable[TokenLike], fused: bool = True, optimized: bool = False, unroll_factor: int = 4) -> bytes:
+    """Runs the compiler from the parser onwards; `tokens` may be a lazy stream."""
+    assembly = compile_to_assembly(tokens, fused, optimized, unroll_factor)
     print(assembly)
     return assemble_and_get_executable(assembly)
 
 
+def compile_to_assembly(tokens: Iterable[TokenLike], fused: bool = True, optimized: bool = False, unroll_factor: int = 4) -> str:
+    """With `fused` False the typechecker and the IR generator are run as separate
+    passes, which is slower but easier to debug. With `optimized` True the IR goes
+    through the optimizer, which takes longer than the rest of the compiler, before
+    it is assembled. `unroll_factor` is how many copies of a loop body the optimizer
+    runs per test; 1 turns loop unrolling off."""
+    inp = Parser.parse(tokens)
+    if fused:
+        all_ir = typecheck_and_generate_ir(rt_types, inp)
+    else:
+        typechecker(inp)
+        all_ir = generate_ir(rt_types, inp)
+    if optimized:
+        all_ir = optimize(all_ir, unroll_factor)
+    return generate_assembly(all_ir)
+
+
 
 def main() -> int:
     # === Option parsing ===
@@ -43,6 +63,9 @@ def main() -> int:
     output_file: str | None = None
     host = "127.0.0.1"
     port = 3000
+    fused = True
+    optimized = False
+    unroll_factor = 4
     for arg in sys.argv[1:]:
         if (m := re.fullmatch(r'--output=(.+)', arg)) is not None:
             output_file = m[1]
@@ -50,6 +73,12 @@ def main() -> int:
             host = m[1]
         elif (m := re.fullmatch(r'--port=(.+)', arg)) is not None:
             port = int(m[1])
+        elif arg == '--two-pass':
+            fused = False
+        elif arg == '--optimize':
+            optimized = True
+        elif (m := re.fullmatch(r'--unroll=([1-9][0-9]*)', arg)) is not None:
+            unroll_factor = int(m[1])
         elif arg.startswith('-'):
             raise Exception(f"Unknown argument: {arg}")
         elif command is None:
@@ -63,20 +92,25 @@ def main() -> int:
         print(f"Error: command argument missing", file=sys.stderr)
         return 1
 
-    def read_source_code() -> str:
-        if input_file is not None:
-            with open(input_file) as f:
-                return f.read()
-        else:
-            return sys.stdin.read()
+    def compile_source_code() -> bytes:
+        # The source is tokenized lazily while parsing instead of being read into memory first.
+        if input_file is None:
+            return compile_tokens(Tokenizer.stream(sys.stdin, '(source code)'), fused, optimized, unroll_factor)
+        with open(input_file, 'rb') as f:
+            try:
+                source = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            except ValueError:
+                # Empty files cannot be mapped.
+                return compile_tokens(Tokenizer.stream(f, input_file), fused, optimized, unroll_factor)
+            with source:
+                return compile_tokens(Tokenizer.stream(source, input_file), fused, optimized, unroll_factor)
 
     # === Command implementations ===
 
     if command == 'compile':
-        source_code = read_source_code()
         if output_file is None:
             raise Exception("Output file flag --output=... required")
-        executable = call_compiler(source_code, input_file or '(source code)')
+        executable = compile_source_code()
         with open(output_file, 'wb') as f:
             f.write(executable)
     elif command == 'serve':
@@ -1,40 +1,43 @@
 import compiler.objects.ir_variables as ir
 import compiler.objects.ir_instructions as iri
-import dataclasses
 from compiler.objects.locals import Locals
 from compiler.tokenizer import Tokenizer
 from compiler.parser import Parser
 from compiler.typechecker import typechecker
 from compiler.ir_generator import generate_ir
-from compiler.objects.node_types import Type, BasicType, Bool, Int, Unit, FunType
+from compiler.objects.node_types import Type, AnyBasic, Bool, Int, Unit, FunType
 from compiler.assets.intrinsics import all_intrinsics, IntrinsicArgs
 
 
 def get_all_ir_variables(instructions: list[iri.Instruction]) -> list[ir.IRVar]:
-    operators = ["==", "!=", "<=", ">=", "=>", "<", ">", "+", "-", "*", "/", "=", "%", "unary_not", "unary_-"]
     built_in = ["print_int", "print_bool", "read_int"]
     result_list: list[ir.IRVar] = []
     result_set: set[ir.IRVar] = set()
 
     def add(v: ir.IRVar) -> None:
-        if v not in result_set and v.name not in operators and v.name not in built_in:
+        if v not in result_set and v.name not in all_intrinsics and v.name not in built_in:
             result_list.append(v)
             result_set.add(v)
 
+    # The variables are added in field order, as they appear in the printed instructions.
     for insn in instructions:
-        for field in dataclasses.fields(insn):
-            value = getattr(insn, field.name)
-            if isinstance(value, ir.IRVar):
-                add(value)
-            elif isinstance(value, list):
-                for v in value:
-                    if isinstance(v, ir.IRVar):
-                        add(v)
+        match insn:
+            case iri.LoadIntConst() | iri.LoadBoolConst():
+                add(insn.dest)
+            case iri.Copy():
+                add(insn.source)
+                add(insn.dest)
+            case iri.Call():
+                add(insn.fun)
+                for v in insn.args:
+                    add(v)
+                add(insn.dest)
+            case iri.CondJump():
+                add(insn.cond)
     return result_list
 
 def generate_assembly(instructions: list[iri.Instruction]) -> str:
     lines = []
-    operators = ["==", "!=", "<=", ">=", "=>", "<", ">", "+", "-", "*", "/", "=", "%", "unary_not", "unary_-"]
     def emit(line: str) -> None: lines.append(line)
 
     locals = Locals(
@@ -55,7 +58,7 @@ def generate_assembly(instructions: list[iri.Instruction]) -> str:
     for dec in initial_declarations:
         emit(dec)
 
-    for insn in instructions:
+    for index, insn in enumerate(instructions):
         emit('# ' + str(insn))
         match insn:
             case iri.Label():
@@ -76,7 +79,10 @@ def generate_assembly(instructions: list[iri.Instruction]) -> str:
                     emit(f'movabsq ${insn.value}, %rax')
                     emit(f'movq %rax, {locals.get_ref(insn.dest)}')
             case iri.Jump():
-                emit(f'jmp .L{insn.label.name}')
+                # There is no need to jump to the label right after the jump.
+                following = instructions[index + 1] if index + 1 < len(instructions) else None
+                if not isinstance(following, iri.Label) or following.name != insn.label.name:
+                    emit(f'jmp .L{insn.label.name}')
 
             case iri.LoadBoolConst():
                 if insn.value == "true":
@@ -91,11 +97,17 @@ def generate_assembly(instructions: list[iri.Instruction]) -> str:
 
             case iri.CondJump():
                 emit(f"cmpq $0, {locals.get_ref(insn.cond)}")
-                emit(f"jne .L{insn.then_label.name}")
-                emit(f"jmp .L{insn.else_label.name}")
+                following = instructions[index + 1] if index + 1 < len(instructions) else None
+                next_label = following.name if isinstance(following, iri.Label) else None
+                if next_label == insn.then_label.name:
+                    emit(f"je .L{insn.else_label.name}")
+                else:
+                    emit(f"jne .L{insn.then_label.name}")
+                    if next_label != insn.else_label.name:
+                        emit(f"jmp .L{insn.else_label.name}")
 
             case iri.Call():
-                if insn.fun.name in operators:
+                if insn.fun.name in all_intrinsics:
                     args = list(map(locals.get_ref, insn.args))
                     all_intrinsics[insn.fun.name](IntrinsicArgs(args, f"%rax", emit))
                     emit(f"movq %rax, {locals.get_ref(insn.dest)}")
@@ -119,6 +131,9 @@ def generate_assembly(instructions: list[iri.Instruction]) -> str:
                         emit(f"addq ${8*pushed}, %rsp")
                     if correction:
                         emit(f"addq $8, %rsp")
+
+            case iri.Phi():
+                raise Exception(f"{insn.location}: {insn} must be lowered out of SSA form first")
                 
                 
         
@@ -134,6 +149,6 @@ if __name__ == "__main__":
     par = Parser()
     inp = par.parse(tok.tokenize("print_int(2)"))
     typechecker(inp)
-    rt_types = {ir.IRVar("+"): FunType([Int, Int], Int), ir.IRVar("*"): FunType([Int, Int], Int), ir.IRVar("print_int"): FunType([Int], Unit), ir.IRVar("print_bool"): FunType([Bool], Unit), ir.IRVar("unary_not"): FunType([Bool], Bool), ir.IRVar("unary_-"): FunType([Int], Int), ir.IRVar("<"): FunType([Int, Int], Bool), ir.IRVar(">"): FunType([Int, Int], Bool), ir.IRVar("<="): FunType([Int, Int], Bool), ir.IRVar(">="): FunType([Int, Int], Bool), ir.IRVar("-"): FunType([Int, Int], Int), ir.IRVar("/"): FunType([Int, Int], Int), ir.IRVar("%"): FunType([Int, Int], Int), ir.IRVar("=="): FunType([BasicType, BasicType], Bool), ir.IRVar("!="): FunType([BasicType, BasicType], Bool)}
+    rt_types = {ir.IRVar("+"): FunType([Int, Int], Int), ir.IRVar("*"): FunType([Int, Int], Int), ir.IRVar("print_int"): FunType([Int], Unit), ir.IRVar("print_bool"): FunType([Bool], Unit), ir.IRVar("unary_not"): FunType([Bool], Bool), ir.IRVar("unary_-"): FunType([Int], Int), ir.IRVar("<"): FunType([Int, Int], Bool), ir.IRVar(">"): FunType([Int, Int], Bool), ir.IRVar("<="): FunType([Int, Int], Bool), ir.IRVar(">="): FunType([Int, Int], Bool), ir.IRVar("-"): FunType([Int, Int], Int), ir.IRVar("/"): FunType([Int, Int], Int), ir.IRVar("%"): FunType([Int, Int], Int), ir.IRVar("=="): FunType([AnyBasic, AnyBasic], Bool), ir.IRVar("!="): FunType([AnyBasic, AnyBasic], Bool)}
     all_ir = generate_ir(rt_types, inp)
     print(generate_assembly(all_ir))
\ No newline at end of file
@@ -0,0 +1,34 @@
+from types import MappingProxyType
+from typing import Mapping
+from compiler.objects.ir_variables import IRVar
+from compiler.objects.node_types import AnyBasic, Bool, FunType, Int, Type, Unit
+from compiler.objects.sym_table import SymTab
+
+# The environments every compilation starts from. They are built once, are read-only and
+# are shared by all compilations in the process; a compilation keeps its own names in an
+# overlay scope on top of them, so nothing it declares outlives it.
+
+builtin_types = SymTab(MappingProxyType({
+    "print_int": FunType([Int], Unit),
+    "print_bool": FunType([Bool], Unit),
+    "read_int": FunType([], Int),
+}))
+
+rt_types: Mapping[IRVar, Type] = MappingProxyType({
+    IRVar("+"): FunType([Int, Int], Int),
+    IRVar("*"): FunType([Int, Int], Int),
+    IRVar("print_int"): FunType([Int], Unit),
+    IRVar("print_bool"): FunType([Bool], Unit),
+    IRVar("read_int"): FunType([], Int),
+    IRVar("unary_not"): FunType([Bool], Bool),
+    IRVar("unary_-"): FunType([Int], Int),
+    IRVar("<"): FunType([Int, Int], Bool),
+    IRVar(">"): FunType([Int, Int], Bool),
+    IRVar("<="): FunType([Int, Int], Bool),
+    IRVar(">="): FunType([Int, Int], Bool),
+    IRVar("-"): FunType([Int, Int], Int),
+    IRVar("/"): FunType([Int, Int], Int),
+    IRVar("%"): FunType([Int, Int], Int),
+    IRVar("=="): FunType([AnyBasic, AnyBasic], Bool),
+    IRVar("!="): FunType([AnyBasic, AnyBasic], Bool),
+})
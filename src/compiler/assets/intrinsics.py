@@ -75,6 +75,55 @@ def remainder(a: IntrinsicArgs) -> None:
         a.emit(f'movq %rdx, {a.result_register}')
 
 
+# The intrinsics below are never written in source code; the optimizer uses them in
+# place of multiplying, dividing and taking the remainder by 2^k, with k (in 1..62)
+# as the second argument.
+
+@_intrinsic("<<")
+def shift_left(a: IntrinsicArgs) -> None:
+    # The shift count of 'salq' must be in 'cl', the lowest byte of 'rcx'
+    a.emit(f'movq {a.arg_refs[1]}, %rcx')
+    if a.result_register != a.arg_refs[0]:
+        a.emit(f'movq {a.arg_refs[0]}, {a.result_register}')
+    a.emit(f'salq %cl, {a.result_register}')
+
+
+@_intrinsic("div_pow2")
+def divide_pow2(a: IntrinsicArgs) -> None:
+    # An arithmetic shift rounds towards minus infinity, so 2^k - 1 is first
+    # added to negative numbers to round towards zero like 'idivq'.
+    _pow2_bias(a)
+    a.emit(f'addq {a.arg_refs[0]}, %rdx')
+    a.emit('sarq %cl, %rdx')
+    a.emit(f'movq %rdx, {a.result_register}')
+
+
+@_intrinsic("mod_pow2")
+def remainder_pow2(a: IntrinsicArgs) -> None:
+    # The remainder keeps the sign of the dividend: with the same bias as
+    # division, it is ((x + bias) & (2^k - 1)) - bias.
+    _pow2_bias(a)
+    a.emit('movq %rax, %rcx')
+    a.emit('movq %rdx, %rax')
+    a.emit(f'addq {a.arg_refs[0]}, %rax')
+    a.emit('andq %rcx, %rax')
+    a.emit('subq %rdx, %rax')
+    if a.result_register != '%rax':
+        a.emit(f'movq %rax, {a.result_register}')
+
+
+def _pow2_bias(a: IntrinsicArgs) -> None:
+    # Leaves k in 'rcx', the mask 2^k - 1 in 'rax' and in 'rdx' the bias:
+    # the mask for a negative dividend, else 0.
+    a.emit(f'movq {a.arg_refs[1]}, %rcx')
+    a.emit('movq $1, %rax')
+    a.emit('salq %cl, %rax')
+    a.emit('subq $1, %rax')
+    a.emit(f'movq {a.arg_refs[0]}, %rdx')
+    a.emit('sarq $63, %rdx')
+    a.emit('andq %rax, %rdx')
+
+
 @_intrinsic("==")
 def eq(a: IntrinsicArgs) -> None:
     _int_comparison(a, 'sete')
@@ -0,0 +1,221 @@
+from dataclasses import dataclass, field
+from typing import Callable
+import compiler.objects.ir_instructions as ir
+
+NONE = -1
+
+
+@dataclass(eq=False)
+class BasicBlock:
+    """A run of instructions that is only entered at its first instruction and only
+    left after its last one. A block that starts at a label keeps the Label as its
+    first instruction, and a jump can only be its last one."""
+    index: int
+    instructions: list[ir.Instruction]
+    preds: list[int] = field(default_factory=list)
+    succs: list[int] = field(default_factory=list)
+
+    @property
+    def label(self) -> str | None:
+        first = self.instructions[0] if self.instructions else None
+        return first.name if isinstance(first, ir.Label) else None
+
+
+@dataclass(eq=False)
+class ControlFlowGraph:
+    """The basic blocks of an instruction list, in their original order. Block 0 is the
+    entry; a block without a jump at its end falls through to the next block."""
+    blocks: list[BasicBlock]
+
+    def instructions(self) -> list[ir.Instruction]:
+        """Returns the instructions of all the blocks as one list again."""
+        return [insn for block in self.blocks for insn in block.instructions]
+
+    def reverse_postorder(self) -> list[int]:
+        """Returns the blocks reachable from the entry, each before its successors
+        except along back edges. Successors are searched last one first, so the body of
+        a loop comes right after its header and before the code after the loop."""
+        if not self.blocks:
+            return []
+        order: list[int] = []
+        visited = bytearray(len(self.blocks))
+        visited[0] = 1
+        # Each entry is a block and the position of the next successor to look at.
+        stack: list[tuple[int, int]] = [(0, 0)]
+        while stack:
+            block, position = stack.pop()
+            succs = self.blocks[block].succs
+            if position < len(succs):
+                stack.append((block, position + 1))
+                succ = succs[len(succs) - 1 - position]
+                if not visited[succ]:
+                    visited[succ] = 1
+                    stack.append((succ, 0))
+            else:
+                order.append(block)
+        order.reverse()
+        return order
+
+    def dominators(self) -> list[int]:
+        """Returns the immediate dominator of every block: the entry's is itself, and
+        that of a block that cannot be reached is NONE.
+
+        Uses the iterative algorithm of Cooper, Harvey and Kennedy: idoms are refined
+        in reverse postorder by intersecting the dominator paths of the predecessors
+        until nothing changes."""
+        idom = [NONE] * len(self.blocks)
+        order = self.reverse_postorder()
+        if not order:
+            return idom
+        number = [NONE] * len(self.blocks)
+        for position, block in enumerate(order):
+            number[block] = position
+        idom[0] = 0
+        changed = True
+        while changed:
+            changed = False
+            for block in order[1:]:
+                new_idom = NONE
+                for pred in self.blocks[block].preds:
+                    if idom[pred] == NONE:
+                        continue
+                    if new_idom == NONE:
+                        new_idom = pred
+                        continue
+                    a, b = pred, new_idom
+                    while a != b:
+                        while number[a] > number[b]:
+                            a = idom[a]
+                        while number[b] > number[a]:
+                            b = idom[b]
+                    new_idom = a
+                if idom[block] != new_idom:
+                    idom[block] = new_idom
+                    changed = True
+        return idom
+
+
+    def dominance_frontiers(self, idom: list[int]) -> list[set[int]]:
+        """Returns, for every block, the blocks where its dominance ends: those it does
+        not strictly dominate but that have a predecessor it dominates."""
+        frontiers: list[set[int]] = [set() for _ in self.blocks]
+        for block in self.blocks:
+            if len(block.preds) < 2 or idom[block.index] == NONE:
+                continue
+            for pred in block.preds:
+                runner = pred
+                while runner != idom[block.index] and idom[runner] != NONE:
+                    frontiers[runner].add(block.index)
+                    runner = idom[runner]
+        return frontiers
+
+
+def dominator_tree(idom: list[int]) -> list[list[int]]:
+    """Returns the blocks each block immediately dominates."""
+    children: list[list[int]] = [[] for _ in idom]
+    for block, parent in enumerate(idom):
+        if parent != NONE and parent != block:
+            children[parent].append(block)
+    return children
+
+
+def dominance(idom: list[int]) -> Callable[[int, int], bool]:
+    """Returns a function telling if block `a` dominates block `b`, like dominates but
+    in constant time: the dominator tree is walked once up front, and `a` dominates
+    `b` when the walk enters and leaves `b` while inside `a`."""
+    children = dominator_tree(idom)
+    enter = [NONE] * len(idom)
+    leave = [NONE] * len(idom)
+    clock = 0
+    work = [(0, False)] if idom and idom[0] == 0 else []
+    while work:
+        block, done = work.pop()
+        clock += 1
+        if done:
+            leave[block] = clock
+            continue
+        enter[block] = clock
+        work.append((block, True))
+        work.extend((child, False) for child in children[block])
+
+    def check(a: int, b: int) -> bool:
+        return enter[b] != NONE and enter[a] <= enter[b] and leave[b] <= leave[a]
+    return check
+
+
+def dominates(idom: list[int], a: int, b: int) -> bool:
+    """Tells if block `a` dominates block `b`, given the immediate dominators."""
+    if idom[b] == NONE:
+        return False
+    while b != a:
+        if b == 0:
+            return False
+        b = idom[b]
+    return True
+
+
+@dataclass(eq=False)
+class Loop:
+    """A natural loop: the blocks that can reach one of its back edges without going
+    through its header, which dominates them all. `latches` are the blocks the back
+    edges come from."""
+    header: int
+    blocks: set[int]
+    latches: list[int]
+
+
+def find_loops(cfg: ControlFlowGraph, idom: list[int]) -> list[Loop]:
+    """Returns the natural loops of the graph, one per header, with the back edges to
+    the same header merged. Inner loops come before the loops containing them."""
+    loops: dict[int, Loop] = {}
+    is_dominator = dominance(idom)
+    for block in cfg.blocks:
+        if idom[block.index] == NONE:
+            continue
+        for succ in block.succs:
+            if not is_dominator(succ, block.index):
+                continue
+            loop = loops.setdefault(succ, Loop(succ, {succ}, []))
+            loop.latches.append(block.index)
+            work = [block.index]
+            while work:
+                member = work.pop()
+                if member not in loop.blocks:
+                    loop.blocks.add(member)
+                    work.extend(pred for pred in cfg.blocks[member].preds if idom[pred] != NONE)
+    return sorted(loops.values(), key=lambda loop: len(loop.blocks))
+
+
+def build_cfg(instructions: list[ir.Instruction]) -> ControlFlowGraph:
+    """Splits `instructions` into basic blocks and links them. A new block starts at
+    every label and after every jump."""
+    blocks: list[BasicBlock] = []
+    current: list[ir.Instruction] = []
+    for insn in instructions:
+        if isinstance(insn, ir.Label) and current:
+            blocks.append(BasicBlock(len(blocks), current))
+            current = []
+        current.append(insn)
+        if isinstance(insn, (ir.Jump, ir.CondJump)):
+            blocks.append(BasicBlock(len(blocks), current))
+            current = []
+    if current or not blocks:
+        blocks.append(BasicBlock(len(blocks), current))
+
+    by_label = {block.label: block.index for block in blocks if block.label is not None}
+
+    def link(source: BasicBlock, target: int) -> None:
+        if target not in source.succs:
+            source.succs.append(target)
+            blocks[target].preds.append(source.index)
+
+    for block in blocks:
+        last = block.instructions[-1] if block.instructions else None
+        if isinstance(last, ir.Jump):
+            link(block, by_label[last.label.name])
+        elif isinstance(last, ir.CondJump):
+            link(block, by_label[last.then_label.name])
+            link(block, by_label[last.else_label.name])
+        elif block.index + 1 < len(blocks):
+            link(block, block.index + 1)
+    return ControlFlowGraph(blocks)
@@ -0,0 +1,32 @@
+from compiler.parser import Parser
+from compiler.incremental_parser import IncrementalParser
+from compiler.objects.ast_arena import AstArena, NONE
+from compiler.objects.token_buffer import TokenBuffer
+import compiler.objects.ast as ast
+
+
+class CompactParser:
+    """Parses a TokenBuffer straight into an AstArena.
+
+    The top-level segments are parsed one at a time and each one is packed into the arena
+    as soon as it is parsed, so the object tree of only one segment is alive at a time."""
+
+    @staticmethod
+    def parse(buffer: TokenBuffer) -> AstArena:
+        arena = AstArena(buffer.file_name)
+        end = len(buffer) - 1
+        segments = IncrementalParser.segments(buffer)
+        if not segments:
+            arena.root = arena.add(Parser.parse(buffer))
+            return arena
+
+        expressions: list[int] = []
+        for first, separator in segments:
+            expressions += [arena.add(node) for node in IncrementalParser.parse_segment(buffer, first, separator)]
+
+        location = buffer.location(end - 1)
+        if buffer.text(end - 1) == ";":
+            arena.root = arena.add_node(ast.Block, location, [NONE] + expressions)
+        else:
+            arena.root = arena.add_node(ast.Block, location, expressions[-1:] + expressions[:-1])
+        return arena
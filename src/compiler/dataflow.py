@@ -0,0 +1,253 @@
+from heapq import heappop, heappush
+from dataclasses import dataclass
+from typing import Callable
+from compiler.cfg import ControlFlowGraph
+from compiler.objects.ir_variables import IRVar
+import compiler.objects.ir_instructions as ir
+
+# Sets are bit-vectors kept in Python ints: bit i stands for element i of the problem's
+# numbering, so union is |, intersection is & and removal is & ~.
+
+
+def used_vars(insn: ir.Instruction) -> list[IRVar]:
+    """Returns the variables `insn` reads. The function of a Call names a global
+    like print_int or +, which no instruction defines, so it is not counted. The
+    arguments of a Phi are counted as read at the start of its block, which makes
+    each one live on all the incoming edges rather than just its own."""
+    match insn:
+        case ir.Copy():
+            return [insn.source]
+        case ir.Call():
+            return insn.args
+        case ir.CondJump():
+            return [insn.cond]
+        case ir.Phi():
+            return insn.args
+    return []
+
+
+def defined_var(insn: ir.Instruction) -> IRVar | None:
+    """Returns the variable `insn` writes, if any."""
+    match insn:
+        case ir.LoadIntConst() | ir.LoadBoolConst() | ir.Copy() | ir.Call() | ir.Phi():
+            return insn.dest
+    return None
+
+
+def rewrite(insn: ir.Instruction, use: Callable[[IRVar], IRVar], dest: IRVar | None = None) -> ir.Instruction:
+    """Returns `insn` with every variable it reads replaced by `use(variable)`, and the
+    variable it writes by `dest` when given."""
+    match insn:
+        case ir.LoadIntConst():
+            return ir.LoadIntConst(insn.location, insn.value, dest or insn.dest)
+        case ir.LoadBoolConst():
+            return ir.LoadBoolConst(insn.location, insn.value, dest or insn.dest)
+        case ir.Copy():
+            return ir.Copy(insn.location, use(insn.source), dest or insn.dest)
+        case ir.Call():
+            return ir.Call(insn.location, insn.fun, [use(arg) for arg in insn.args], dest or insn.dest)
+        case ir.CondJump():
+            return ir.CondJump(insn.location, use(insn.cond), insn.then_label, insn.else_label)
+        case ir.Phi():
+            return ir.Phi(insn.location, [use(arg) for arg in insn.args], dest or insn.dest)
+    return insn
+
+
+@dataclass
+class DataflowResult:
+    # The set at the start and at the end of each block, in program order.
+    ins: list[int]
+    outs: list[int]
+
+
+def solve(
+    cfg: ControlFlowGraph,
+    gen: list[int],
+    kill: list[int],
+    forward: bool,
+    may: bool = True,
+    boundary: int = 0,
+    universe: int = 0
+) -> DataflowResult:
+    """Solves the dataflow equations `out = gen | (in & ~kill)` of every block with a
+    worklist, in the direction of the problem (for a backward problem, `out` is the set
+    at the start of the block and `in` the one at its end).
+
+    A `may` problem meets the sets of the neighbours by union and starts from empty
+    sets; a must problem meets by intersection and starts from `universe`. `boundary`
+    is the set entering the entry block, or leaving the exit blocks of a backward
+    problem. The worklist always hands out the queued block that comes first in reverse
+    postorder (postorder when backward), so a loop settles before the blocks after it
+    are revisited, and loop-free graphs settle in one sweep."""
+    count = len(cfg.blocks)
+    start = 0 if may else universe
+    before = [start] * count
+    after = [start] * count
+    if forward:
+        order = cfg.reverse_postorder()
+        sources = [block.preds for block in cfg.blocks]
+        targets = [block.succs for block in cfg.blocks]
+    else:
+        order = cfg.reverse_postorder()[::-1]
+        sources = [block.succs for block in cfg.blocks]
+        targets = [block.preds for block in cfg.blocks]
+    # The blocks where the boundary enters: the entry, or every block that leaves the graph.
+    edge = [False] * count
+    if forward:
+        if count:
+            edge[0] = True
+    else:
+        for b in cfg.blocks:
+            edge[b.index] = not b.succs
+
+    # The worklist holds positions in `order`.
+    position = [0] * count
+    for number, block in enumerate(order):
+        position[block] = number
+    worklist = list(range(len(order)))
+    queued = bytearray(count)
+    for block in order:
+        queued[block] = 1
+    while worklist:
+        block = order[heappop(worklist)]
+        queued[block] = 0
+        incoming = sources[block]
+        if incoming:
+            value = after[incoming[0]]
+            if may:
+                for other in incoming[1:]:
+                    value |= after[other]
+            else:
+                for other in incoming[1:]:
+                    value &= after[other]
+            if edge[block]:
+                value = value | boundary if may else value & boundary
+        else:
+            value = boundary
+        before[block] = value
+        result = gen[block] | (value & ~kill[block])
+        if result != after[block]:
+            after[block] = result
+            for target in targets[block]:
+                if not queued[target]:
+                    queued[target] = 1
+                    heappush(worklist, position[target])
+    if forward:
+        return DataflowResult(before, after)
+    return DataflowResult(after, before)
+
+
+def block_local_vars(cfg: ControlFlowGraph) -> set[IRVar]:
+    """Returns the variables that every block using them defines before the use. Most
+    temporaries are like this; leaving them out of the bit-vectors keeps the sets small,
+    as nothing about them flows between blocks."""
+    defined: set[IRVar] = set()
+    exposed: set[IRVar] = set()
+    for block in cfg.blocks:
+        local: set[IRVar] = set()
+        for insn in block.instructions:
+            for var in used_vars(insn):
+                if var not in local:
+                    exposed.add(var)
+            dest = defined_var(insn)
+            if dest is not None:
+                local.add(dest)
+                defined.add(dest)
+    return defined - exposed
+
+
+@dataclass
+class Liveness:
+    # The variables that can be live between blocks; bit i of a set is variables[i].
+    variables: list[IRVar]
+    numbers: dict[IRVar, int]
+    # The variables live at the start and at the end of each block.
+    live_in: list[int]
+    live_out: list[int]
+
+    def vars_in(self, bits: int) -> set[IRVar]:
+        return {self.variables[i] for i in range(bits.bit_length()) if bits >> i & 1}
+
+
+def liveness(cfg: ControlFlowGraph) -> Liveness:
+    """Finds the variables whose current value may still be read, at each block
+    boundary. Block-local variables are never live across a block boundary and have no
+    bits (see block_local_vars)."""
+    local = block_local_vars(cfg)
+    numbers: dict[IRVar, int] = {}
+    uses: list[int] = []
+    defs: list[int] = []
+    for block in cfg.blocks:
+        use = 0
+        define = 0
+        for insn in block.instructions:
+            for var in used_vars(insn):
+                if var in local:
+                    continue
+                number = numbers.setdefault(var, len(numbers))
+                if not define >> number & 1:
+                    use |= 1 << number
+            dest = defined_var(insn)
+            if dest is not None and dest not in local:
+                define |= 1 << numbers.setdefault(dest, len(numbers))
+        uses.append(use)
+        defs.append(define)
+    result = solve(cfg, uses, defs, forward=False)
+    return Liveness(list(numbers), numbers, result.ins, result.outs)
+
+
+@dataclass
+class ReachingDefinitions:
+    # The numbered definitions as (block, position in block); bit i of a set is definitions[i].
+    definitions: list[tuple[int, int]]
+    # The number of each definition.
+    numbers: dict[tuple[int, int], int]
+    # The definitions of each variable, as a set.
+    of_var: dict[IRVar, int]
+    # The definitions reaching the start and the end of each block.
+    reach_in: list[int]
+    reach_out: list[int]
+
+    def defs_in(self, bits: int) -> list[tuple[int, int]]:
+        return [self.definitions[i] for i in range(bits.bit_length()) if bits >> i & 1]
+
+    def reaches(self, bits: int, definition: tuple[int, int]) -> bool:
+        """Tells if a definition, as (block, position in block), is in a set. Definitions
+        of block-local variables are never in one."""
+        number = self.numbers.get(definition)
+        return number is not None and bits >> number & 1 == 1
+
+
+def reaching_definitions(cfg: ControlFlowGraph) -> ReachingDefinitions:
+    """Finds the definitions that may reach each block boundary without being
+    overwritten on the way. Definitions of block-local variables never leave their
+    block and are not numbered (see block_local_vars)."""
+    local = block_local_vars(cfg)
+    definitions: list[tuple[int, int]] = []
+    of_var: dict[IRVar, int] = {}
+    # The definitions in each block, by variable, and the last one of each variable.
+    block_defs: list[dict[IRVar, int]] = []
+    for block in cfg.blocks:
+        last: dict[IRVar, int] = {}
+        for position, insn in enumerate(block.instructions):
+            dest = defined_var(insn)
+            if dest is None or dest in local:
+                continue
+            number = len(definitions)
+            definitions.append((block.index, position))
+            of_var[dest] = of_var.get(dest, 0) | 1 << number
+            last[dest] = number
+        block_defs.append(last)
+    gen = []
+    kill = []
+    for last in block_defs:
+        generated = 0
+        killed = 0
+        for var, number in last.items():
+            generated |= 1 << number
+            killed |= of_var[var]
+        gen.append(generated)
+        kill.append(killed)
+    result = solve(cfg, gen, kill, forward=True)
+    numbers = {definition: number for number, definition in enumerate(definitions)}
+    return ReachingDefinitions(definitions, numbers, of_var, result.ins, result.outs)
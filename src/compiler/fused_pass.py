@@ -0,0 +1,320 @@
+from typing import Callable, Mapping
+from compiler.objects.ir_variables import IRVar
+from compiler.objects.source_location import Source_location
+from compiler.objects.node_types import Type, Bool, Int, Unit, FunType
+import compiler.objects.ir_instructions as ir
+import compiler.objects.ast as ast
+from compiler.objects.sym_table import SymTab
+from compiler.objects.ast_walker import Evaluator, evaluate, walk_preorder
+from compiler.name_resolver import resolve_names, GLOBAL
+from compiler.assets.builtins import builtin_types
+from compiler.typechecker import typechecker
+from compiler.ir_generator import generate_ir
+
+# The type and the IR variable of an expression.
+Typed = tuple[Type, IRVar]
+
+
+class TypeMismatch(Exception):
+    pass
+
+
+def typecheck_and_generate_ir(
+    root_types: Mapping[IRVar, Type],
+    node: ast.Expression,
+    top_level: SymTab | None = None
+) -> list[ir.Instruction]:
+    """Does the work of `typechecker` followed by `generate_ir` in one walk of the tree.
+
+    The types, annotations and instructions are the same as from the two passes. Each
+    node is typed right after its children, in the order generate_ir visits them, and
+    the body of a while loop is lowered without being typed, as the typechecker never
+    types it. Programs that fail are rerun through the two passes, so the error raised
+    is also exactly theirs."""
+    try:
+        return lower(root_types, node, top_level)
+    except Exception:
+        # The tree is put back the way the parser left it before rerunning.
+        for child in walk_preorder(node):
+            child.type = Unit
+        typechecker(node, top_level)
+        return generate_ir(root_types, node)
+
+
+def lower(root_types: Mapping[IRVar, Type], node: ast.Expression, top_level: SymTab | None) -> list[ir.Instruction]:
+    cur_var_num = 1
+    cur_lab_num = 1
+    var_types: dict[IRVar, Type] = dict(root_types)
+
+    var_unit = IRVar('unit')
+    var_types[var_unit] = Unit
+
+    top_level_vars = top_level if top_level is not None else builtin_types.overlay()
+    resolution = resolve_names(node)
+    local_types: dict[int, Type] = {}
+    local_vars: dict[int, IRVar] = {}
+
+    root_symtab = SymTab({})
+    for v in root_types.keys():
+        root_symtab.add_local(v.name, v)
+
+    # How many while loop bodies the node being lowered is in; they are not typed.
+    untyped_depth = 0
+
+    def new_var(t: Type) -> IRVar:
+        nonlocal cur_var_num
+        new_one = IRVar("x" + str(cur_var_num))
+        cur_var_num += 1
+        var_types[new_one] = t
+        return new_one
+
+    def new_label(loc: Source_location) -> ir.Label:
+        nonlocal cur_lab_num
+        new_one = ir.Label(loc, "L" + str(cur_lab_num))
+        cur_lab_num += 1
+        return new_one
+
+    def location(expr: ast.Expression) -> Source_location:
+        # Every node the parser makes for source text has a location; a node without one
+        # fails here and is lowered by the two passes instead.
+        if expr.loc is None:
+            raise TypeMismatch()
+        return expr.loc
+
+    ins: list[ir.Instruction] = []
+
+    def visit_leaf(expr: ast.Expression) -> Typed:
+        typed = untyped_depth == 0
+        match expr:
+            case ast.Literal():
+                if expr.value is None:
+                    # Only the empty result of a block, which is never typed.
+                    return expr.type, var_unit
+                loc = location(expr)
+                match expr.value:
+                    case bool():
+                        var = new_var(Bool)
+                        ins.append(ir.LoadBoolConst(loc, "true" if expr.value else "false", var))
+                        return (Int if typed else expr.type), var
+                    case int():
+                        var = new_var(Int)
+                        ins.append(ir.LoadIntConst(loc, expr.value, var))
+                        return (Int if typed else expr.type), var
+                raise TypeMismatch()
+
+            case ast.Identifier():
+                if expr.binding != GLOBAL:
+                    var = local_vars[expr.binding]
+                    if not typed:
+                        return expr.type, var
+                    return local_types[expr.binding], var
+                var = root_symtab.require(expr.name)
+                if not typed:
+                    return expr.type, var
+                global_type = top_level_vars.require(expr.name)
+                if global_type is None:
+                    raise TypeMismatch()
+                return global_type, var
+
+            case ast.Boolean_literal():
+                var = new_var(Bool)
+                ins.append(ir.LoadBoolConst(location(expr), expr.boolean, var))
+                return (Bool if typed else expr.type), var
+        raise TypeMismatch()
+
+    def visit(expr: ast.Expression) -> Evaluator[Typed]:
+        nonlocal untyped_depth
+        loc = location(expr)
+        typed = untyped_depth == 0
+
+        match expr:
+            case ast.BinaryOp():
+                if expr.op == "=":
+                    t2, var_val = yield expr.right
+                    t1, var_org = yield expr.left
+                    if typed and t1 != t2:
+                        raise TypeMismatch()
+                    ins.append(ir.Copy(loc, var_val, var_org))
+                    return (t2 if typed else expr.type), var_org
+                elif expr.op in ["and", "or"]:
+                    l_right = new_label(loc)
+                    l_skip = new_label(loc)
+                    l_end = new_label(loc)
+                    t1, var_left = yield expr.left
+                    var_result = new_var(Bool)
+                    if expr.op == "or":
+                        ins.append(ir.CondJump(loc, var_left, l_skip, l_right))
+                    else:
+                        ins.append(ir.CondJump(loc, var_left, l_right, l_skip))
+                    ins.append(l_right)
+                    t2, var_right = yield expr.right
+                    if typed and (t1 is not Bool or t2 is not Bool):
+                        raise TypeMismatch()
+                    ins.append(ir.Copy(loc, var_right, var_result))
+                    ins.append(ir.Jump(loc, l_end))
+                    ins.append(l_skip)
+                    ins.append(ir.LoadBoolConst(loc, "true" if expr.op == "or" else "false", var_result))
+                    ins.append(ir.Jump(loc, l_end))
+                    ins.append(l_end)
+                    return (Bool if typed else expr.type), var_result
+                var_op = root_symtab.require(expr.op)
+                t1, var_left = yield expr.left
+                t2, var_right = yield expr.right
+                if not typed:
+                    result = expr.type
+                elif expr.op in ["+", "-", "*", "/", "%", "<", ">", ">=", "<="]:
+                    if t1 is not Int or t2 is not Int:
+                        raise TypeMismatch()
+                    result = Int if expr.op in ["+", "-", "*", "/", "%"] else Bool
+                elif expr.op in ["==", "!="]:
+                    if t1 != t2:
+                        raise TypeMismatch()
+                    result = Bool
+                else:
+                    raise TypeMismatch()
+                var_result = new_var(result)
+                ins.append(ir.Call(loc, var_op, [var_left, var_right], var_result))
+                return result, var_result
+
+            case ast.IfExpression():
+                if expr.else_clause is None:
+                    l_then = new_label(loc)
+                    l_end = new_label(loc)
+                    t1, var_cond = yield expr.cond
+                    if typed and t1 is not Bool:
+                        raise TypeMismatch()
+                    ins.append(ir.CondJump(loc, var_cond, l_then, l_end))
+                    ins.append(l_then)
+                    yield expr.then_clause
+                    ins.append(l_end)
+                    return (Unit if typed else expr.type), var_unit
+                l_then = new_label(loc)
+                l_else = new_label(loc)
+                l_end = new_label(loc)
+                # The type of the then branch is only known once it is typed.
+                var_result = new_var(expr.then_clause.type)
+                t1, var_cond = yield expr.cond
+                if typed and t1 is not Bool:
+                    raise TypeMismatch()
+                ins.append(ir.CondJump(loc, var_cond, l_then, l_else))
+                ins.append(l_then)
+                t2, var_then = yield expr.then_clause
+                if typed:
+                    var_types[var_result] = t2
+                ins.append(ir.Copy(loc, var_then, var_result))
+                ins.append(ir.Jump(loc, l_end))
+                ins.append(l_else)
+                t3, var_else = yield expr.else_clause
+                if typed and t2 != t3:
+                    raise TypeMismatch()
+                ins.append(ir.Copy(loc, var_else, var_result))
+                ins.append(l_end)
+                return (t2 if typed else expr.type), var_result
+
+            case ast.Function():
+                if expr.name.binding != GLOBAL:
+                    var_function = local_vars[expr.name.binding]
+                else:
+                    var_function = root_symtab.require(expr.name.name)
+                if not var_function:
+                    raise TypeMismatch()
+                args = []
+                parameter_types = []
+                for arg in expr.arguments:
+                    parameter_type, var_arg = yield arg
+                    parameter_types.append(parameter_type)
+                    args.append(var_arg)
+                result = expr.type
+                if typed:
+                    res = local_types[expr.name.binding] if expr.name.binding != GLOBAL else top_level_vars.require(expr.name.name)
+                    expr.name.type = res
+                    if not isinstance(res, FunType):
+                        raise TypeMismatch()
+                    for i in range(len(res.parameter_types)):
+                        if parameter_types[i] != res.parameter_types[i]:
+                            raise TypeMismatch()
+                    result = res.result_type
+                function_type = root_types[var_function]
+                if not isinstance(function_type, FunType):
+                    raise TypeMismatch()
+                var_result = new_var(function_type.result_type)
+                ins.append(ir.Call(loc, var_function, args, var_result))
+                return result, var_result
+
+            case ast.Unary():
+                t, var = yield expr.exp
+                if expr.operators[0] == "not":
+                    operator, operand_type = root_symtab.require("unary_not"), Bool
+                else:
+                    operator, operand_type = root_symtab.require("unary_-"), Int
+                if var_types[var] != operand_type:
+                    raise TypeMismatch()
+                for op in expr.operators:
+                    var_next = new_var(operand_type)
+                    ins.append(ir.Call(loc, operator, [var], var_next))
+                    var = var_next
+                return (t if typed else expr.type), var
+
+            case ast.Block():
+                for seq in expr.sequence:
+                    yield seq
+                if expr.result is None:
+                    return (Unit if typed else expr.type), var_unit
+                t, var = yield expr.result
+                if isinstance(expr.result, ast.Literal) and expr.result.value is None:
+                    t = Unit
+                return (t if typed else expr.type), var
+
+            case ast.Declaration():
+                val, var_val = yield expr.value
+                if typed:
+                    if expr.variable.binding in resolution.redeclared:
+                        raise TypeMismatch()
+                    if expr.typed and val != expr.typed:
+                        raise TypeMismatch()
+                    local_types[expr.variable.binding] = val
+                var_result = new_var(var_types[var_val])
+                ins.append(ir.Copy(loc, var_val, var_result))
+                local_vars[expr.variable.binding] = var_result
+                return (Unit if typed else expr.type), var_unit
+
+            case ast.While_loop():
+                l_start = new_label(loc)
+                l_body = new_label(loc)
+                l_end = new_label(loc)
+                ins.append(l_start)
+                t, var_cond = yield expr.condition
+                if typed and t is not Bool:
+                    raise TypeMismatch()
+                ins.append(ir.CondJump(loc, var_cond, l_body, l_end))
+                ins.append(l_body)
+                untyped_depth += 1
+                yield expr.itering
+                untyped_depth -= 1
+                ins.append(ir.Jump(loc, l_start))
+                ins.append(l_end)
+                return (Unit if typed else expr.type), var_unit
+        raise TypeMismatch()
+
+    def annotate(expr: ast.Expression, value: Typed) -> None:
+        if untyped_depth == 0:
+            expr.type = value[0]
+
+    leaf_visitors: dict[type[ast.Expression], Callable[[ast.Expression], Typed]] = {
+        ast.Literal: visit_leaf,
+        ast.Identifier: visit_leaf,
+        ast.Boolean_literal: visit_leaf,
+    }
+    compound_visitors: dict[type[ast.Expression], Callable[[ast.Expression], Evaluator[Typed]]] = {
+        cls: visit for cls in [ast.BinaryOp, ast.IfExpression, ast.Function, ast.Unary,
+                               ast.Block, ast.Declaration, ast.While_loop]}
+    _, var_final_result = evaluate(node, leaf_visitors, compound_visitors, annotate)
+
+    loc = location(node)
+    if var_types[var_final_result] == Int:
+        dest_var = new_var(Int)
+        ins.append(ir.Call(loc, root_symtab.require("print_int"), [var_final_result], dest_var))
+    elif var_types[var_final_result] == Bool:
+        dest_var = new_var(Bool)
+        ins.append(ir.Call(loc, root_symtab.require("print_bool"), [var_final_result], dest_var))
+    return ins
@@ -0,0 +1,111 @@
+from typing import Iterator
+from compiler.parser import Parser
+from compiler.objects.source_location import Source_location
+from compiler.objects.token_buffer import BufferedToken, TokenBuffer, token_kind_codes
+import compiler.objects.ast as ast
+
+PUNCTUATION = token_kind_codes["punctuation"]
+
+
+class IncrementalParser:
+    """Parses a TokenBuffer one top-level segment at a time, reusing the ast of every
+    segment whose tokens are unchanged since the previous call.
+
+    A segment is the run of tokens between two top-level semicolons. Its fingerprint is
+    its source text together with the column it starts at, which fixes its tokens and
+    their relative positions; when a reused segment has moved to another line, the
+    locations of its nodes are shifted. Reused nodes are shared with the tree returned
+    by the previous call."""
+    _cache: dict[tuple[int, str], tuple[list[ast.Expression], int]]
+    reparsed: int
+
+    def __init__(self) -> None:
+        self._cache = {}
+        self.reparsed = 0
+
+    def parse(self, buffer: TokenBuffer) -> ast.Expression:
+        end = len(buffer) - 1
+        segments = self.segments(buffer)
+        if not segments:
+            return Parser.parse(buffer)
+
+        cache: dict[tuple[int, str], tuple[list[ast.Expression], int]] = {}
+        expressions: list[ast.Expression] = []
+        self.reparsed = 0
+        for first, separator in segments:
+            if first == separator:
+                # Nothing to cache: this only parses to report the missing expression.
+                expressions += self.parse_segment(buffer, first, separator)
+                continue
+            location = buffer.location(first)
+            last_end = buffer.starts[separator - 1] + buffer.lengths[separator - 1]
+            fingerprint = (location.column, buffer.source[buffer.starts[first]:last_end])
+            cached = self._cache.pop(fingerprint, None)
+            if cached is None:
+                nodes = self.parse_segment(buffer, first, separator)
+                self.reparsed += 1
+            else:
+                nodes, line = cached
+                if line != location.line:
+                    relocate(nodes, location.line - line)
+            cache[fingerprint] = (nodes, location.line)
+            expressions += nodes
+        self._cache = cache
+
+        location = buffer.location(end - 1)
+        if buffer.text(end - 1) == ";":
+            return ast.Block(location, expressions, None)
+        return ast.Block(location, expressions[:-1], expressions[-1])
+
+    @staticmethod
+    def segments(buffer: TokenBuffer) -> list[tuple[int, int]]:
+        """Returns the (first token, separator token) index pairs of the top-level segments.
+
+        The separator is the segment's semicolon, or the end token for the last segment,
+        which is left out when the input ends with a semicolon."""
+        kinds = buffer.kinds
+        starts = buffer.starts
+        source = buffer.source
+        end = len(kinds) - 1
+        segments = []
+        depth = 0
+        first = 0
+        for index in range(end):
+            if kinds[index] == PUNCTUATION:
+                text = source[starts[index]]
+                if text == "(" or text == "{":
+                    depth += 1
+                elif text == ")" or text == "}":
+                    depth -= 1
+                elif text == ";" and depth == 0:
+                    segments.append((first, index))
+                    first = index + 1
+        if first < end or not segments:
+            segments.append((first, end))
+        return segments if end > 0 else []
+
+    @staticmethod
+    def parse_segment(buffer: TokenBuffer, first: int, separator: int) -> list[ast.Expression]:
+        """Parses the tokens of one segment, followed by its separator, into its expressions."""
+        def tokens() -> Iterator[BufferedToken]:
+            for index in range(first, separator + 1):
+                yield BufferedToken(buffer, index)
+
+        block = Parser.parse(tokens())
+        assert isinstance(block, ast.Block)
+        if block.result is None:
+            return block.sequence
+        return block.sequence + [block.result]
+
+
+def relocate(nodes: list[ast.Expression], line_shift: int) -> None:
+    """Moves the locations of `nodes` and all their descendants `line_shift` lines down."""
+    stack: list[object] = list(nodes)
+    while stack:
+        node = stack.pop()
+        if isinstance(node, list):
+            stack.extend(node)
+        elif isinstance(node, ast.Expression):
+            if node.loc is not None:
+                node.loc = Source_location(node.loc.file, node.loc.line + line_shift, node.loc.column)
+            stack.extend(vars(node).values())
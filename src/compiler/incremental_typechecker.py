@@ -0,0 +1,91 @@
+from dataclasses import dataclass, field
+import compiler.objects.ast as ast
+from compiler.objects.ast_walker import walk_preorder
+from compiler.objects.node_types import Type, Unit
+from compiler.objects.sym_table import SymTab
+from compiler.name_resolver import resolve_names, GLOBAL
+from compiler.assets.builtins import builtin_types
+from compiler.typechecker import typechecker
+
+
+@dataclass
+class CheckedStatement:
+    # The names the statement reads that it does not declare itself, in order.
+    free: tuple[str, ...]
+    # The annotations of the statement's nodes in preorder, for each tuple of types of
+    # the free names it has been checked with.
+    results: dict[tuple[Type | None, ...], list[Type]] = field(default_factory=dict)
+    # The statement node whose annotations were last set, and the environment they were for.
+    annotated: ast.Expression | None = None
+    annotated_environment: tuple[Type | None, ...] = ()
+
+
+class IncrementalTypechecker:
+    """Typechecks a program one top-level statement at a time, reusing the annotations of
+    every statement that was already checked with the same types for its free variables.
+
+    A statement's fingerprint is its structure (see ast.Expression.__eq__), annotations
+    of declarations included, and the fingerprint of the environment it reads is the
+    types the top-level scope gives the names it does not declare itself. The result is the same as from `typechecker`,
+    including the errors. Only the statements of the previous call are kept.
+
+    Statement nodes reused from the previous call, as the IncrementalParser returns them,
+    still carry their annotations and are not walked again. The statements are bound
+    one at a time, so unless `bind` is False the whole program's names are resolved
+    again at the end for the passes that follow."""
+    _cache: dict[ast.Expression, CheckedStatement]
+    rechecked: int
+
+    def __init__(self) -> None:
+        self._cache = {}
+        self.rechecked = 0
+
+    def check(self, node: ast.Expression, top_level: SymTab | None = None, bind: bool = True) -> Type:
+        if not isinstance(node, ast.Block):
+            return typechecker(node, top_level)
+
+        scope = (top_level if top_level is not None else builtin_types).overlay()
+        declared: set[str] = set()
+        cache: dict[ast.Expression, CheckedStatement] = {}
+        self.rechecked = 0
+
+        last = node.result
+        if isinstance(last, ast.Literal) and last.value is None:
+            # The empty result after a final semicolon.
+            last = None
+        statements = node.sequence if last is None else [*node.sequence, last]
+        for statement in statements:
+            if isinstance(statement, ast.Declaration) and statement.variable.name in declared:
+                # The value is checked first, as its errors come before this one.
+                typechecker(statement.value, scope)
+                raise Exception(f"{statement.variable.name} already declared")
+
+            checked = cache.get(statement) or self._cache.get(statement)
+            environment = tuple(scope.require(name) for name in checked.free) if checked else ()
+            result = checked.results.get(environment) if checked else None
+            if checked is None or result is None:
+                typechecker(statement, scope)
+                self.rechecked += 1
+                nodes = list(walk_preorder(statement))
+                if checked is None:
+                    free = dict.fromkeys(n.name for n in nodes if type(n) is ast.Identifier and n.binding == GLOBAL)
+                    checked = CheckedStatement(tuple(free))
+                    environment = tuple(scope.require(name) for name in checked.free)
+                result = [n.type for n in nodes]
+                checked.results[environment] = result
+            elif checked.annotated is not statement or checked.annotated_environment != environment:
+                for n, annotation in zip(walk_preorder(statement), result):
+                    n.type = annotation
+            checked.annotated = statement
+            checked.annotated_environment = environment
+            cache[statement] = checked
+
+            if isinstance(statement, ast.Declaration):
+                declared.add(statement.variable.name)
+                scope.add_local(statement.variable.name, statement.value.type)
+        self._cache = cache
+
+        if bind:
+            resolve_names(node)
+        node.type = last.type if last is not None else Unit
+        return node.type
@@ -1,21 +1,24 @@
+from typing import Mapping
 from compiler.objects.ir_variables import IRVar
-from compiler.objects.node_types import Type, BasicType, Bool, Int, Unit, FunType
+from compiler.objects.node_types import Type, AnyBasic, Bool, Int, Unit, FunType
 import compiler.objects.ir_instructions as ir
 import compiler.objects.ast as ast
 from compiler.objects.sym_table import SymTab
 from compiler.tokenizer import Tokenizer
 from compiler.parser import Parser
 from compiler.typechecker import typechecker
+from compiler.name_resolver import GLOBAL
+from compiler.objects.ast_walker import Evaluator, child_fields, evaluate
 
 def generate_ir(
     # 'root_types' parameter should map all global names
     # like 'print_int' and '+' to their types.
-    root_types: dict[IRVar, Type],
+    root_types: Mapping[IRVar, Type],
     node: ast.Expression
 ) -> list[ir.Instruction]:
     cur_var_num = 1
     cur_lab_num = 1
-    var_types: dict[IRVar, Type] = root_types.copy()
+    var_types: dict[IRVar, Type] = dict(root_types)
 
     # 'var_unit' is used when an expression's type is 'Unit'.
     var_unit = IRVar('unit')
@@ -47,29 +50,74 @@ def generate_ir(
     # and returns the IR variable where
     # the emitted IR instructions put the result.
     #
-    # It uses a symbol table to map local variables
-    # (which may be shadowed) to unique IR variables.
-    # The symbol table will be updated in the same way as
-    # in the interpreter and type checker.
-    def visit(st: SymTab, expr: ast.Expression) -> IRVar:
+    # Local variables (which may be shadowed) are mapped to
+    # unique IR variables by the binding that the type checker's
+    # name resolution gave each identifier, and globals by name.
+    local_vars: dict[int, IRVar] = {}
+
+    def require(name: ast.Identifier) -> IRVar:
+        if name.binding != GLOBAL:
+            return local_vars[name.binding]
+        return root_symtab.require(name.name)
+
+    def visit_leaf(expr: ast.Expression) -> IRVar:
         loc = expr.loc
 
-        def equals_handle(st: SymTab, expr: ast.BinaryOp):
-            var_val = visit(st, expr.right)
-            var_org = visit(st, expr.left)
+        match expr:
+            case ast.Literal():
+                # Create an IR variable to hold the value,
+                # and emit the correct instruction to
+                # load the constant value.
+                match expr.value:
+                    case bool():
+                        var = new_var(Bool)
+                        ins.append(ir.LoadBoolConst(
+                            loc, "true" if expr.value else "false", var))
+                    case int():
+                        var = new_var(Int)
+                        ins.append(ir.LoadIntConst(
+                            loc, expr.value, var))
+                    case None:
+                        var = var_unit
+                    case _:
+                        raise Exception(f"{loc}: unsupported literal: {type(expr.value)}")
+
+                # Return the variable that holds
+                # the loaded value.
+                return var
+
+            case ast.Identifier():
+                # Look up the IR variable that corresponds to
+                # the source code variable.
+                return require(expr)
+            
+            case ast.Boolean_literal():
+                var = new_var(Bool)
+                ins.append(ir.LoadBoolConst(loc, expr.boolean, var))
+                return var
+
+    # Compound nodes are visited by generators that yield the child nodes
+    # to visit and are sent their result variables, so that 'evaluate'
+    # can run them on arbitrarily deep trees without recursion.
+    def visit(expr: ast.Expression) -> Evaluator[IRVar]:
+        loc = expr.loc
+
+        def equals_handle(expr: ast.BinaryOp) -> Evaluator[IRVar]:
+            var_val = yield expr.right
+            var_org = yield expr.left
             ins.append(ir.Copy(loc, var_val, var_org))
             return var_org
         
-        def short_circuit(st: SymTab, expr: ast.BinaryOp):
+        def short_circuit(expr: ast.BinaryOp) -> Evaluator[IRVar]:
             if expr.op == "or":
                 l_right = new_label(loc)
                 l_skip = new_label(loc)
                 l_end = new_label(loc)
-                var_left = visit(st, expr.left)
+                var_left = yield expr.left
                 var_result = new_var(Bool)
                 ins.append(ir.CondJump(loc, var_left, l_skip, l_right))
                 ins.append(l_right)
-                var_right = visit(st, expr.right)
+                var_right = yield expr.right
                 ins.append(ir.Copy(loc, var_right, var_result))
                 ins.append(ir.Jump(loc, l_end))
                 ins.append(l_skip)
@@ -80,11 +128,11 @@ def generate_ir(
                 l_right = new_label(loc)
                 l_skip = new_label(loc)
                 l_end = new_label(loc)
-                var_left = visit(st, expr.left)
+                var_left = yield expr.left
                 var_result = new_var(Bool)
                 ins.append(ir.CondJump(loc, var_left, l_right, l_skip))
                 ins.append(l_right)
-                var_right = visit(st, expr.right)
+                var_right = yield expr.right
                 ins.append(ir.Copy(loc, var_right, var_result))
                 ins.append(ir.Jump(loc, l_end))
                 ins.append(l_skip)
@@ -94,49 +142,17 @@ def generate_ir(
             return var_result
 
         match expr:
-            case ast.Literal():
-                # Create an IR variable to hold the value,
-                # and emit the correct instruction to
-                # load the constant value.
-                match expr.value:
-                    case bool():
-                        var = new_var(Bool)
-                        ins.append(ir.LoadBoolConst(
-                            loc, expr.value, var))
-                    case int():
-                        var = new_var(Int)
-                        ins.append(ir.LoadIntConst(
-                            loc, expr.value, var))
-                    case None:
-                        var = var_unit
-                    case _:
-                        raise Exception(f"{loc}: unsupported literal: {type(expr.value)}")
-
-                # Return the variable that holds
-                # the loaded value.
-                return var
-
-            case ast.Identifier():
-                # Look up the IR variable that corresponds to
-                # the source code variable.
-                return st.require(expr.name)
-            
-            case ast.Boolean_literal():
-                var = new_var(Bool)
-                ins.append(ir.LoadBoolConst(loc, expr.boolean, var))
-                return var
-            
             case ast.BinaryOp():
                 # Ask the symbol table to return the variable that refers
                 # to the operator to call.
                 if expr.op == "=":
-                    return equals_handle(st, expr)
+                    return (yield from equals_handle(expr))
                 elif expr.op in ["and", "or"]:
-                    return short_circuit(st, expr)
-                var_op = st.require(expr.op)
+                    return (yield from short_circuit(expr))
+                var_op = root_symtab.require(expr.op)
                 # Recursively emit instructions to calculate the operands.
-                var_left = visit(st, expr.left)
-                var_right = visit(st, expr.right)
+                var_left = yield expr.left
+                var_right = yield expr.right
                 # Generate variable to hold the result.
                 var_result = new_var(expr.type)
                 # Emit a Call instruction that writes to that variable.
@@ -153,7 +169,7 @@ def generate_ir(
 
                     # Recursively emit instructions for
                     # evaluating the condition.
-                    var_cond = visit(st, expr.cond)
+                    var_cond = yield expr.cond
                     # Emit a conditional jump instruction
                     # to jump to 'l_then' or 'l_end',
                     # depending on the content of 'var_cond'.
@@ -163,7 +179,7 @@ def generate_ir(
                     # the "then" branch.
                     ins.append(l_then)
                     # Recursively emit instructions for the "then" branch.
-                    visit(st, expr.then_clause)
+                    yield expr.then_clause
 
                     # Emit the label that we jump to
                     # when we don't want to go to the "then" branch.
@@ -178,70 +194,70 @@ def generate_ir(
                     l_end = new_label(loc)
                     var_result = new_var(expr.then_clause.type)
 
-                    var_cond = visit(st, expr.cond)
+                    var_cond = yield expr.cond
                     ins.append(ir.CondJump(loc, var_cond, l_then, l_else))
                     # then
                     ins.append(l_then)
-                    var_then = visit(st, expr.then_clause)
+                    var_then = yield expr.then_clause
                     ins.append(ir.Copy(loc, var_then, var_result))
                     ins.append(ir.Jump(loc, l_end))
                     # else
                     ins.append(l_else)
-                    var_else = visit(st, expr.else_clause)
+                    var_else = yield expr.else_clause
                     ins.append(ir.Copy(loc, var_else, var_result))
                     ins.append(l_end)
                     
                     return var_result
 
             case ast.Function():
-                if st.require(expr.name.name):
+                var_function = require(expr.name)
+                if var_function:
                     args = []
                     for arg in expr.arguments:
-                        args.append(visit(st, arg))
-                    var_result = new_var(root_types[st.require(expr.name.name)].result_type)
-                    ins.append(ir.Call(loc, st.require(expr.name.name), args, var_result))
+                        args.append((yield arg))
+                    var_result = new_var(root_types[var_function].result_type)
+                    ins.append(ir.Call(loc, var_function, args, var_result))
                     return var_result
                 else:
                     raise Exception(f"No such function as {expr.name}")
 
             case ast.Unary():
                 if expr.operators[0] == "not":
-                    bool_var = visit(st, expr.exp)
+                    bool_var = yield expr.exp
                     if var_types[bool_var] != Bool:
                         raise Exception(f"{expr.exp} not a boolean")
                     vars = []
                     for op in expr.operators:
                         vars.append(new_var(Bool))
-                        ins.append(ir.Call(loc, st.require("unary_not"), [bool_var], vars[-1]))
+                        ins.append(ir.Call(loc, root_symtab.require("unary_not"), [bool_var], vars[-1]))
                         bool_var = vars[-1]
                     return bool_var
                 else:
-                    int_var = visit(st, expr.exp)
+                    int_var = yield expr.exp
                     if var_types[int_var] != Int:
                         raise Exception(f"{expr.exp} not an integer")
                     vars = []
                     for op in expr.operators:
                         vars.append(new_var(Int))
-                        ins.append(ir.Call(loc, st.require("unary_-"), [int_var], vars[-1]))
+                        ins.append(ir.Call(loc, root_symtab.require("unary_-"), [int_var], vars[-1]))
                         int_var = vars[-1]
                     return int_var
                 
             case ast.Block():
-                new_scope = SymTab({}, st)
                 if len(expr.sequence) == 0 and expr.result is None:
                     return var_unit
                 for seq in expr.sequence:
-                    visit(new_scope, seq)
+                    yield seq
                 if expr.result is None:
                     return var_unit
                 else: 
-                    return visit(new_scope, expr.result)
+                    return (yield expr.result)
             
             case ast.Declaration():
-                var_val = visit(st, expr.value)
+                var_val = yield expr.value
                 var_result = new_var(var_types[var_val])
                 ins.append(ir.Copy(loc, var_val, var_result))
-                st.variables[expr.variable.name] = var_result
+                local_vars[expr.variable.binding] = var_result
                 return var_unit
                 
             
@@ -251,10 +267,10 @@ def generate_ir(
                 l_end = new_label(loc)
 
                 ins.append(l_start)
-                var_cond = visit(st, expr.condition)
+                var_cond = yield expr.condition
                 ins.append(ir.CondJump(loc, var_cond, l_body, l_end))
                 ins.append(l_body)
-                visit(st, expr.itering)
+                yield expr.itering
                 ins.append(ir.Jump(loc, l_start))
                 ins.append(l_end)
                 return var_unit
@@ -272,8 +288,15 @@ def generate_ir(
         root_symtab.add_local(v.name, v)
 
 
+    leaf_visitors = {
+        ast.Literal: visit_leaf,
+        ast.Identifier: visit_leaf,
+        ast.Boolean_literal: visit_leaf,
+    }
+    compound_visitors = {cls: visit for cls in child_fields if cls not in leaf_visitors}
+
     # Start visiting the AST from the root.
-    var_final_result = visit(root_symtab, node)
+    var_final_result = evaluate(node, leaf_visitors, compound_visitors)
 
     locat = node.loc
 
@@ -293,5 +316,5 @@ if __name__ == "__main__":
     par = Parser()
     inp = par.parse(tok.tokenize("-(1+2)*3"))
     typechecker(inp)
-    rt_types = {IRVar("+"): FunType([Int, Int], Int), IRVar("*"): FunType([Int, Int], Int), IRVar("print_int"): FunType([Int], Unit), IRVar("print_bool"): FunType([Bool], Unit), IRVar("unary_not"): FunType([Bool], Bool), IRVar("unary_-"): FunType([Int], Int), IRVar("<"): FunType([Int, Int], Bool), IRVar(">"): FunType([Int, Int], Bool), IRVar("<="): FunType([Int, Int], Bool), IRVar(">="): FunType([Int, Int], Bool), IRVar("-"): FunType([Int, Int], Int), IRVar("/"): FunType([Int, Int], Int), IRVar("%"): FunType([Int, Int], Int), IRVar("=="): FunType([BasicType, BasicType], Bool), IRVar("!="): FunType([BasicType, BasicType], Bool)}
+    rt_types = {IRVar("+"): FunType([Int, Int], Int), IRVar("*"): FunType([Int, Int], Int), IRVar("print_int"): FunType([Int], Unit), IRVar("print_bool"): FunType([Bool], Unit), IRVar("unary_not"): FunType([Bool], Bool), IRVar("unary_-"): FunType([Int], Int), IRVar("<"): FunType([Int, Int], Bool), IRVar(">"): FunType([Int, Int], Bool), IRVar("<="): FunType([Int, Int], Bool), IRVar(">="): FunType([Int, Int], Bool), IRVar("-"): FunType([Int, Int], Int), IRVar("/"): FunType([Int, Int], Int), IRVar("%"): FunType([Int, Int], Int), IRVar("=="): FunType([AnyBasic, AnyBasic], Bool), IRVar("!="): FunType([AnyBasic, AnyBasic], Bool)}
     print(generate_ir(rt_types, inp))
\ No newline at end of file
@@ -0,0 +1,91 @@
+from typing import Callable, Iterable
+from compiler.objects.ir_variables import IRVar
+import compiler.objects.ir_instructions as ir
+
+
+def wrap(value: int) -> int:
+    """Wraps `value` to a signed 64-bit integer, as the generated code computes."""
+    return (value + 2**63) % 2**64 - 2**63
+
+
+def divide(a: int, b: int) -> int:
+    # idivq rounds towards zero and traps on division by zero or overflow.
+    if b == 0 or (a == -2**63 and b == -1):
+        raise Exception("division trap")
+    quotient = abs(a) // abs(b)
+    return quotient if (a < 0) == (b < 0) else -quotient
+
+
+def remainder(a: int, b: int) -> int:
+    return a - divide(a, b) * b
+
+
+def divide_pow2(a: int, k: int) -> int:
+    quotient = abs(a) >> k
+    return quotient if a >= 0 else -quotient
+
+
+operations: dict[str, Callable[..., int]] = {
+    "+": lambda a, b: wrap(a + b),
+    "-": lambda a, b: wrap(a - b),
+    "*": lambda a, b: wrap(a * b),
+    "/": divide,
+    "%": remainder,
+    "<<": lambda a, k: wrap(a << k),
+    "div_pow2": divide_pow2,
+    "mod_pow2": lambda a, k: a - (divide_pow2(a, k) << k),
+    "==": lambda a, b: int(a == b),
+    "!=": lambda a, b: int(a != b),
+    "<": lambda a, b: int(a < b),
+    "<=": lambda a, b: int(a <= b),
+    ">": lambda a, b: int(a > b),
+    ">=": lambda a, b: int(a >= b),
+    "unary_-": lambda a: wrap(-a),
+    "unary_not": lambda a: a ^ 1,
+}
+
+
+def interpret(instructions: list[ir.Instruction], inputs: Iterable[int] = (), max_steps: int = 10**6) -> list[int]:
+    """Runs IR instructions as the generated assembly would and returns the values
+    printed by print_int and print_bool, with booleans as 0 and 1. read_int takes the
+    next value from `inputs`. Meant for checking that transformations of the IR keep
+    its behaviour; raises after `max_steps` instructions."""
+    positions = {insn.name: index for index, insn in enumerate(instructions) if isinstance(insn, ir.Label)}
+    values: dict[IRVar, int] = {}
+    output: list[int] = []
+    remaining = iter(inputs)
+    index = 0
+    steps = 0
+    while index < len(instructions):
+        steps += 1
+        if steps > max_steps:
+            raise Exception(f"still running after {max_steps} instructions")
+        insn = instructions[index]
+        index += 1
+        match insn:
+            case ir.LoadIntConst():
+                values[insn.dest] = wrap(insn.value)
+            case ir.LoadBoolConst():
+                values[insn.dest] = int(insn.value in ("true", True))
+            case ir.Copy():
+                values[insn.dest] = values.get(insn.source, 0)
+            case ir.Call():
+                args = [values.get(arg, 0) for arg in insn.args]
+                name = insn.fun.name
+                if name == "print_int" or name == "print_bool":
+                    output.append(args[0])
+                    values[insn.dest] = 0
+                elif name == "read_int":
+                    values[insn.dest] = next(remaining)
+                else:
+                    values[insn.dest] = operations[name](*args)
+            case ir.Jump():
+                index = positions[insn.label.name]
+            case ir.CondJump():
+                taken = insn.then_label if values.get(insn.cond, 0) else insn.else_label
+                index = positions[taken.name]
+            case ir.Label():
+                pass
+            case _:
+                raise Exception(f"cannot interpret {insn}")
+    return output
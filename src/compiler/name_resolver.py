@@ -0,0 +1,56 @@
+from dataclasses import dataclass
+from compiler.objects.ast_walker import walk
+import compiler.objects.ast as ast
+
+# The binding of an identifier that no declaration in the program binds:
+# a builtin like print_int, or a name that is not declared at all.
+GLOBAL = -1
+
+
+@dataclass
+class Resolution:
+    binding_count: int
+    # The bindings whose declaration repeats a name declared earlier in the same block.
+    redeclared: set[int]
+
+
+def resolve_names(node: ast.Expression) -> Resolution:
+    """Sets the `binding` of every identifier in the tree to the number of the declaration
+    it refers to, numbering the declarations from 0 in evaluation order.
+
+    Scopes follow the typechecker: every block opens one, and a declared variable is
+    visible after its value. Only one name-to-binding map is kept; each block has an undo
+    log of the bindings its declarations replaced, which are restored when it ends. The
+    name of a declaration gets its binding, and uses are bound to whatever the name maps
+    to when they are reached, so later passes never need to search scopes."""
+    current: dict[str, int] = {}
+    depths: list[int] = []
+    undo_logs: list[list[tuple[str, int | None]]] = [[]]
+    redeclared: set[int] = set()
+
+    def enter(node: ast.Expression) -> None:
+        if type(node) is ast.Identifier:
+            node.binding = current.get(node.name, GLOBAL)
+        elif type(node) is ast.Block:
+            undo_logs.append([])
+
+    def leave(node: ast.Expression) -> None:
+        if type(node) is ast.Block:
+            for name, previous in reversed(undo_logs.pop()):
+                if previous is None:
+                    del current[name]
+                else:
+                    current[name] = previous
+        elif type(node) is ast.Declaration:
+            name = node.variable.name
+            binding = len(depths)
+            previous = current.get(name)
+            if previous is not None and depths[previous] == len(undo_logs):
+                redeclared.add(binding)
+            depths.append(len(undo_logs))
+            undo_logs[-1].append((name, previous))
+            current[name] = binding
+            node.variable.binding = binding
+
+    walk(node, enter, leave)
+    return Resolution(len(depths), redeclared)
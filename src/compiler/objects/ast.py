@@ -1,117 +1,200 @@
 from dataclasses import dataclass, field
-from typing import Literal as Lit
+from typing import Any, ClassVar, Iterator, Literal as Lit, TypeVar
 from compiler.objects.node_types import BasicType, Type, Unit
 
 from compiler.objects.source_location import Source_location
 
+E = TypeVar("E", bound="Expression")
 
-@dataclass
+
+@dataclass(eq=False)
 class Expression:
-    """Base class for AST nodes representing expressions."""
+    """Base class for AST nodes representing expressions.
+
+    Nodes are equal when they are of the same class and their `structure` fields are equal;
+    locations and types are ignored. The structural hash is computed the first time it is
+    needed and then kept, so a node must not be restructured after it has been hashed."""
     loc: Source_location | None
 
     type: Type = field(kw_only = True, default=Unit)
 
-    def __eq__(self, other):
-        if self.loc == other.loc:
-            return True
-
-@dataclass
+    # The fields that make up the node's structure, compared by == and hashed. Those
+    # annotated with node classes hold its children, which are walked in this order.
+    structure: ClassVar[tuple[str, ...]] = ()
+
+    def subtrees(self) -> Iterator["Expression"]:
+        """Yields the nodes directly below this one."""
+        for name in self.structure:
+            value = getattr(self, name)
+            if isinstance(value, Expression):
+                yield value
+            elif isinstance(value, list):
+                yield from (item for item in value if isinstance(item, Expression))
+
+    def __hash__(self) -> int:
+        cached = self.__dict__.get("_hash")
+        if cached is not None:
+            return cached
+        # Hash the unhashed descendants children first, without recursion, so that each
+        # node's hash only combines the cached hashes of its children.
+        order = []
+        stack: list[Expression] = [self]
+        while stack:
+            node = stack.pop()
+            if "_hash" not in node.__dict__:
+                order.append(node)
+                stack.extend(node.subtrees())
+        for node in reversed(order):
+            key: list[Any] = [type(node)]
+            for name in node.structure:
+                value = getattr(node, name)
+                if isinstance(value, Expression):
+                    key.append(value.__dict__["_hash"])
+                elif isinstance(value, list):
+                    key.append(tuple([hash(item) for item in value]))
+                else:
+                    key.append(value)
+            node.__dict__["_hash"] = hash(tuple(key))
+        return self.__dict__["_hash"]
+
+    def __eq__(self, other: object) -> bool:
+        if not isinstance(other, Expression):
+            return NotImplemented
+        pairs: list[tuple[Any, Any]] = [(self, other)]
+        while pairs:
+            a, b = pairs.pop()
+            if a is b:
+                continue
+            if not isinstance(a, Expression):
+                if a != b:
+                    return False
+                continue
+            if type(a) is not type(b) or hash(a) != hash(b):
+                return False
+            for name in a.structure:
+                x, y = getattr(a, name), getattr(b, name)
+                if isinstance(x, list) and isinstance(y, list):
+                    if len(x) != len(y):
+                        return False
+                    pairs.extend(zip(x, y))
+                else:
+                    pairs.append((x, y))
+        return True
+
+@dataclass(eq=False)
 class Literal(Expression):
-    value: int | bool
+    # None for the Unit value of a block without a result expression.
+    value: int | bool | None
 
-    def __eq__(self, other):
-        if self.value == other.value:
-            return True
+    structure = ("value",)
 
-@dataclass
+@dataclass(eq=False)
 class Identifier(Expression):
     name: str
+    # The declaration the name refers to, set by compiler.name_resolver.
+    binding: int = field(kw_only=True, default=-1, repr=False)
 
-    def __eq__(self, other):
-        if self.name == other.name:
-            return True
+    structure = ("name",)
         
-@dataclass
+@dataclass(eq=False)
 class Boolean_literal(Expression):
     boolean: Lit["true", "false"]
 
-    def __eq__(self, other):
-        if self.boolean == other.boolean:
-            return True
+    structure = ("boolean",)
 
-@dataclass
+@dataclass(eq=False)
 class BinaryOp(Expression):
     """AST node for a binary operation like `A + B`"""
     left: Expression
     op: str
     right: Expression
 
-    def __eq__(self, other):
-        if self.left == other.left and self.op == other.op and self.right == other.right:
-            return True
+    structure = ("left", "op", "right")
         
-@dataclass
+@dataclass(eq=False)
 class IfExpression(Expression):
     cond: Expression
     then_clause: Expression
     else_clause: Expression | None
 
-    def __eq__(self, other):
-        if self.cond == other.cond and self.then_clause == other.then_clause and self.else_clause == other.else_clause:
-            return True
+    structure = ("cond", "then_clause", "else_clause")
         
-@dataclass
+@dataclass(eq=False)
 class Function(Expression):
     name: Identifier
     arguments: list[Expression]
 
-    def __eq__(self, other):
-        if self.name == other.name and self.arguments == other.arguments:
-            return True
+    structure = ("name", "arguments")
         
-@dataclass
+@dataclass(eq=False)
 class Unary(Expression):
     operators: list[str]
     exp: Expression
 
-    def __eq__(self, other):
-        if self.operators == other.operators and self.exp == other.exp:
-            return True
+    structure = ("operators", "exp")
 
-@dataclass
+@dataclass(eq=False)
 class Block(Expression):
     sequence: list[Expression]
     result: Expression | None
 
-    def __eq__(self, other):
-        if self.sequence == other.sequence and self.result == other.result:
-            return True
+    structure = ("sequence", "result")
         
-@dataclass
+@dataclass(eq=False)
 class FunctionTypeExpression(Expression):
     variable_types: list[Expression]
     result_type: Expression
 
-    def __eq__(self, other):
-        if self.variable_types == other.variable_types and self.result_type == other.result_type:
-            return True
+    structure = ("variable_types", "result_type")
         
-@dataclass
+@dataclass(eq=False)
 class Declaration(Expression):
     variable: Identifier
     value: Expression
     typed: FunctionTypeExpression | BasicType | None
 
-    def __eq__(self, other):
-        if self.variable == other.variable and self.value == other.value:
-            return True
+    structure = ("variable", "value", "typed")
     
-@dataclass
+@dataclass(eq=False)
 class While_loop(Expression):
     condition: Expression
     itering: Expression
 
-    def __eq__(self, other):
-        if self.condition == other.condition and self.itering == other.itering:
-            return True
\ No newline at end of file
+    structure = ("condition", "itering")
+
+
+class HashConsTable:
+    """Hands out a single shared node for every structurally distinct subtree.
+
+    Subtrees built through one table are equal exactly when they are the same object.
+    A shared node keeps the location of the first occurrence, so per-occurrence data
+    such as locations and types should not be read from trees that were shared."""
+    nodes: dict[Expression, Expression]
+
+    def __init__(self) -> None:
+        self.nodes = {}
+
+    def make(self, cls: type[E], *args: Any, **kwargs: Any) -> E:
+        """Constructs `cls(*args, **kwargs)`, or returns the equal node made before."""
+        node = cls(*args, **kwargs)
+        return self.nodes.setdefault(node, node)  # type: ignore[return-value]
+
+    def share(self, tree: E) -> E:
+        """Replaces the repeated subtrees of `tree` in place with shared nodes
+        and returns the shared node for `tree`."""
+        order = []
+        stack: list[Expression] = [tree]
+        while stack:
+            node = stack.pop()
+            order.append(node)
+            stack.extend(node.subtrees())
+        nodes = self.nodes
+        for node in reversed(order):
+            for name in node.structure:
+                value = getattr(node, name)
+                if isinstance(value, Expression):
+                    setattr(node, name, nodes[value])
+                elif isinstance(value, list):
+                    setattr(node, name, [nodes[item] if isinstance(item, Expression) else item for item in value])
+            nodes.setdefault(node, node)
+        return nodes[tree]  # type: ignore[return-value]
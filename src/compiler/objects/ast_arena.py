@@ -0,0 +1,206 @@
+from array import array
+from typing import Any
+from compiler.objects.source_location import Source_location
+import compiler.objects.ast as ast
+from compiler.objects.ast_walker import child_fields, list_fields
+
+NONE = -1
+
+Layout = tuple[tuple[str, ...], str | None, str | None]
+
+
+def node_layout(cls: type[ast.Expression]) -> Layout:
+    """Returns how nodes of `cls` are stored: the fields holding one child node (None
+    allowed), the field holding a list of child nodes, and the field stored as a payload
+    value. A node's children are stored as its fixed child fields in order, then the list."""
+    fields = child_fields[cls]
+    fixed = tuple(name for name in fields if name not in list_fields)
+    listed = [name for name in fields if name in list_fields]
+    payload = [name for name in cls.structure if name not in fields]
+    assert len(listed) <= 1 and len(payload) <= 1, f"{cls.__name__} does not fit in an arena row"
+    return fixed, listed[0] if listed else None, payload[0] if payload else None
+
+
+node_layouts: dict[type[ast.Expression], Layout] = {cls: node_layout(cls) for cls in child_fields}
+node_classes: tuple[type[ast.Expression], ...] = tuple(node_layouts)
+node_kind_codes: dict[type[ast.Expression], int] = {cls: code for code, cls in enumerate(node_classes)}
+
+
+class AstArena:
+    """Compact store for ast nodes: one row per node in parallel typed arrays.
+
+    A row holds the node's kind code, the position and number of its children in the
+    shared `children` array, the index of its payload (name, operator, literal value...)
+    in `payloads`, and its line and column. Equal hashable payloads are stored once.
+    Nodes are added children first, so a child's index is always below its parent's."""
+    file_name: str
+    kinds: array
+    first_child: array
+    child_count: array
+    payload: array
+    lines: array
+    columns: array
+    children: array
+    payloads: list[Any]
+    root: int
+
+    def __init__(self, file_name: str = "") -> None:
+        self.file_name = file_name
+        self.kinds = array("B")
+        self.first_child = array("I")
+        self.child_count = array("I")
+        self.payload = array("i")
+        self.lines = array("I")
+        self.columns = array("I")
+        self.children = array("i")
+        self.payloads = []
+        self._payload_indices: dict[tuple[type, Any], int] = {}
+        self.root = NONE
+
+    def __len__(self) -> int:
+        return len(self.kinds)
+
+    def add_node(self, cls: type[ast.Expression], loc: Source_location | None, children: list[int], payload: Any = None) -> int:
+        """Appends one node whose children are already in the arena and returns its index."""
+        self.kinds.append(node_kind_codes[cls])
+        self.first_child.append(len(self.children))
+        self.child_count.append(len(children))
+        self.children.extend(children)
+        self.payload.append(self._intern(payload))
+        if loc is None:
+            self.lines.append(0)
+            self.columns.append(0)
+        else:
+            self.file_name = self.file_name or loc.file
+            self.lines.append(loc.line)
+            self.columns.append(loc.column)
+        return len(self.kinds) - 1
+
+    def _intern(self, value: Any) -> int:
+        if isinstance(value, list):
+            value = tuple(value)
+        # Every payload is hashable: names, operators, literal values and types, function
+        # type expressions included (see ast.Expression.__hash__).
+        key = (type(value), value)
+        index = self._payload_indices.get(key)
+        if index is None:
+            index = len(self.payloads)
+            self.payloads.append(value)
+            self._payload_indices[key] = index
+        return index
+
+    def add(self, node: ast.Expression) -> int:
+        """Packs `node` and its subtree into the arena and returns the index of `node`."""
+        # Post-order with an explicit stack, so arbitrarily deep trees can be packed.
+        packed: list[int] = []
+        stack: list[tuple[ast.Expression | None, bool]] = [(node, False)]
+        while stack:
+            current, expanded = stack.pop()
+            if current is None:
+                packed.append(NONE)
+                continue
+            fixed, listed, payload = node_layouts[type(current)]
+            if not expanded:
+                stack.append((current, True))
+                kids: list[ast.Expression | None] = [getattr(current, name) for name in fixed]
+                if listed is not None:
+                    kids += getattr(current, listed)
+                stack.extend((kid, False) for kid in reversed(kids))
+                continue
+            count = len(fixed) + (len(getattr(current, listed)) if listed is not None else 0)
+            kid_indices = packed[len(packed) - count:]
+            del packed[len(packed) - count:]
+            packed.append(self.add_node(type(current), current.loc, kid_indices,
+                                        getattr(current, payload) if payload is not None else None))
+        return packed[0]
+
+    @staticmethod
+    def from_tree(node: ast.Expression) -> "AstArena":
+        arena = AstArena()
+        arena.root = arena.add(node)
+        return arena
+
+    def kind(self, index: int) -> type[ast.Expression]:
+        return node_classes[self.kinds[index]]
+
+    def location(self, index: int) -> Source_location | None:
+        if self.lines[index] == 0:
+            return None
+        return Source_location(self.file_name, self.lines[index], self.columns[index])
+
+    def child_indices(self, index: int) -> array:
+        first = self.first_child[index]
+        return self.children[first:first + self.child_count[index]]
+
+    def field(self, index: int, name: str) -> Any:
+        """Returns field `name` of node `index`, with child nodes as NodeViews."""
+        fixed, listed, payload = node_layouts[node_classes[self.kinds[index]]]
+        first = self.first_child[index]
+        if name in fixed:
+            child = self.children[first + fixed.index(name)]
+            return None if child == NONE else NodeView(self, child)
+        if name == listed:
+            return [NodeView(self, child) for child in self.children[first + len(fixed):first + self.child_count[index]]]
+        if name == payload:
+            value = self.payloads[self.payload[index]]
+            return list(value) if isinstance(value, tuple) else value
+        if name == "loc":
+            return self.location(index)
+        raise AttributeError(f"{node_classes[self.kinds[index]].__name__} has no field {name!r}")
+
+    def view(self, index: int) -> "NodeView":
+        return NodeView(self, index)
+
+    def to_tree(self, index: int | None = None) -> ast.Expression:
+        """Rebuilds the ast objects of the subtree at `index` (the root by default)."""
+        built: dict[int, ast.Expression] = {}
+        stack = [self.root if index is None else index]
+        while stack:
+            current = stack[-1]
+            kids = [child for child in self.child_indices(current) if child != NONE and child not in built]
+            if kids:
+                stack.extend(kids)
+                continue
+            stack.pop()
+            if current in built:
+                continue
+            cls = self.kind(current)
+            fixed, listed, payload = node_layouts[cls]
+            first = self.first_child[current]
+            values: dict[str, Any] = {}
+            for position, name in enumerate(fixed):
+                child = self.children[first + position]
+                values[name] = None if child == NONE else built.pop(child)
+            if listed is not None:
+                values[listed] = [built.pop(child) for child in self.children[first + len(fixed):first + self.child_count[current]]]
+            if payload is not None:
+                values[payload] = self.field(current, payload)
+            built[current] = cls(self.location(current), **values)
+        return built[self.root if index is None else index]
+
+
+class NodeView:
+    """Read-only object view of one arena node, with the same field names as the ast class."""
+    __slots__ = ("arena", "index")
+    arena: AstArena
+    index: int
+
+    def __init__(self, arena: AstArena, index: int) -> None:
+        self.arena = arena
+        self.index = index
+
+    @property
+    def kind(self) -> type[ast.Expression]:
+        return self.arena.kind(self.index)
+
+    def __getattr__(self, name: str) -> Any:
+        return self.arena.field(self.index, name)
+
+    def __eq__(self, other: object) -> bool:
+        return isinstance(other, NodeView) and other.arena is self.arena and other.index == self.index
+
+    def __hash__(self) -> int:
+        return hash((id(self.arena), self.index))
+
+    def __repr__(self) -> str:
+        return f"NodeView({self.kind.__name__}, {self.index})"
@@ -0,0 +1,174 @@
+from operator import attrgetter
+from types import NoneType, UnionType
+from typing import Any, Callable, Generator, Iterator, TypeVar, Union, get_args, get_origin, get_type_hints
+import compiler.objects.ast as ast
+
+
+def holds_node(annotation: Any) -> bool:
+    """Whether a field annotated with `annotation` holds one node, or possibly None."""
+    members = get_args(annotation) if get_origin(annotation) in (Union, UnionType) else (annotation,)
+    return all(member is NoneType or (isinstance(member, type) and issubclass(member, ast.Expression))
+               for member in members)
+
+
+def holds_nodes(annotation: Any) -> bool:
+    """Whether a field annotated with `annotation` holds a list of nodes."""
+    return get_origin(annotation) is list and holds_node(get_args(annotation)[0])
+
+
+def node_fields(cls: type[ast.Expression]) -> tuple[str, ...]:
+    """Returns the fields of the `structure` of `cls` that hold child nodes. The others,
+    like operators and type annotations, are not walked."""
+    hints = get_type_hints(cls)
+    return tuple(name for name in cls.structure if holds_node(hints[name]) or holds_nodes(hints[name]))
+
+
+# The fields of each node class that hold child expressions, in evaluation order,
+# and which of them hold a list of children instead of a single (possibly None) one.
+child_fields: dict[type[ast.Expression], tuple[str, ...]] = {
+    cls: node_fields(cls) for cls in ast.Expression.__subclasses__()}
+list_fields = frozenset(name for cls, fields in child_fields.items() for name in fields
+                        if holds_nodes(get_type_hints(cls)[name]))
+
+Accessor = Callable[[ast.Expression], list[ast.Expression]]
+
+R = TypeVar("R")
+# Computes the value of a compound node: yields each child whose value it needs,
+# is sent that value back, and returns the value of the node.
+Evaluator = Generator[ast.Expression, R, R]
+
+
+def make_accessor(fields: tuple[str, ...]) -> Accessor:
+    """Returns a function listing the children held in `fields` of a node."""
+    if not fields:
+        return lambda node: []
+    if len(fields) == 1 and fields[0] not in list_fields:
+        get_one = attrgetter(fields[0])
+        return lambda node: [get_one(node)]
+    if not list_fields.intersection(fields):
+        get_all = attrgetter(*fields)
+        return lambda node: [child for child in get_all(node) if child is not None]
+    getters = [(attrgetter(name), name in list_fields) for name in fields]
+
+    def accessor(node: ast.Expression) -> list[ast.Expression]:
+        children = []
+        for getter, is_list in getters:
+            value = getter(node)
+            if is_list:
+                children += value
+            elif value is not None:
+                children.append(value)
+        return children
+    return accessor
+
+
+child_accessors: dict[type[ast.Expression], Accessor] = {cls: make_accessor(fields) for cls, fields in child_fields.items()}
+
+
+def children(node: ast.Expression) -> list[ast.Expression]:
+    """Returns the child expressions of `node` in evaluation order."""
+    return child_accessors[type(node)](node)
+
+
+def walk_preorder(root: ast.Expression) -> Iterator[ast.Expression]:
+    """Yields every node of the tree at `root`, parents before their children."""
+    accessors = child_accessors
+    stack = [root]
+    while stack:
+        node = stack.pop()
+        yield node
+        stack += reversed(accessors[type(node)](node))
+
+
+def walk_postorder(root: ast.Expression) -> Iterator[ast.Expression]:
+    """Yields every node of the tree at `root`, children before their parents."""
+    accessors = child_accessors
+    stack: list[tuple[ast.Expression, bool]] = [(root, False)]
+    while stack:
+        node, expanded = stack.pop()
+        if expanded:
+            yield node
+            continue
+        stack.append((node, True))
+        stack += [(child, False) for child in reversed(accessors[type(node)](node))]
+
+
+def walk(root: ast.Expression, enter: Callable[[ast.Expression], bool | None],
+         leave: Callable[[ast.Expression], None] | None = None) -> None:
+    """Calls `enter` on each node before its children and `leave` after them.
+
+    The children of a node are skipped when `enter` returns False for it."""
+    accessors = child_accessors
+    stack: list[tuple[ast.Expression, bool]] = [(root, False)]
+    while stack:
+        node, entered = stack.pop()
+        if entered:
+            leave(node)  # type: ignore[misc]
+            continue
+        if enter(node) is False:
+            continue
+        if leave is not None:
+            stack.append((node, True))
+        stack += [(child, False) for child in reversed(accessors[type(node)](node))]
+
+
+def evaluate(root: ast.Expression, leaves: dict[type[ast.Expression], Callable[[ast.Expression], R]],
+             compounds: dict[type[ast.Expression], Callable[[ast.Expression], Evaluator[R]]],
+             finished: Callable[[ast.Expression, R], None] | None = None) -> R:
+    """Computes the value of `root` without recursion and returns it.
+
+    The value of a node whose class is in `leaves` is computed directly. For other nodes
+    the evaluator from `compounds` is run, and the children it yields are evaluated in
+    turn, its suspended parents waiting on an explicit stack. The children are therefore
+    visited in the order and at the moment the evaluator asks for them, just as with
+    recursive calls. `finished` is called with every node and its value."""
+    stack: list[tuple[ast.Expression, Evaluator[R]]] = []
+    node: ast.Expression | None = root
+    value: R = None  # type: ignore[assignment]
+    while True:
+        if node is not None:
+            leaf = leaves.get(type(node))
+            if leaf is not None:
+                value = leaf(node)
+                if finished is not None:
+                    finished(node, value)
+            else:
+                stack.append((node, compounds[type(node)](node)))
+                value = None  # type: ignore[assignment]
+        if not stack:
+            return value
+        parent, evaluator = stack[-1]
+        try:
+            node = evaluator.send(value)
+        except StopIteration as done:
+            stack.pop()
+            node = None
+            value = done.value
+            if finished is not None:
+                finished(parent, value)
+
+
+class Visitor:
+    """Base class for passes that handle each node class in its own method.
+
+    `visit_<ClassName>` is called for every node of that class, and `generic_visit` for
+    classes without such a method. The methods are looked up once per visitor instead
+    of once per node."""
+
+    def __init__(self) -> None:
+        self.dispatch: dict[type[ast.Expression], Callable[[ast.Expression], None]] = {
+            cls: getattr(self, f"visit_{cls.__name__}", self.generic_visit) for cls in child_fields
+        }
+
+    def generic_visit(self, node: ast.Expression) -> None:
+        pass
+
+    def visit_preorder(self, root: ast.Expression) -> None:
+        dispatch = self.dispatch
+        for node in walk_preorder(root):
+            dispatch[type(node)](node)
+
+    def visit_postorder(self, root: ast.Expression) -> None:
+        dispatch = self.dispatch
+        for node in walk_postorder(root):
+            dispatch[type(node)](node)
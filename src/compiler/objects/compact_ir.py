@@ -0,0 +1,310 @@
+from array import array
+from typing import Any, Iterable, Iterator, Literal as Lit, Mapping
+from compiler.objects.ir_variables import IRVar
+from compiler.objects.node_types import Type
+from compiler.objects.source_location import Source_location
+import compiler.objects.ir_instructions as ir
+
+NONE = -1
+
+# Opcodes, in the order of their instruction classes.
+instruction_classes: tuple[type[ir.Instruction], ...] = (
+    ir.LoadBoolConst, ir.LoadIntConst, ir.Copy, ir.Call, ir.Label, ir.Jump, ir.CondJump,
+)
+opcodes: dict[type[ir.Instruction], int] = {cls: code for code, cls in enumerate(instruction_classes)}
+LOAD_BOOL_CONST, LOAD_INT_CONST, COPY, CALL, LABEL, JUMP, COND_JUMP = range(len(instruction_classes))
+
+
+class CompactIR:
+    """IR instructions stored as rows of parallel typed arrays, with dense integer
+    variables and labels.
+
+    Every instruction has an opcode and up to three operands `a`, `b` and `c`:
+
+        LoadBoolConst, LoadIntConst   a = constant index, b = dest
+        Copy                          a = source, b = dest
+        Call                          a = function, b = dest, c = position of the
+                                      argument count in `args`, followed by the arguments
+        Label, Jump                   a = label
+        CondJump                      a = cond, b = then label, c = else label
+
+    A variable's type is an index into `types` kept in the side array `var_types`, with
+    0 for unknown. Locations are stored as line and column.
+
+    This is a storage format only. Nothing in the compiler builds or reads one:
+    generate_ir, the optimizations and generate_assembly all work on instruction
+    objects. `from_instructions` and `to_instructions` convert between the two, and
+    `used_vars`, `defined_var` and `variables` are the start of what a pass over the
+    rows would need."""
+    file_name: str
+    ops: array
+    a: array
+    b: array
+    c: array
+    lines: array
+    columns: array
+    args: array
+    constants: list[Any]
+    var_names: list[str | None]
+    var_types: array
+    types: list[Type | None]
+    label_names: list[str]
+    label_lines: array
+    label_columns: array
+    # The instruction index of each label, or NONE before it is emitted.
+    label_positions: array
+
+    def __init__(self, file_name: str = "") -> None:
+        self.file_name = file_name
+        self.ops = array("B")
+        self.a = array("i")
+        self.b = array("i")
+        self.c = array("i")
+        self.lines = array("I")
+        self.columns = array("I")
+        self.args = array("i")
+        self.constants = []
+        self._constant_indices: dict[tuple[type, Any], int] = {}
+        self.var_names = []
+        self._var_ids: dict[str, int] = {}
+        self.var_types = array("H")
+        self._temporaries = 0
+        self._unnamed = 0
+        self.types = [None]
+        self._type_codes: dict[Type | None, int] = {None: 0}
+        self.label_names = []
+        self.label_lines = array("I")
+        self.label_columns = array("I")
+        self.label_positions = array("i")
+
+    def __len__(self) -> int:
+        return len(self.ops)
+
+    # === Variables and labels ===
+
+    def var(self, name: str, t: Type | None = None) -> int:
+        """Returns the number of the variable called `name`, adding it if it is new.
+        A given type replaces the variable's current one."""
+        number = self._var_ids.get(name)
+        if number is None:
+            number = len(self.var_names)
+            self._var_ids[name] = number
+            self.var_names.append(name)
+            self.var_types.append(0)
+        if t is not None:
+            self.var_types[number] = self._type_code(t)
+        return number
+
+    def new_var(self, t: Type | None = None) -> int:
+        """Adds a temporary variable. It is only given a name, like the IR generator's
+        `x1`, `x2`..., when one is asked for."""
+        self.var_names.append(None)
+        self._unnamed += 1
+        self.var_types.append(0 if t is None else self._type_code(t))
+        return len(self.var_names) - 1
+
+    def names(self) -> list[str]:
+        """Returns the name of every variable, first naming the temporaries that have none."""
+        if self._unnamed:
+            self._unnamed = 0
+            for number, name in enumerate(self.var_names):
+                if name is None:
+                    self._temporaries += 1
+                    while f"x{self._temporaries}" in self._var_ids:
+                        self._temporaries += 1
+                    name = f"x{self._temporaries}"
+                    self._var_ids[name] = number
+                    self.var_names[number] = name
+        return self.var_names  # type: ignore[return-value]
+
+    def var_type(self, var: int) -> Type | None:
+        return self.types[self.var_types[var]]
+
+    def _type_code(self, t: Type) -> int:
+        code = self._type_codes.get(t)
+        if code is None:
+            code = len(self.types)
+            self.types.append(t)
+            self._type_codes[t] = code
+        return code
+
+    def label(self, name: str, loc: Source_location) -> int:
+        self.label_names.append(name)
+        self._append_location(self.label_lines, self.label_columns, loc)
+        self.label_positions.append(NONE)
+        return len(self.label_names) - 1
+
+    def _constant(self, value: Any) -> int:
+        key = (type(value), value)
+        index = self._constant_indices.get(key)
+        if index is None:
+            index = len(self.constants)
+            self.constants.append(value)
+            self._constant_indices[key] = index
+        return index
+
+    def _append_location(self, lines: array, columns: array, loc: Source_location) -> None:
+        self.file_name = self.file_name or loc.file
+        lines.append(loc.line)
+        columns.append(loc.column)
+
+    def _location(self, line: int, column: int) -> Source_location:
+        return Source_location(self.file_name, line, column)
+
+    def location(self, index: int) -> Source_location:
+        return self._location(self.lines[index], self.columns[index])
+
+    # === Emitting instructions ===
+
+    def emit(self, op: int, loc: Source_location, a: int = NONE, b: int = NONE, c: int = NONE) -> int:
+        """Appends one instruction row and returns its index."""
+        self.ops.append(op)
+        self.a.append(a)
+        self.b.append(b)
+        self.c.append(c)
+        self._append_location(self.lines, self.columns, loc)
+        return len(self.ops) - 1
+
+    def load_bool_const(self, loc: Source_location, value: Lit["true", "false"], dest: int) -> int:
+        return self.emit(LOAD_BOOL_CONST, loc, self._constant(value), dest)
+
+    def load_int_const(self, loc: Source_location, value: int, dest: int) -> int:
+        return self.emit(LOAD_INT_CONST, loc, self._constant(value), dest)
+
+    def copy(self, loc: Source_location, source: int, dest: int) -> int:
+        return self.emit(COPY, loc, source, dest)
+
+    def call(self, loc: Source_location, fun: int, args: Iterable[int], dest: int) -> int:
+        start = len(self.args)
+        arguments = self.args
+        arguments.append(0)
+        arguments.extend(args)
+        arguments[start] = len(arguments) - start - 1
+        return self.emit(CALL, loc, fun, dest, start)
+
+    def place_label(self, loc: Source_location, label: int) -> int:
+        self.label_positions[label] = len(self.ops)
+        return self.emit(LABEL, loc, label)
+
+    def jump(self, loc: Source_location, label: int) -> int:
+        return self.emit(JUMP, loc, label)
+
+    def cond_jump(self, loc: Source_location, cond: int, then_label: int, else_label: int) -> int:
+        return self.emit(COND_JUMP, loc, cond, then_label, else_label)
+
+    # === Reading instructions ===
+
+    def call_args(self, index: int) -> array:
+        start = self.c[index]
+        return self.args[start + 1:start + 1 + self.args[start]]
+
+    def used_vars(self, index: int) -> list[int]:
+        """Returns the variables instruction `index` reads."""
+        op = self.ops[index]
+        if op == COPY or op == COND_JUMP:
+            return [self.a[index]]
+        if op == CALL:
+            return [self.a[index], *self.call_args(index)]
+        return []
+
+    def defined_var(self, index: int) -> int:
+        """Returns the variable instruction `index` writes, or NONE."""
+        op = self.ops[index]
+        if op == LOAD_BOOL_CONST or op == LOAD_INT_CONST or op == COPY or op == CALL:
+            return self.b[index]
+        return NONE
+
+    def variables(self) -> list[int]:
+        """Returns every variable the instructions mention, in order of first mention,
+        in the same order as get_all_ir_variables visits them."""
+        seen = bytearray(len(self.var_names))
+        result = []
+        ops, a, b, c, args = self.ops, self.a, self.b, self.c, self.args
+        for index in range(len(ops)):
+            op = ops[index]
+            if op == LABEL or op == JUMP:
+                continue
+            if op == CALL:
+                start = c[index]
+                mentioned = [a[index], *args[start + 1:start + 1 + args[start]], b[index]]
+            elif op == COPY or op == COND_JUMP:
+                mentioned = [a[index], b[index]] if op == COPY else [a[index]]
+            else:
+                mentioned = [b[index]]
+            for var in mentioned:
+                if not seen[var]:
+                    seen[var] = 1
+                    result.append(var)
+        return result
+
+    # === Adapters ===
+
+    def _label_object(self, label: int) -> ir.Label:
+        return ir.Label(self._location(self.label_lines[label], self.label_columns[label]), self.label_names[label])
+
+    def instruction(self, index: int) -> ir.Instruction:
+        """Builds the instruction object of row `index`."""
+        op = self.ops[index]
+        loc = self.location(index)
+        a, b = self.a[index], self.b[index]
+        names = self.names()
+        if op == LOAD_BOOL_CONST:
+            return ir.LoadBoolConst(loc, self.constants[a], IRVar(names[b]))
+        if op == LOAD_INT_CONST:
+            return ir.LoadIntConst(loc, self.constants[a], IRVar(names[b]))
+        if op == COPY:
+            return ir.Copy(loc, IRVar(names[a]), IRVar(names[b]))
+        if op == CALL:
+            return ir.Call(loc, IRVar(names[a]), [IRVar(names[arg]) for arg in self.call_args(index)], IRVar(names[b]))
+        if op == LABEL:
+            return ir.Label(loc, self.label_names[a])
+        if op == JUMP:
+            return ir.Jump(loc, self._label_object(a))
+        return ir.CondJump(loc, IRVar(names[a]), self._label_object(b), self._label_object(self.c[index]))
+
+    def __iter__(self) -> Iterator[ir.Instruction]:
+        self.names()
+        for index in range(len(self.ops)):
+            yield self.instruction(index)
+
+    def to_instructions(self) -> list[ir.Instruction]:
+        return list(self)
+
+    def to_var_types(self) -> dict[IRVar, Type]:
+        return {IRVar(name): self.types[code] for name, code in zip(self.names(), self.var_types) if code != 0}  # type: ignore[misc]
+
+    @staticmethod
+    def from_instructions(instructions: Iterable[ir.Instruction], var_types: Mapping[IRVar, Type] | None = None) -> "CompactIR":
+        compact = CompactIR()
+        if var_types is not None:
+            for var, t in var_types.items():
+                compact.var(var.name, t)
+        labels: dict[str, int] = {}
+
+        def label(target: ir.Label) -> int:
+            number = labels.get(target.name)
+            if number is None:
+                number = labels[target.name] = compact.label(target.name, target.location)
+            return number
+
+        var_number = compact.var
+        for insn in instructions:
+            loc = insn.location
+            match insn:
+                case ir.LoadBoolConst():
+                    compact.load_bool_const(loc, insn.value, var_number(insn.dest.name))
+                case ir.LoadIntConst():
+                    compact.load_int_const(loc, insn.value, var_number(insn.dest.name))
+                case ir.Copy():
+                    compact.copy(loc, var_number(insn.source.name), var_number(insn.dest.name))
+                case ir.Call():
+                    compact.call(loc, var_number(insn.fun.name), [var_number(arg.name) for arg in insn.args], var_number(insn.dest.name))
+                case ir.Label():
+                    compact.place_label(loc, label(insn))
+                case ir.Jump():
+                    compact.jump(loc, label(insn.label))
+                case ir.CondJump():
+                    compact.cond_jump(loc, var_number(insn.cond.name), label(insn.then_label), label(insn.else_label))
+                case _:
+                    raise Exception(f"{loc}: unknown instruction {insn}")
+        return compact
@@ -1,10 +1,13 @@
 from dataclasses import dataclass
 import dataclasses
-from typing import Any
+from typing import Any, Literal as Lit
 from compiler.objects.ir_variables import IRVar
 from compiler.objects.source_location import Source_location as Location
 
 
+# The fields of each instruction class that __str__ prints, looked up once per class.
+_printed_fields: dict[type, tuple[str, ...]] = {}
+
 @dataclass(frozen=True)
 class Instruction():
     """Base class for IR instructions."""
@@ -18,17 +21,17 @@ class Instruction():
                 return f'[{", ".join(format_value(e) for e in v)}]'
             else:
                 return str(v)
-        args = ', '.join(
-            format_value(getattr(self, field.name))
-            for field in dataclasses.fields(self)
-            if field.name != 'location'
-        )
+        names = _printed_fields.get(type(self))
+        if names is None:
+            names = _printed_fields[type(self)] = tuple(
+                field.name for field in dataclasses.fields(self) if field.name != 'location')
+        args = ', '.join(format_value(getattr(self, name)) for name in names)
         return f'{type(self).__name__}({args})'
     
 @dataclass(frozen=True)
 class LoadBoolConst(Instruction):
-    """Loads a boolean constant value to `dest`."""
-    value: bool
+    """Loads a boolean constant value, written as in the source, to `dest`."""
+    value: Lit["true", "false"]
     dest: IRVar
 
 @dataclass(frozen=True)
@@ -65,4 +68,11 @@ class CondJump(Instruction):
     """Continues execution from `then_label` if `cond` is true, otherwise from `else_label`."""
     cond: IRVar
     then_label: Label
-    else_label: Label
\ No newline at end of file
+    else_label: Label
+
+@dataclass(frozen=True)
+class Phi(Instruction):
+    """Sets `dest` to `args[i]` when its block was entered from the block's i:th
+    predecessor. Only appears in SSA form (see compiler.ssa), at the start of a block."""
+    args: list[IRVar]
+    dest: IRVar
@@ -1,27 +1,63 @@
-from dataclasses import dataclass
+from dataclasses import dataclass, field
+from typing import Any, ClassVar, Iterable
 
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, eq=False, init=False)
 class Type():
-    """Base Class"""
+    """Base Class
 
-@dataclass(frozen=True)
+    Types are interned: constructing a type returns the one canonical object for it,
+    so types are equal exactly when they are the same object, and hash by their
+    precomputed `_hash`."""
+    _hash: int = field(init=False, repr=False)
+
+    def __hash__(self) -> int:
+        return self._hash
+
+@dataclass(frozen=True, eq=False, init=False)
 class BasicType(Type):
     name: str
 
-    def __eq__(self, other):
-        if self.name == other.name:
-            return True
+    _instances: ClassVar[dict[str, "BasicType"]] = {}
+
+    def __new__(cls, name: str) -> "BasicType":
+        instance = cls._instances.get(name)
+        if instance is None:
+            instance = super().__new__(cls)
+            object.__setattr__(instance, "name", name)
+            object.__setattr__(instance, "_hash", hash((cls, name)))
+            cls._instances[name] = instance
+        return instance
+
+    def __reduce__(self) -> tuple[Any, ...]:
+        return (BasicType, (self.name,))
 
 Int = BasicType("Int")
 Bool = BasicType("Bool")
 Unit = BasicType("Unit")
+# The parameter type of the builtin `==` and `!=`, which take two values of any one basic
+# type. The typechecker checks their arguments itself; this only types the functions.
+AnyBasic = BasicType("Any")
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, eq=False, init=False)
 class FunType(Type):
-    parameter_types: list[BasicType]
+    parameter_types: tuple[BasicType, ...]
     result_type: BasicType
 
-    def __eq__(self, other):
-        if self.parameter_types == other.parameter_types and self.result_type == other.result_type:
-            return True
\ No newline at end of file
+    _instances: ClassVar[dict[tuple[Any, ...], "FunType"]] = {}
+
+    def __new__(cls, parameter_types: Iterable[BasicType], result_type: BasicType) -> "FunType":
+        # Parameters are canonical objects, so their identity is enough to tell
+        # function types apart.
+        key = (*parameter_types, result_type)
+        instance = cls._instances.get(key)
+        if instance is None:
+            instance = super().__new__(cls)
+            object.__setattr__(instance, "parameter_types", key[:-1])
+            object.__setattr__(instance, "result_type", result_type)
+            object.__setattr__(instance, "_hash", hash((cls, key)))
+            cls._instances[key] = instance
+        return instance
+
+    def __reduce__(self) -> tuple[Any, ...]:
+        return (FunType, (self.parameter_types, self.result_type))
@@ -1,14 +1,14 @@
 from __future__ import annotations
 from dataclasses import dataclass
-from typing import Optional
+from typing import Mapping, Optional
 
-from compiler.objects.node_types import BasicType
+from compiler.objects.node_types import Type
 from compiler.objects.ir_variables import IRVar
 
 
 @dataclass
 class SymTab():
-    variables: dict[str, BasicType | IRVar]
+    variables: Mapping[str, Type | IRVar]
     parent: Optional[SymTab] = None
 
     def require(self, vari: str):
@@ -22,5 +22,10 @@ class SymTab():
             else:
                 return None
             
-    def add_local(self, vari: str, val: BasicType | IRVar):
-        self.variables[vari] = val
\ No newline at end of file
+    def add_local(self, vari: str, val: Type | IRVar):
+        self.variables[vari] = val  # type: ignore[index]
+
+    def overlay(self) -> SymTab:
+        """Returns a new empty scope on top of this one, e.g. for one compilation
+        on top of the read-only builtins."""
+        return SymTab({}, self)
\ No newline at end of file
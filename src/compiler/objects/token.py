@@ -1,10 +1,22 @@
 from dataclasses import dataclass
-from typing import Literal
+from typing import Literal, Protocol
 from compiler.objects.source_location import Source_location
 from compiler.assets.test_source import L
 
 TokenType = Literal["int_literal", "identifier", "operator", "punctuation", "end"]
 
+
+class TokenLike(Protocol):
+    """What the parsers read of a token: a Token, or a view of one such as
+    token_buffer.BufferedToken."""
+    @property
+    def loc(self) -> Source_location: ...
+    @property
+    def type(self) -> TokenType: ...
+    @property
+    def text(self) -> str: ...
+
+
 @dataclass
 class Token:
     loc: Source_location
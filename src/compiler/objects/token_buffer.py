@@ -0,0 +1,90 @@
+from array import array
+from bisect import bisect_right
+from typing import Iterator
+from compiler.objects.source_location import Source_location
+from compiler.objects.token import Token, TokenType
+
+token_kinds: tuple[TokenType, ...] = ("identifier", "int_literal", "operator", "punctuation", "end")
+token_kind_codes: dict[str, int] = {kind: code for code, kind in enumerate(token_kinds)}
+END = token_kind_codes["end"]
+
+
+class TokenBuffer:
+    """Struct-of-arrays token store over a source text.
+
+    A token is just its kind code, start offset and length; the text is sliced from
+    the source and a Source_location is only built on request, by binary search over
+    the offsets where lines start. The last token is always the "end" token."""
+    source: str
+    file_name: str
+    kinds: array
+    starts: array
+    lengths: array
+    line_starts: array
+
+    def __init__(self, source: str, file_name: str) -> None:
+        self.source = source
+        self.file_name = file_name
+        self.kinds = array("B")
+        self.starts = array("q")
+        self.lengths = array("L")
+        self.line_starts = array("q", [0])
+
+    def __len__(self) -> int:
+        return len(self.kinds)
+
+    def __getitem__(self, index: int) -> "BufferedToken":
+        if index < 0:
+            index += len(self.kinds)
+        if not 0 <= index < len(self.kinds):
+            raise IndexError("token index out of range")
+        return BufferedToken(self, index)
+
+    def __iter__(self) -> Iterator["BufferedToken"]:
+        for index in range(len(self.kinds)):
+            yield BufferedToken(self, index)
+
+    def type(self, index: int) -> TokenType:
+        return token_kinds[self.kinds[index]]
+
+    def text(self, index: int) -> str:
+        if self.kinds[index] == END:
+            return "ending"
+        start = self.starts[index]
+        return self.source[start:start + self.lengths[index]]
+
+    def location(self, index: int) -> Source_location:
+        """Builds the Source_location of the token at `index`."""
+        if self.kinds[index] == END:
+            return Source_location(self.file_name, len(self.line_starts) + 1, 0)
+        return self.offset_location(self.starts[index])
+
+    def offset_location(self, offset: int) -> Source_location:
+        """Builds the Source_location of a character offset in the source."""
+        line = bisect_right(self.line_starts, offset)
+        return Source_location(self.file_name, line, offset - self.line_starts[line - 1] + 1)
+
+
+class BufferedToken:
+    """Lightweight view of one token in a TokenBuffer, usable wherever a TokenLike is read."""
+    __slots__ = ("buffer", "index", "type", "text")
+    buffer: TokenBuffer
+    index: int
+    type: TokenType
+    text: str
+
+    def __init__(self, buffer: TokenBuffer, index: int) -> None:
+        self.buffer = buffer
+        self.index = index
+        self.type = buffer.type(index)
+        self.text = buffer.text(index)
+
+    @property
+    def loc(self) -> Source_location:
+        return self.buffer.location(self.index)
+
+    def __eq__(self, other: object) -> bool:
+        return bool(Token(self.loc, self.type, self.text) == other)
+
+    def __repr__(self) -> str:
+        return f"Token(loc={self.loc!r}, type={self.type!r}, text={self.text!r})"
@@ -0,0 +1,36 @@
+from typing import Iterable, Iterator
+from compiler.objects.token import Token, TokenLike
+
+
+class TokenStream:
+    """Cursor over tokens that only remembers the previous and the current token.
+
+    Works the same over a list of tokens and over a lazy iterator such as
+    `Tokenizer.stream`, so the parser never needs the whole token list in memory."""
+    _tokens: Iterator[TokenLike]
+    _prev: TokenLike | None
+    _current: TokenLike | None
+
+    def __init__(self, tokens: Iterable[TokenLike]) -> None:
+        self._tokens = iter(tokens)
+        self._prev = None
+        self._current = next(self._tokens, None)
+
+    def peek(self) -> TokenLike:
+        """Returns the current token, or an "end" token once the input is exhausted."""
+        if self._current is None:
+            if self._prev is None:
+                raise Exception("The input is empty")
+            return Token(loc=self._prev.loc, type="end", text="")
+        return self._current
+
+    def peek_prev(self) -> TokenLike:
+        """Returns the last consumed token, or an "end" token before the first one."""
+        if self._prev is None:
+            return Token(loc=self.peek().loc, type="end", text="")
+        return self._prev
+
+    def advance(self) -> None:
+        """Moves past the current token."""
+        self._prev = self._current if self._current is not None else self.peek()
+        self._current = next(self._tokens, None)
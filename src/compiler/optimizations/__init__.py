@@ -0,0 +1,25 @@
+import compiler.objects.ir_instructions as ir
+from compiler.ssa import from_ssa, to_ssa
+from compiler.optimizations.copy_propagation import propagate_copies
+from compiler.optimizations.dead_code import eliminate_dead_code
+from compiler.optimizations.gvn import gvn
+from compiler.optimizations.induction import reduce_strength
+from compiler.optimizations.loops import hoist_invariants, rotate_loops, unroll_loops
+from compiler.optimizations.sccp import sccp
+from compiler.optimizations.simplify import simplify
+
+
+def optimize(instructions: list[ir.Instruction], unroll_factor: int = 4) -> list[ir.Instruction]:
+    """Runs the optimization passes over the output of generate_ir. The passes work on
+    the control-flow graph in SSA form, which is lowered back to plain instructions
+    for generate_assembly. Loops are unrolled by `unroll_factor` (see unroll_loops)
+    before that, so the copies are optimized too."""
+    cfg = to_ssa(unroll_loops(rotate_loops(instructions), unroll_factor))
+    cfg = sccp(cfg)
+    cfg = simplify(cfg)
+    cfg = propagate_copies(cfg)
+    cfg = gvn(cfg)
+    cfg = hoist_invariants(cfg)
+    cfg = reduce_strength(cfg)
+    cfg = eliminate_dead_code(cfg)
+    return from_ssa(cfg)
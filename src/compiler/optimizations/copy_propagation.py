@@ -0,0 +1,35 @@
+from compiler.cfg import ControlFlowGraph
+from compiler.dataflow import rewrite
+from compiler.objects.ir_variables import IRVar
+import compiler.objects.ir_instructions as ir
+
+
+def propagate_copies(cfg: ControlFlowGraph) -> ControlFlowGraph:
+    """Copy propagation over a graph in SSA form: every read of the dest of a Copy
+    reads its source instead, and the Copies are deleted.
+
+    In SSA form neither variable of a Copy is written again, and the source is
+    written before the Copy on every path, so the two hold the same value wherever
+    the dest can be read. The instructions are rewritten in place."""
+    sources: dict[IRVar, IRVar] = {}
+    for block in cfg.blocks:
+        for insn in block.instructions:
+            if isinstance(insn, ir.Copy) and insn.source != insn.dest:
+                sources[insn.dest] = insn.source
+
+    def source(var: IRVar) -> IRVar:
+        # Follows chains of copies to the first source, shortening them on the way.
+        root = var
+        while root in sources:
+            root = sources[root]
+        while var in sources and sources[var] != root:
+            sources[var], var = root, sources[var]
+        return root
+
+    if not sources:
+        return cfg
+    for block in cfg.blocks:
+        block.instructions = [
+            rewrite(insn, source) for insn in block.instructions
+            if not (isinstance(insn, ir.Copy) and insn.dest in sources)]
+    return cfg
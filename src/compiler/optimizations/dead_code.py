@@ -0,0 +1,57 @@
+from compiler.assets.intrinsics import all_intrinsics
+from compiler.cfg import ControlFlowGraph
+from compiler.dataflow import defined_var, used_vars
+from compiler.ir_interpreter import wrap
+from compiler.objects.ir_variables import IRVar
+import compiler.objects.ir_instructions as ir
+
+# Operators that trap on some divisors; the others only compute their result.
+trapping = frozenset(["/", "%"])
+
+
+def has_effect(insn: ir.Instruction, ints: dict[IRVar, int]) -> bool:
+    """Tells if `insn` must run even when nothing reads its result: jumps and labels,
+    the builtins like print_int and read_int, and divisions unless the divisor is a
+    constant that can't trap."""
+    match insn:
+        case ir.Call():
+            name = insn.fun.name
+            if name not in all_intrinsics:
+                return True
+            return name in trapping and ints.get(insn.args[1], 0) in (0, -1)
+        case ir.LoadIntConst() | ir.LoadBoolConst() | ir.Copy() | ir.Phi():
+            return False
+    return True
+
+
+def eliminate_dead_code(cfg: ControlFlowGraph) -> ControlFlowGraph:
+    """Deletes the instructions of a graph in SSA form whose results are never needed.
+
+    The instructions with an effect are live, and so, transitively, are the
+    instructions writing the variables a live instruction reads; the rest are
+    deleted. Unlike deleting the writes of variables that are not live after them,
+    this also deletes values that only feed themselves around a loop, like a counter
+    that is never printed. The instructions are rewritten in place."""
+    ints = {insn.dest: wrap(insn.value) for block in cfg.blocks for insn in block.instructions
+            if isinstance(insn, ir.LoadIntConst)}
+    definitions: dict[IRVar, ir.Instruction] = {}
+    work: list[ir.Instruction] = []
+    for block in cfg.blocks:
+        for insn in block.instructions:
+            dest = defined_var(insn)
+            if dest is not None:
+                definitions[dest] = insn
+            if has_effect(insn, ints):
+                work.append(insn)
+
+    live: set[int] = {id(insn) for insn in work}
+    while work:
+        for var in used_vars(work.pop()):
+            definition = definitions.get(var)
+            if definition is not None and id(definition) not in live:
+                live.add(id(definition))
+                work.append(definition)
+
+    for block in cfg.blocks:
+        block.instructions = [insn for insn in block.instructions if id(insn) in live]
+    return cfg
@@ -0,0 +1,94 @@
+from typing import Hashable
+from compiler.assets.intrinsics import all_intrinsics
+from compiler.cfg import ControlFlowGraph, dominator_tree
+from compiler.dataflow import rewrite
+from compiler.ir_interpreter import wrap
+from compiler.objects.ir_variables import IRVar
+import compiler.objects.ir_instructions as ir
+
+commutative = frozenset(["+", "*", "==", "!="])
+# Comparisons written the other way around, as in `a > b` for `b < a`.
+mirrored = {">": "<", ">=": "<="}
+
+
+def expression(insn: ir.Instruction, block: int) -> Hashable | None:
+    """Returns a key that is the same for instructions computing the same value from
+    the same variables, or None if `insn` computes nothing that can be reused."""
+    match insn:
+        case ir.LoadIntConst():
+            return ("int", wrap(insn.value))
+        case ir.LoadBoolConst():
+            return ("bool", insn.value in ("true", True))
+        case ir.Call():
+            name = insn.fun.name
+            if name not in all_intrinsics:
+                return None
+            args = tuple(insn.args)
+            if name in mirrored:
+                name, args = mirrored[name], args[::-1]
+            elif name in commutative:
+                args = tuple(sorted(args, key=lambda var: var.name))
+            return (name, args)
+        case ir.Phi():
+            # Phis only choose the same value when they are in the same block.
+            return ("phi", block, tuple(insn.args))
+    return None
+
+
+def gvn(cfg: ControlFlowGraph) -> ControlFlowGraph:
+    """Global value numbering over a graph in SSA form, by walking the dominator tree.
+
+    An operator call, constant load or Phi that computes what an instruction in a
+    dominating block (or earlier in the same block) already computed is deleted, and
+    its variable is read from the earlier one instead. Each expression is only
+    available in the subtree of the dominator tree under the block that computed it.
+    A Phi whose arguments are all the same variable is replaced by it as well.
+
+    Calls that could trap can be reused too: if the first one trapped, the program
+    ended before the second. The instructions are rewritten in place."""
+    children = dominator_tree(cfg.dominators())
+    replaced: dict[IRVar, IRVar] = {}
+    available: dict[Hashable, IRVar] = {}
+
+    def number(var: IRVar) -> IRVar:
+        while var in replaced:
+            var = replaced[var]
+        return var
+
+    # Each entry is a block and, once it is done, the expressions it made available,
+    # to forget once its subtree in the dominator tree is done.
+    work: list[tuple[int, list[Hashable] | None]] = [(0, None)] if cfg.blocks else []
+    while work:
+        index, added = work.pop()
+        if added is not None:
+            for key in added:
+                del available[key]
+            continue
+        block = cfg.blocks[index]
+        added = []
+        instructions: list[ir.Instruction] = []
+        for insn in block.instructions:
+            insn = rewrite(insn, number)
+            if isinstance(insn, ir.Phi):
+                distinct = {arg for arg in insn.args if arg != insn.dest}
+                if len(distinct) == 1:
+                    replaced[insn.dest] = distinct.pop()
+                    continue
+            key = expression(insn, index)
+            if key is not None:
+                existing = available.get(key)
+                if existing is not None:
+                    replaced[insn.dest] = existing  # type: ignore[attr-defined]
+                    continue
+                available[key] = insn.dest  # type: ignore[attr-defined]
+                added.append(key)
+            instructions.append(insn)
+        block.instructions = instructions
+        work.append((index, added))
+        work.extend((child, None) for child in reversed(children[index]))
+
+    # The Phi arguments coming in along back edges were read before their blocks were seen.
+    if replaced:
+        for block in cfg.blocks:
+            block.instructions = [rewrite(insn, number) for insn in block.instructions]
+    return cfg
@@ -0,0 +1,167 @@
+from dataclasses import dataclass
+from compiler.cfg import NONE, ControlFlowGraph, Loop, find_loops
+from compiler.dataflow import defined_var, rewrite
+from compiler.ir_interpreter import wrap
+from compiler.objects.ir_variables import IRVar
+from compiler.optimizations.loops import preheader
+import compiler.objects.ir_instructions as ir
+
+
+@dataclass
+class InductionVariable:
+    """A variable that goes up by the same constant on every iteration of a loop: a
+    Phi in the loop header choosing `init` on entry and `next = phi + step` after each
+    iteration."""
+    phi: IRVar
+    init: IRVar
+    next: IRVar
+    step: int
+
+
+def induction_variables(cfg: ControlFlowGraph, loop: Loop, entry: int, ints: dict[IRVar, int]) -> list[InductionVariable]:
+    """Finds the basic induction variables of a loop in SSA form with a single latch,
+    entered from block `entry`. `ints` are the variables known to hold int constants."""
+    header = cfg.blocks[loop.header]
+    if len(loop.latches) != 1 or len(header.preds) != 2:
+        return []
+    from_entry = header.preds.index(entry)
+    from_latch = header.preds.index(loop.latches[0])
+    calls = {insn.dest: insn for index in loop.blocks for insn in cfg.blocks[index].instructions
+             if isinstance(insn, ir.Call)}
+    result = []
+    for insn in header.instructions:
+        if not isinstance(insn, ir.Phi):
+            continue
+        update = calls.get(insn.args[from_latch])
+        if update is None or update.fun.name not in ("+", "-") or len(update.args) != 2:
+            continue
+        a, b = update.args
+        if update.fun.name == "+" and b == insn.dest and a in ints:
+            a, b = b, a
+        if a == insn.dest and b in ints:
+            step = ints[b] if update.fun.name == "+" else wrap(-ints[b])
+            result.append(InductionVariable(insn.dest, insn.args[from_entry], update.dest, step))
+    return result
+
+
+def reduce_strength(cfg: ControlFlowGraph) -> ControlFlowGraph:
+    """Strength reduction of multiplications by induction variables, over a graph in
+    SSA form.
+
+    In a loop with an induction variable i going up by c, `i * m` with m not written
+    in the loop goes up by c * m on every iteration. It becomes a new induction
+    variable: a Phi starting from `init * m`, computed in the preheader, and updated
+    with an addition where i is. Shifts by constants, which simplify makes of
+    multiplications by powers of two, are counted as multiplications too. The
+    instructions are rewritten in place."""
+    ints: dict[IRVar, int] = {}
+    written: dict[IRVar, int] = {}
+    for block in cfg.blocks:
+        for insn in block.instructions:
+            dest = defined_var(insn)
+            if dest is not None:
+                written[dest] = block.index
+            if isinstance(insn, ir.LoadIntConst) and -2**63 <= insn.value < 2**63:
+                ints[insn.dest] = insn.value
+    replaced: dict[IRVar, IRVar] = {}
+    created = 0
+
+    def new_var(prefix: str) -> IRVar:
+        nonlocal created
+        created += 1
+        return IRVar(f"{prefix}.{created}")
+
+    for loop in find_loops(cfg, cfg.dominators()):
+        entry = preheader(cfg, loop)
+        if entry is None:
+            continue
+        variables = {iv.phi: iv for iv in induction_variables(cfg, loop, entry, ints)}
+        if not variables:
+            continue
+        header = cfg.blocks[loop.header]
+        from_latch = header.preds.index(loop.latches[0])
+        setup: list[ir.LoadIntConst | ir.Call] = []
+        # The new updates, to go right after the update of their induction variable.
+        updates: dict[IRVar, list[ir.Call]] = {}
+        phis: list[ir.Phi] = []
+        for index in sorted(loop.blocks):
+            block = cfg.blocks[index]
+            kept: list[ir.Instruction] = []
+            for insn in block.instructions:
+                factor = multiplication(insn, variables, ints, written, loop)
+                if factor is None:
+                    kept.append(insn)
+                    continue
+                assert isinstance(insn, ir.Call)
+                iv, operator, operand = factor
+                loc = insn.location
+                start, step, phi, updated = new_var("r"), new_var("r"), new_var("r"), new_var("r")
+                if iv.init in ints and operand in ints:
+                    value = ints[iv.init] * ints[operand] if operator == "*" else ints[iv.init] << ints[operand]
+                    setup.append(ir.LoadIntConst(loc, wrap(value), start))
+                else:
+                    setup.append(ir.Call(loc, IRVar(operator), [iv.init, operand], start))
+                if operator == "*" and operand in ints:
+                    setup.append(ir.LoadIntConst(loc, wrap(iv.step * ints[operand]), step))
+                elif operator == "<<":
+                    setup.append(ir.LoadIntConst(loc, wrap(iv.step << ints[operand]), step))
+                else:
+                    increment = new_var("r")
+                    setup.append(ir.LoadIntConst(loc, iv.step, increment))
+                    setup.append(ir.Call(loc, IRVar("*"), [increment, operand], step))
+                args = [start] * len(header.preds)
+                args[from_latch] = updated
+                phis.append(ir.Phi(loc, args, phi))
+                updates.setdefault(iv.next, []).append(ir.Call(loc, IRVar("+"), [phi, step], updated))
+                replaced[insn.dest] = phi
+            block.instructions = kept
+        if not phis:
+            continue
+        pre = cfg.blocks[entry].instructions
+        end = len(pre) - 1 if pre and isinstance(pre[-1], ir.Jump) else len(pre)
+        pre[end:end] = setup
+        at = 1 if header.label is not None else 0
+        header.instructions[at:at] = phis
+        # The new variables are written in this loop, or in front of it, for the loops
+        # containing it to see.
+        for insn in setup:
+            written[insn.dest] = entry
+        for insn in phis:
+            written[insn.dest] = loop.header
+        for index in loop.blocks:
+            block = cfg.blocks[index]
+            instructions: list[ir.Instruction] = []
+            for insn in block.instructions:
+                instructions.append(insn)
+                dest = defined_var(insn)
+                if dest is not None and dest in updates:
+                    for update in updates.pop(dest):
+                        instructions.append(update)
+                        written[update.dest] = index
+            block.instructions = instructions
+
+    if replaced:
+        for block in cfg.blocks:
+            block.instructions = [rewrite(insn, lambda var: replaced.get(var, var)) for insn in block.instructions]
+    return cfg
+
+
+def multiplication(
+    insn: ir.Instruction,
+    variables: dict[IRVar, InductionVariable],
+    ints: dict[IRVar, int],
+    written: dict[IRVar, int],
+    loop: Loop
+) -> tuple[InductionVariable, str, IRVar] | None:
+    """Returns the induction variable `insn` multiplies, with the operator and the other
+    operand, if it is a multiplication by a value the loop does not change."""
+    if not isinstance(insn, ir.Call) or len(insn.args) != 2:
+        return None
+    a, b = insn.args
+    if insn.fun.name == "*" and b in variables and a not in variables:
+        a, b = b, a
+    if a not in variables or written.get(b, NONE) in loop.blocks:
+        return None
+    if insn.fun.name == "*" or (insn.fun.name == "<<" and b in ints):
+        return variables[a], insn.fun.name, b
+    return None
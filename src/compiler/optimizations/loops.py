@@ -0,0 +1,445 @@
+from dataclasses import dataclass
+from typing import Callable
+from compiler.cfg import NONE, ControlFlowGraph, Loop, build_cfg, dominance, find_loops
+from compiler.dataflow import ReachingDefinitions, block_local_vars, defined_var, reaching_definitions, used_vars
+from compiler.ir_interpreter import wrap
+from compiler.objects.ir_variables import IRVar
+from compiler.objects.source_location import Source_location
+from compiler.optimizations.dead_code import has_effect
+import compiler.objects.ir_instructions as ir
+
+# The most instructions unroll_loops lets a loop grow to.
+max_unrolled_size = 128
+# Comparisons with the operands the other way around, as in `b > a` for `a < b`.
+swapped = {"<": ">", "<=": ">=", ">": "<", ">=": "<="}
+
+
+def preheader(cfg: ControlFlowGraph, loop: Loop) -> int | None:
+    """Returns the block that is the only way into the loop from outside and goes
+    nowhere else, if there is one."""
+    outside = [pred for pred in cfg.blocks[loop.header].preds if pred not in loop.blocks]
+    if len(outside) == 1 and cfg.blocks[outside[0]].succs == [loop.header]:
+        return outside[0]
+    return None
+
+
+def rotate_loops(instructions: list[ir.Instruction]) -> list[ir.Instruction]:
+    """Turns while loops into do-while loops behind a guard, and gives every loop a
+    preheader. Works on plain instructions, before the SSA passes.
+
+    A while loop runs its condition at the top and jumps back to it from the end of
+    the body. When the condition blocks are only entered at the top and leave the loop
+    at their end, they are copied in front of the loop as a guard, which skips the loop
+    or enters it through a new empty preheader block, and moved to after the body, so
+    the body falls through into the condition and the only jump per iteration is the
+    conditional one back. A loop that is not rotated and has no block in front of it,
+    like one at the start of the program, gets an empty preheader as well."""
+    cfg = build_cfg(instructions)
+    blocks = cfg.blocks
+    labels = 0
+
+    def new_label(loc: Source_location, prefix: str) -> ir.Label:
+        nonlocal labels
+        labels += 1
+        return ir.Label(loc, f"{prefix}{labels}")
+
+    def last(block: int) -> ir.Instruction | None:
+        return blocks[block].instructions[-1] if blocks[block].instructions else None
+
+    # The loops to rotate, by header, as the block ending the condition and the latch.
+    rotations: dict[int, tuple[int, int]] = {}
+    needs_preheader: set[int] = set()
+    for loop in find_loops(cfg, cfg.dominators()):
+        header = loop.header
+        latch = max(loop.blocks)
+        test = next((block for block in range(header, latch + 1)
+                     if any(succ not in loop.blocks for succ in blocks[block].succs)), latch)
+        jump, branch = last(latch), last(test)
+        if (loop.latches == [latch] and loop.blocks == set(range(header, latch + 1)) and test < latch
+                and isinstance(jump, ir.Jump) and isinstance(branch, ir.CondJump)
+                and blocks[test + 1].label == branch.then_label.name
+                and all(pred in range(header, test + 1) for block in range(header + 1, test + 1)
+                        for pred in blocks[block].preds)
+                and all(succ in range(header, test + 1) for block in range(header, test)
+                        for succ in blocks[block].succs)):
+            rotations[header] = (test, latch)
+        elif not any(pred not in loop.blocks for pred in blocks[header].preds):
+            needs_preheader.add(header)
+
+    result: list[ir.Instruction] = []
+    # The rotated loops being emitted, innermost last, as (header, test, latch).
+    open_loops: list[tuple[int, int, int]] = []
+    index = 0
+    while index < len(blocks):
+        if index in rotations:
+            test, latch = rotations[index]
+            condition = [insn for block in blocks[index:test + 1] for insn in block.instructions]
+            # The guard keeps the header's label for the jumps from before the loop,
+            # and gets new labels for those inside the condition.
+            renamed = {block.label: new_label(block.instructions[0].location, "G")
+                       for block in blocks[index + 1:test + 1]}
+            entry = new_label(condition[0].location, "P")
+            result.append(condition[0])
+            for insn in condition[1:-1]:
+                result.append(relabel(insn, renamed))
+            branch = condition[-1]
+            assert isinstance(branch, ir.CondJump)
+            result.append(ir.CondJump(branch.location, branch.cond, entry, renamed.get(branch.else_label.name, branch.else_label)))
+            result.append(entry)
+            open_loops.append((index, test, latch))
+            index = test + 1
+            continue
+        if open_loops and open_loops[-1][2] == index:
+            header, test, latch = open_loops.pop()
+            result += blocks[index].instructions[:-1]
+            condition = [insn for block in blocks[header:test + 1] for insn in block.instructions]
+            result.append(new_label(condition[0].location, "T"))
+            result += condition[1:]
+            index += 1
+            continue
+        if index in needs_preheader:
+            result.append(new_label(blocks[index].instructions[0].location, "P"))
+        result += blocks[index].instructions
+        index += 1
+    return result
+
+
+def relabel(insn: ir.Instruction, renamed: dict[str | None, ir.Label]) -> ir.Instruction:
+    """Returns a copy of `insn` with the labels in `renamed` replaced."""
+    match insn:
+        case ir.Label():
+            return renamed.get(insn.name, insn)
+        case ir.Jump():
+            return ir.Jump(insn.location, renamed.get(insn.label.name, insn.label))
+        case ir.CondJump():
+            return ir.CondJump(insn.location, insn.cond, renamed.get(insn.then_label.name, insn.then_label),
+                               renamed.get(insn.else_label.name, insn.else_label))
+        case ir.LoadIntConst():
+            return ir.LoadIntConst(insn.location, insn.value, insn.dest)
+        case ir.LoadBoolConst():
+            return ir.LoadBoolConst(insn.location, insn.value, insn.dest)
+        case ir.Copy():
+            return ir.Copy(insn.location, insn.source, insn.dest)
+        case ir.Call():
+            return ir.Call(insn.location, insn.fun, list(insn.args), insn.dest)
+    return insn
+
+
+def hoist_invariants(cfg: ControlFlowGraph) -> ControlFlowGraph:
+    """Loop-invariant code motion over a graph in SSA form.
+
+    An instruction in a loop that only computes a value from variables written
+    outside the loop, or by instructions already hoisted, gives the same result on
+    every iteration; it is moved to the end of the loop's preheader. Only
+    instructions without effects are moved (see dead_code.has_effect), so running them
+    when the loop body would not have is harmless. Inner loops are done first, so an
+    expression can move out of several loops. The instructions are moved in place."""
+    ints: dict[IRVar, int] = {}
+    written: dict[IRVar, int] = {}
+    for block in cfg.blocks:
+        for insn in block.instructions:
+            dest = defined_var(insn)
+            if dest is not None:
+                written[dest] = block.index
+            if isinstance(insn, ir.LoadIntConst):
+                ints[insn.dest] = wrap(insn.value)
+    position = {index: number for number, index in enumerate(cfg.reverse_postorder())}
+    for loop in find_loops(cfg, cfg.dominators()):
+        target = preheader(cfg, loop)
+        if target is None:
+            continue
+        hoisted: list[ir.Instruction] = []
+        # The candidates still reading variables written in the loop, by variable, and
+        # how many of those variables each of them reads.
+        waiting: dict[IRVar, list[tuple[ir.Instruction, IRVar]]] = {}
+        blocked: dict[int, int] = {}
+        for index in sorted(loop.blocks, key=position.__getitem__):
+            for insn in cfg.blocks[index].instructions:
+                dest = defined_var(insn)
+                if dest is None or isinstance(insn, ir.Phi) or has_effect(insn, ints):
+                    continue
+                inside = {var for var in used_vars(insn) if written.get(var, NONE) in loop.blocks}
+                if inside:
+                    blocked[id(insn)] = len(inside)
+                    for var in inside:
+                        waiting.setdefault(var, []).append((insn, dest))
+                    continue
+                # Hoisting an instruction can free the ones waiting for its result.
+                ready = [(insn, dest)]
+                while ready:
+                    moved, result = ready.pop()
+                    hoisted.append(moved)
+                    written[result] = target
+                    for user, user_dest in waiting.pop(result, []):
+                        blocked[id(user)] -= 1
+                        if blocked[id(user)] == 0:
+                            ready.append((user, user_dest))
+        if hoisted:
+            moved_ids = {id(insn) for insn in hoisted}
+            for index in loop.blocks:
+                block = cfg.blocks[index]
+                block.instructions = [insn for insn in block.instructions if id(insn) not in moved_ids]
+            instructions = cfg.blocks[target].instructions
+            end = len(instructions) - 1 if instructions and isinstance(instructions[-1], ir.Jump) else len(instructions)
+            instructions[end:end] = hoisted
+    return cfg
+
+
+@dataclass
+class CountedLoop:
+    """An innermost loop as rotate_loops leaves it, running its blocks from `header` to
+    `latch` and then testing `counter <operator> bound` at the end of the latch, with
+    the counter going up or down by `step` on every iteration, once."""
+    header: int
+    latch: int
+    # The position of the comparison in the latch.
+    test: int
+    counter: IRVar
+    step: int
+    operator: str
+    bound: IRVar
+    # The value of the bound, if it is a constant, and of the counter on entry, if known.
+    bound_value: int | None
+    start: int | None
+    exit: ir.Label
+
+
+def counted_loop(
+    cfg: ControlFlowGraph,
+    loop: Loop,
+    is_dominator: Callable[[int, int], bool],
+    writes: dict[IRVar, list[tuple[int, int]]],
+    reaching: ReachingDefinitions
+) -> CountedLoop | None:
+    """Tells if `loop` counts a variable up or down to a bound, and how. `writes` are
+    where each variable is written, as (block, position in block), and `is_dominator`
+    tells if a block dominates another (see cfg.dominance)."""
+    blocks = cfg.blocks
+    header, latch = loop.header, max(loop.blocks)
+    entry = preheader(cfg, loop)
+    branch = blocks[latch].instructions[-1] if blocks[latch].instructions else None
+    if (entry is None or loop.latches != [latch] or loop.blocks != set(range(header, latch + 1))
+            or not isinstance(branch, ir.CondJump) or branch.then_label.name != blocks[header].label
+            or any(succ not in loop.blocks for block in range(header, latch) for succ in blocks[block].succs)):
+        return None
+
+    def constant(var: IRVar) -> int | None:
+        values = set()
+        for block, position in writes.get(var, []):
+            insn = blocks[block].instructions[position]
+            if not isinstance(insn, ir.LoadIntConst):
+                return None
+            values.add(wrap(insn.value))
+        return values.pop() if len(values) == 1 else None
+
+    def in_loop(var: IRVar) -> list[tuple[int, int]]:
+        return [(block, position) for block, position in writes.get(var, []) if block in loop.blocks]
+
+    compared = [position for block, position in in_loop(branch.cond) if block == latch]
+    compare = blocks[latch].instructions[max(compared)] if compared else None
+    if not isinstance(compare, ir.Call) or compare.fun.name not in swapped or len(compare.args) != 2:
+        return None
+
+    def step_of(counter: IRVar, operator: str) -> int | None:
+        # The counter is written once, by `counter + step` or a copy of it, before the test.
+        written = in_loop(counter)
+        if len(written) != 1:
+            return None
+        [(block, position)] = written
+        update = blocks[block].instructions[position]
+        if isinstance(update, ir.Copy):
+            sources = in_loop(update.source)
+            if len(sources) != 1 or sources[0][0] != block or sources[0][1] > position:
+                return None
+            update = blocks[block].instructions[sources[0][1]]
+        if not isinstance(update, ir.Call) or update.fun.name not in ("+", "-") or len(update.args) != 2:
+            return None
+        a, b = update.args
+        if update.fun.name == "+" and b == counter:
+            a, b = b, a
+        amount = constant(b)
+        if a != counter or amount is None:
+            return None
+        step = amount if update.fun.name == "+" else -amount
+        if (step == 0 or (step > 0) != (operator in ("<", "<=")) or abs(step) >= 2**62
+                or not is_dominator(block, latch) or block == latch and position > max(compared)):
+            return None
+        return step
+
+    x, y = compare.args
+    for counter, bound, operator in ((x, y, compare.fun.name), (y, x, swapped[compare.fun.name])):
+        step = step_of(counter, operator)
+        if step is not None and bound not in (counter, branch.cond):
+            break
+    else:
+        return None
+
+    bound_value = constant(bound)
+    if bound_value is None and in_loop(bound):
+        return None
+    start = None
+    reach = [at for at in writes[counter] if reaching.reaches(reaching.reach_out[entry], at)]
+    if len(reach) == 1:
+        insn = blocks[reach[0][0]].instructions[reach[0][1]]
+        if isinstance(insn, ir.LoadIntConst):
+            start = wrap(insn.value)
+        elif isinstance(insn, ir.Copy):
+            start = constant(insn.source)
+    return CountedLoop(header, latch, max(compared), counter, step, operator, bound, bound_value, start,
+                       branch.else_label)
+
+
+def trip_count(loop: CountedLoop) -> int | None:
+    """Returns how many times a counted loop runs its body once entered, if known and
+    if the counter does not wrap around on the way."""
+    if loop.start is None or loop.bound_value is None:
+        return None
+    distance = (loop.bound_value - loop.start) * (1 if loop.step > 0 else -1)
+    size = abs(loop.step)
+    if loop.operator in ("<", ">"):
+        count = max(1, -(-distance // size))
+    else:
+        count = max(1, distance // size + 1)
+    end = loop.start + count * loop.step
+    return count if -2**63 <= end < 2**63 else None
+
+
+def unroll_loops(instructions: list[ir.Instruction], factor: int) -> list[ir.Instruction]:
+    """Unrolls the innermost counted loops (see CountedLoop) of plain instructions, as
+    left by rotate_loops. A factor of 1 leaves the loops alone.
+
+    A loop whose trip count is known and small enough is replaced by that many copies
+    of its body, without the tests. Any other counted loop gets a main loop in front,
+    which runs `factor` copies of the body per test: it is entered, and repeated,
+    only while the counter is far enough from the bound that the tests left out would
+    all have passed, that is while `counter + (factor - 1) * step` would still pass
+    the test. The original loop is kept after it, to run the last few iterations."""
+    if factor <= 1:
+        return instructions
+    cfg = build_cfg(instructions)
+    blocks = cfg.blocks
+    idom = cfg.dominators()
+    loops = find_loops(cfg, idom)
+    writes: dict[IRVar, list[tuple[int, int]]] = {}
+    for block in blocks:
+        for position, insn in enumerate(block.instructions):
+            dest = defined_var(insn)
+            if dest is not None:
+                writes.setdefault(dest, []).append((block.index, position))
+    is_dominator = dominance(idom)
+    reaching = reaching_definitions(cfg)
+    local = block_local_vars(cfg)
+
+    # The loops to unroll by their header, with their trip count to unroll them fully,
+    # and the preheaders of those to unroll by `factor`.
+    unrolled: dict[int, tuple[CountedLoop, int | None]] = {}
+    entries: dict[int, CountedLoop] = {}
+    headers = {loop.header for loop in loops}
+    for loop in loops:
+        # Only the innermost loops, whose blocks hold no header but their own.
+        if len(headers & loop.blocks) > 1:
+            continue
+        counted = counted_loop(cfg, loop, is_dominator, writes, reaching)
+        if counted is None:
+            continue
+        size = sum(len(blocks[block].instructions) for block in loop.blocks)
+        count = trip_count(counted)
+        if count is not None and count * size <= max_unrolled_size:
+            unrolled[loop.header] = (counted, count)
+            continue
+        distance = (factor - 1) * counted.step
+        if (factor * size > max_unrolled_size or abs(distance) >= 2**63 or counted.bound_value is not None
+                and not -2**63 <= counted.bound_value - distance < 2**63):
+            continue
+        unrolled[loop.header] = (counted, None)
+        entries[preheader(cfg, loop)] = counted  # type: ignore[index]
+
+    labels = 0
+    variables = 0
+
+    def new_label(loc: Source_location) -> ir.Label:
+        nonlocal labels
+        labels += 1
+        return ir.Label(loc, f"U{labels}")
+
+    def new_var() -> IRVar:
+        nonlocal variables
+        variables += 1
+        return IRVar(f"u{variables}")
+
+    def body(loop: CountedLoop, header: ir.Label) -> list[ir.Instruction]:
+        # A copy of the loop's blocks with new labels, without the final CondJump, and
+        # without the comparison when nothing else reads its result.
+        renamed: dict[str | None, ir.Label] = {
+            block.label: new_label(block.instructions[0].location)
+            for block in blocks[loop.header + 1:loop.latch + 1] if block.label is not None}
+        renamed[blocks[loop.header].label] = header
+        latch = blocks[loop.latch].instructions
+        skipped = {id(latch[-1])}
+        if defined_var(latch[loop.test]) in local:
+            skipped.add(id(latch[loop.test]))
+        return [relabel(insn, renamed) for block in blocks[loop.header:loop.latch + 1]
+                for insn in block.instructions if id(insn) not in skipped]
+
+    result: list[ir.Instruction] = []
+    index = 0
+    while index < len(blocks):
+        block = blocks[index]
+        if index in unrolled and unrolled[index][1] is not None:
+            counted, count = unrolled[index]
+            header = block.instructions[0]
+            assert isinstance(header, ir.Label) and count is not None
+            result += body(counted, header)
+            for _ in range(count - 1):
+                result += body(counted, new_label(header.location))
+            result.append(ir.Jump(header.location, counted.exit))
+            index = counted.latch + 1
+            continue
+        result += block.instructions
+        index += 1
+        if block.index not in entries:
+            continue
+        counted = entries[block.index]
+        header = blocks[counted.header].instructions[0]
+        assert isinstance(header, ir.Label)
+        loc = header.location
+        if result and isinstance(result[-1], ir.Jump):
+            result.pop()
+        # The main loop and the original one both get a preheader, the original one
+        # right in front of it.
+        enter, main, rest, remainder = new_label(loc), new_label(loc), new_label(loc), new_label(loc)
+        limit, go, test = new_var(), new_var(), new_var()
+        distance = (factor - 1) * counted.step
+        bound = counted.bound
+        if counted.bound_value is not None:
+            bound = new_var()
+            result.append(ir.LoadIntConst(loc, counted.bound_value - distance, limit))
+        else:
+            # The limit is only good if computing it did not wrap around.
+            fits, checked, step = new_var(), new_label(loc), new_var()
+            result += [
+                ir.LoadIntConst(loc, distance, step),
+                ir.Call(loc, IRVar("-"), [bound, step], limit),
+                ir.Call(loc, IRVar("<" if counted.step > 0 else ">"), [limit, bound], fits),
+                ir.CondJump(loc, fits, checked, remainder),
+                checked]
+        result += [
+            ir.Call(loc, IRVar(counted.operator), [counted.counter, limit], go),
+            ir.CondJump(loc, go, enter, remainder),
+            enter]
+        result += body(counted, main)
+        for _ in range(factor - 1):
+            result += body(counted, new_label(loc))
+        result += [
+            ir.Call(loc, IRVar(counted.operator), [counted.counter, limit], go),
+            ir.CondJump(loc, go, main, rest),
+            rest]
+        if counted.bound_value is not None:
+            result.append(ir.LoadIntConst(loc, counted.bound_value, bound))
+        result += [
+            ir.Call(loc, IRVar(counted.operator), [counted.counter, bound], test),
+            ir.CondJump(loc, test, remainder, counted.exit),
+            remainder]
+        if counted.header != block.index + 1:
+            result.append(ir.Jump(loc, header))
+    return result
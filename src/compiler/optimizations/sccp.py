@@ -0,0 +1,188 @@
+from compiler.assets.intrinsics import all_intrinsics
+from compiler.cfg import ControlFlowGraph, build_cfg
+from compiler.dataflow import defined_var, used_vars
+from compiler.ir_interpreter import operations
+from compiler.objects.ir_variables import IRVar
+from compiler.objects.source_location import Source_location
+import compiler.objects.ir_instructions as ir
+
+# The operators that are folded: those that are intrinsics, computed as the
+# intrinsic's assembly computes them.
+foldable = {name: operation for name, operation in operations.items() if name in all_intrinsics}
+comparisons = frozenset(["==", "!=", "<", "<=", ">", ">=", "unary_not"])
+
+# A lattice value: TOP while nothing is known yet, BOTTOM once the variable can hold
+# more than one value, or else the constant as (is it a boolean, value).
+TOP = "top"
+BOTTOM = "bottom"
+Value = tuple[bool, int] | str
+
+
+def sccp(cfg: ControlFlowGraph) -> ControlFlowGraph:
+    """Sparse conditional constant propagation (Wegman and Zadeck) over a graph in SSA form.
+
+    Values are only propagated along edges found executable, starting from the entry, so a
+    constant branch condition keeps its dead side from spoiling the values after it.
+    Then variables found constant are loaded as constants instead of computed, branches
+    on known conditions become jumps, and blocks that can't be reached are deleted,
+    along with their Phi arguments. Calls that print, read or would trap are kept."""
+    blocks = cfg.blocks
+    values: dict[IRVar, Value] = {}
+    users: dict[IRVar, list[tuple[int, int]]] = {}
+    defined: set[IRVar] = set()
+    for block in blocks:
+        for position, insn in enumerate(block.instructions):
+            for var in used_vars(insn):
+                users.setdefault(var, []).append((block.index, position))
+            dest = defined_var(insn)
+            if dest is not None:
+                defined.add(dest)
+
+    def value(var: IRVar) -> Value:
+        # Variables that nothing writes, like unit, are never constants.
+        if var not in defined:
+            return BOTTOM
+        return values.get(var, TOP)
+
+    executable_edges: set[tuple[int, int]] = set()
+    reached = bytearray(len(blocks))
+    edge_work: list[tuple[int, int]] = [(-1, 0)] if blocks else []
+    var_work: list[IRVar] = []
+
+    def mark_edge(source: int, target: int) -> None:
+        if (source, target) not in executable_edges:
+            edge_work.append((source, target))
+
+    def evaluate(insn: ir.Instruction, block: int) -> Value:
+        match insn:
+            case ir.LoadIntConst():
+                return (False, insn.value) if -2**63 <= insn.value < 2**63 else BOTTOM
+            case ir.LoadBoolConst():
+                return (True, int(insn.value in ("true", True)))
+            case ir.Copy():
+                return value(insn.source)
+            case ir.Phi():
+                result: Value = TOP
+                for pred, arg in zip(blocks[block].preds, insn.args):
+                    if (pred, block) not in executable_edges:
+                        continue
+                    incoming = value(arg)
+                    if incoming == TOP:
+                        continue
+                    if incoming == BOTTOM or (result != TOP and result != incoming):
+                        return BOTTOM
+                    result = incoming
+                return result
+            case ir.Call():
+                operation = foldable.get(insn.fun.name)
+                if operation is None:
+                    return BOTTOM
+                args = [value(arg) for arg in insn.args]
+                if BOTTOM in args:
+                    return BOTTOM
+                if TOP in args:
+                    return TOP
+                try:
+                    folded = operation(*[arg[1] for arg in args])  # type: ignore[index]
+                except Exception:
+                    # Leave the trap to happen when the program runs.
+                    return BOTTOM
+                return (insn.fun.name in comparisons, folded)
+        return BOTTOM
+
+    def visit(block: int, position: int) -> None:
+        insn = blocks[block].instructions[position]
+        if isinstance(insn, ir.CondJump):
+            cond = value(insn.cond)
+            succs = blocks[block].succs
+            if cond == BOTTOM:
+                for succ in succs:
+                    mark_edge(block, succ)
+            elif cond != TOP:
+                taken = insn.then_label if cond[1] else insn.else_label  # type: ignore[index]
+                for succ in succs:
+                    if blocks[succ].label == taken.name:
+                        mark_edge(block, succ)
+            return
+        if isinstance(insn, ir.Jump):
+            for succ in blocks[block].succs:
+                mark_edge(block, succ)
+            return
+        dest = defined_var(insn)
+        if dest is None:
+            return
+        new = evaluate(insn, block)
+        old = values.get(dest, TOP)
+        if new != old and old != BOTTOM:
+            values[dest] = new
+            var_work.append(dest)
+
+    while edge_work or var_work:
+        while edge_work:
+            source, target = edge_work.pop()
+            if (source, target) in executable_edges:
+                continue
+            executable_edges.add((source, target))
+            instructions = blocks[target].instructions
+            if reached[target]:
+                # Only the Phis see a new incoming edge.
+                for position, insn in enumerate(instructions):
+                    if isinstance(insn, ir.Phi):
+                        visit(target, position)
+                    elif not isinstance(insn, ir.Label):
+                        break
+                continue
+            reached[target] = 1
+            for position in range(len(instructions)):
+                visit(target, position)
+            last = instructions[-1] if instructions else None
+            if not isinstance(last, (ir.Jump, ir.CondJump)):
+                for succ in blocks[target].succs:
+                    mark_edge(target, succ)
+        while var_work and not edge_work:
+            for index, position in users.get(var_work.pop(), []):
+                if reached[index]:
+                    visit(index, position)
+
+    # === Rewriting ===
+    result: list[ir.Instruction] = []
+    for block in blocks:
+        if not reached[block.index]:
+            continue
+        live_preds = [which for which, pred in enumerate(block.preds) if (pred, block.index) in executable_edges]
+        phis: list[ir.Instruction] = []
+        body: list[ir.Instruction] = []
+        loads: list[ir.Instruction] = []
+        for insn in block.instructions:
+            dest = defined_var(insn)
+            known = values.get(dest, TOP) if dest is not None else TOP
+            if isinstance(insn, ir.Phi):
+                if known != TOP and known != BOTTOM:
+                    loads.append(constant_load(insn.location, known, insn.dest))  # type: ignore[arg-type]
+                elif len(live_preds) == 1:
+                    loads.append(ir.Copy(insn.location, insn.args[live_preds[0]], insn.dest))
+                else:
+                    phis.append(ir.Phi(insn.location, [insn.args[which] for which in live_preds], insn.dest))
+            elif isinstance(insn, ir.CondJump):
+                cond = value(insn.cond)
+                if cond != TOP and cond != BOTTOM:
+                    taken = insn.then_label if cond[1] else insn.else_label  # type: ignore[index]
+                    body.append(ir.Jump(insn.location, taken))
+                else:
+                    body.append(insn)
+            elif known != TOP and known != BOTTOM and not isinstance(insn, (ir.LoadIntConst, ir.LoadBoolConst)):
+                body.append(constant_load(insn.location, known, dest))  # type: ignore[arg-type]
+            else:
+                body.append(insn)
+        if body and isinstance(body[0], ir.Label):
+            result += [body[0], *phis, *loads, *body[1:]]
+        else:
+            result += [*phis, *loads, *body]
+    return build_cfg(result)
+
+
+def constant_load(loc: Source_location, known: tuple[bool, int], dest: IRVar) -> ir.Instruction:
+    is_bool, constant = known
+    if is_bool:
+        return ir.LoadBoolConst(loc, "true" if constant else "false", dest)
+    return ir.LoadIntConst(loc, constant, dest)
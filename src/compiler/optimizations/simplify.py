@@ -0,0 +1,135 @@
+from compiler.cfg import ControlFlowGraph
+from compiler.objects.ir_variables import IRVar
+from compiler.objects.source_location import Source_location
+from compiler.optimizations.sccp import constant_load
+import compiler.objects.ir_instructions as ir
+
+# The comparison that is true exactly when the other one is false.
+negated = {"==": "!=", "!=": "==", "<": ">=", ">=": "<", ">": "<=", "<=": ">"}
+# The value of comparing a variable with itself.
+reflexive = {"==": True, "<=": True, ">=": True, "!=": False, "<": False, ">": False}
+
+
+def power_of_two(value: int | None) -> int | None:
+    """Returns k when `value` is 2^k for k in 1..62, the shifts the *_pow2 intrinsics take."""
+    if value is None or value < 2 or value & (value - 1):
+        return None
+    k = value.bit_length() - 1
+    return k if k <= 62 else None
+
+
+def simplify(cfg: ControlFlowGraph) -> ControlFlowGraph:
+    """Algebraic simplification and strength reduction over a graph in SSA form.
+
+    Operator calls whose result is already at hand become copies or constants, like
+    `x + 0`, `x * 1`, `x * 0`, `x - x` and a `unary_-` or `unary_not` of another.
+    `unary_not` of a comparison becomes the opposite comparison. Multiplying by 2^k
+    becomes a shift, and `/` and `%` by 2^k the div_pow2 and mod_pow2 intrinsics,
+    which don't need idivq. Division by zero and the other calls that could trap are
+    kept as they are.
+
+    Constants are only recognized from their loads, so this is meant to run after
+    sccp. The instructions are rewritten in place."""
+    ints: dict[IRVar, int] = {}
+    bools: dict[IRVar, bool] = {}
+    calls: dict[IRVar, ir.Call] = {}
+    copies: dict[IRVar, IRVar] = {}
+    shifts = 0
+
+    def shift_count(loc: Source_location, k: int) -> tuple[ir.Instruction, IRVar]:
+        nonlocal shifts
+        shifts += 1
+        var = IRVar(f"k.{shifts}")
+        ints[var] = k
+        return ir.LoadIntConst(loc, k, var), var
+
+    def call(loc: Source_location, name: str, args: list[IRVar], dest: IRVar) -> ir.Call:
+        return ir.Call(loc, IRVar(name), args, dest)
+
+    def simplified(insn: ir.Call, args: list[IRVar]) -> list[ir.Instruction] | None:
+        loc, name, dest = insn.location, insn.fun.name, insn.dest
+        if name == "unary_-" or name == "unary_not":
+            inner = calls.get(args[0])
+            if inner is not None and inner.fun.name == name:
+                return [ir.Copy(loc, inner.args[0], dest)]
+            if name == "unary_not" and inner is not None and inner.fun.name in negated:
+                return [call(loc, negated[inner.fun.name], inner.args, dest)]
+            return None
+        if len(args) != 2:
+            return None
+        a, b = args
+        if name in reflexive and a == b:
+            return [constant_load(loc, (True, int(reflexive[name])), dest)]
+        if name == "==" or name == "!=":
+            for this, other in ((a, b), (b, a)):
+                if other in bools:
+                    if bools[other] == (name == "=="):
+                        return [ir.Copy(loc, this, dest)]
+                    return [call(loc, "unary_not", [this], dest)]
+            return None
+        x, y = ints.get(a), ints.get(b)
+        if name == "+":
+            if y == 0:
+                return [ir.Copy(loc, a, dest)]
+            if x == 0:
+                return [ir.Copy(loc, b, dest)]
+        elif name == "-":
+            if y == 0:
+                return [ir.Copy(loc, a, dest)]
+            if a == b:
+                return [ir.LoadIntConst(loc, 0, dest)]
+            if x == 0:
+                return [call(loc, "unary_-", [b], dest)]
+        elif name == "*":
+            if x == 0 or y == 0:
+                return [ir.LoadIntConst(loc, 0, dest)]
+            for operand, factor in ((a, y), (b, x)):
+                if factor == 1:
+                    return [ir.Copy(loc, operand, dest)]
+                if factor == -1:
+                    return [call(loc, "unary_-", [operand], dest)]
+                k = power_of_two(factor)
+                if k is not None:
+                    load, count = shift_count(loc, k)
+                    return [load, call(loc, "<<", [operand, count], dest)]
+        elif name == "/" or name == "%":
+            if y == 1:
+                return [ir.Copy(loc, a, dest) if name == "/" else ir.LoadIntConst(loc, 0, dest)]
+            k = power_of_two(y)
+            if k is not None:
+                load, count = shift_count(loc, k)
+                return [load, call(loc, "div_pow2" if name == "/" else "mod_pow2", [a, count], dest)]
+        return None
+
+    for index in cfg.reverse_postorder():
+        block = cfg.blocks[index]
+        instructions: list[ir.Instruction] = []
+        for insn in block.instructions:
+            if isinstance(insn, ir.Call):
+                args = [copies.get(arg, arg) for arg in insn.args]
+                replacement = simplified(insn, args)
+                if replacement is not None:
+                    instructions += replacement
+                    insn = replacement[-1]
+                else:
+                    insn = ir.Call(insn.location, insn.fun, args, insn.dest)
+                    instructions.append(insn)
+            else:
+                instructions.append(insn)
+            match insn:
+                case ir.LoadIntConst():
+                    if -2**63 <= insn.value < 2**63:
+                        ints[insn.dest] = insn.value
+                case ir.LoadBoolConst():
+                    bools[insn.dest] = insn.value in ("true", True)
+                case ir.Copy():
+                    source = copies.get(insn.source, insn.source)
+                    copies[insn.dest] = source
+                    if source in ints:
+                        ints[insn.dest] = ints[source]
+                    if source in bools:
+                        bools[insn.dest] = bools[source]
+                case ir.Call():
+                    calls[insn.dest] = insn
+        block.instructions = instructions
+    return cfg
@@ -1,49 +1,41 @@
-from compiler.objects.token import Token
+from typing import Callable, Iterable
+from compiler.objects.token import Token, TokenLike
+from compiler.objects.token_stream import TokenStream
 import compiler.objects.ast as ast
 from compiler.assets.test_source import L
 from compiler.objects.node_types import Bool, Unit, Int
 
+# Left and right binding powers of the binary operators, from loosest to tightest.
+# A right power above the left one makes the operator left-associative, an equal one
+# (as for assignment) right-associative. Adding an operator only needs a new entry here.
+binary_binding_powers: dict[str, tuple[int, int]] = {
+    "=": (1, 1),
+    "or": (2, 3),
+    "and": (4, 5),
+    "==": (6, 7), "!=": (6, 7),
+    "<": (8, 9), "<=": (8, 9), ">": (8, 9), ">=": (8, 9),
+    "+": (10, 11), "-": (10, 11),
+    "*": (12, 13), "/": (12, 13), "%": (12, 13),
+}
+
 class Parser:
     @staticmethod
-    def parse(tokens: list[Token]) -> ast.Expression:
-        pos = 0
-
-        left_associative_binary_operators = [
-            ['or'],
-            ['and'],
-            ['==', '!='],
-            ['<', '<=', '>', '>='],
-            ['+', '-'],
-            ['*', '/', "%"],
-        ]
+    def parse(tokens: Iterable[TokenLike]) -> ast.Expression:
+        # Only the current and the previous token are ever looked at,
+        # so the tokens can also come lazily from Tokenizer.stream.
+        stream = TokenStream(tokens)
+        peek = stream.peek
+        peek_prev = stream.peek_prev
 
-        def peek() -> Token:
-            try:
-                if pos < len(tokens):
-                    return tokens[pos]
-                else:
-                    return Token(loc=tokens[-1].loc, type="end", text="")
-            except:
-                raise Exception("The input is empty")
-            
-        def peek_prev() -> Token:
-            try:
-                if pos - 1 >= 0:
-                    return tokens[pos - 1]
-                else:
-                    return Token(loc=tokens[-1].loc, type="end", text="")
-            except:
-                raise Exception("The input is empty")
-            
-        def consume(expected: str | list[str] | None = None) -> Token:
-            nonlocal pos
+        def consume(expected: str | list[str] | None = None) -> TokenLike:
             token = peek()
-            if isinstance(expected, str) and token.text != expected:
-                raise Exception(f"{token.loc}: expected '{expected}'")
-            if isinstance(expected, list) and token.text not in expected:
-                comma_separated = ", ".join([f"'{e}'" for e in expected])
-                raise Exception(f"{token.loc}: expected one of {comma_separated}")
-            pos += 1
+            if expected is not None:
+                if isinstance(expected, str) and token.text != expected:
+                    raise Exception(f"{token.loc}: expected '{expected}'")
+                if isinstance(expected, list) and token.text not in expected:
+                    comma_separated = ", ".join([f"'{e}'" for e in expected])
+                    raise Exception(f"{token.loc}: expected one of {comma_separated}")
+            stream.advance()
             return token
         
         def parse_int_literal() -> ast.Literal:
@@ -59,43 +51,33 @@ class Parser:
             return ast.Identifier(token.loc, token.text)
 
         def parse_unary(allowed: list[str] = [], allow_all: bool = False) -> ast.Expression:
-            if peek().text == "not":
-                operator = "not"
-            else:
-                operator = "-"
+            operator = peek().text
+            if operator != "not" and operator != "-":
+                return parse_factor(allowed, allow_all)
             location = peek().loc
             operators = []
             while peek().text == operator:
                 operators.append(consume(operator).text)
-            factor = parse_factor(allowed, allow_all)
-            if len(operators) > 0:
-                factor = ast.Unary(location, operators, factor)
-            return factor
+            return ast.Unary(location, operators, parse_factor(allowed, allow_all))
         
         def parse_boolean_literal() -> ast.Boolean_literal:
             token = consume()
             return ast.Boolean_literal(token.loc, token.text)
         
+        def parse_var_in_expression(allowed: list[str] = [], allow_all: bool = False) -> ast.Expression:
+            raise Exception(f"{peek().loc}: variable declaration only allowed in blocks or top-level")
+
         def parse_factor(allowed: list[str] = [], allow_all: bool = False) -> ast.Expression:
-            if peek().text == "(":
-                return parse_parenthesized(allowed, allow_all)
-            elif peek().text == "{":
-                return parse_block()
-            elif peek().text == "if":
-                return parse_if_clause(allowed, allow_all)
-            elif peek().text == "var":
-                raise Exception(f"{peek().loc}: variable declaration only allowed in blocks or top-level")
-            elif peek().text in ["true", "false"]:
-                return parse_boolean_literal()
-            elif peek().text == "while":
-                return parse_while_loop(allowed, allow_all)
-            elif peek().type == "int_literal":
+            token = peek()
+            prefix_parser = prefix_parsers.get(token.text)
+            if prefix_parser is not None:
+                return prefix_parser(allowed, allow_all)
+            elif token.type == "int_literal":
                 return parse_int_literal()
-            elif peek().type == "identifier":
+            elif token.type == "identifier":
                 return parse_identifier()
-            else: 
-                #print(tokens[pos:])
-                raise Exception(f"{peek().loc}: expected an integer literal or and identifier")
+            else:
+                raise Exception(f"{token.loc}: expected an integer literal or and identifier")
 
         def parse_all():
             expressions = []
@@ -162,59 +144,35 @@ class Parser:
             return ast.While_loop(location, cond, itering)
 
 
-        def parse_expression(allowed: list[str] = [], allow_all: bool = False) -> ast.BinaryOp:
-            precedence = 0
-            left = parse_term_precedence(precedence + 1, allowed, allow_all)
-            while peek().text in left_associative_binary_operators[precedence]:
-                operator_token = consume()
-                operator = operator_token.text
-                right = parse_term_precedence(precedence + 1, allowed, allow_all)
-                left = ast.BinaryOp(
-                    left.loc,
-                    left,
-                    operator,
-                    right
-                )
-            if peek().text == "=":
-                operator_token = consume()
-                operator = operator_token.text
-                right = parse_expression(allowed, allow_all)
-                left = ast.BinaryOp(
-                    left.loc,
-                    left,
-                    operator,
-                    right
-                )
+        def parse_expression(allowed: list[str] = [], allow_all: bool = False) -> ast.Expression:
+            left = parse_binary(0, allowed, allow_all)
             if peek().type != "end" and peek().text not in allowed and not allow_all and peek_prev().text != "}":
                 raise Exception(f"{peek().loc}: unexpected term: {peek().text}")
             return left
-        
-        def parse_term_precedence(precedence: int, allowed: list[str] = [], allow_all: bool = False) -> ast.BinaryOp:
-            if precedence == len(left_associative_binary_operators) - 1:
-                left = parse_term(allowed, allow_all)
-            else:
-                left = parse_term_precedence(precedence + 1, allowed, allow_all)
-            while peek().text in left_associative_binary_operators[precedence]:
-                operator_token = consume()
-                operator = operator_token.text
-                if precedence == len(left_associative_binary_operators) - 1:
-                    right = parse_term(allowed, allow_all)
-                else:
-                    right = parse_term_precedence(precedence + 1, allowed, allow_all)
+
+        def parse_binary(min_power: int, allowed: list[str] = [], allow_all: bool = False) -> ast.Expression:
+            # Precedence climbing: keep folding operators that bind at least as tightly
+            # as `min_power` into the left operand.
+            left = parse_term(allowed, allow_all)
+            while True:
+                powers = binary_binding_powers.get(peek().text)
+                if powers is None or powers[0] < min_power:
+                    return left
+                operator = consume().text
+                right = parse_binary(powers[1], allowed, allow_all)
                 left = ast.BinaryOp(
                     left.loc,
                     left,
                     operator,
                     right
                 )
-            return left
-        
+
         def parse_term(allowed: list[str] = [], allow_all: bool = False) -> ast.Expression:
             left = parse_unary(allowed, allow_all)
             if peek().text == "(":
                 arguments = parse_function(allowed, allow_all)
                 left = ast.Function(left.loc, left, arguments)
-            while peek().text in ["*", "/"]:
+            while peek().text in ("*", "/"):
                 operator_token = consume()
                 operator = operator_token.text
                 right = parse_unary(allowed, allow_all)
@@ -268,7 +226,6 @@ class Parser:
                     raise Exception(f"Missing semicolon at {peek().loc}")
                 if peek().text != "}":
                     while peek().text == ";" or isinstance(line, ast.Block) or peek_prev().text == "}":
-                        print(peek().text, peek_prev().text)
                         try:
                             consume(";")
                         except:
@@ -291,6 +248,17 @@ class Parser:
                 result = ast.Literal(None, None)
             return ast.Block(location, sequence, result)
         
+        # Parsers for the expressions that start with a fixed token, keyed by its text.
+        prefix_parsers: dict[str, Callable[[list[str], bool], ast.Expression]] = {
+            "(": parse_parenthesized,
+            "{": lambda allowed, allow_all: parse_block(),
+            "if": parse_if_clause,
+            "var": parse_var_in_expression,
+            "true": lambda allowed, allow_all: parse_boolean_literal(),
+            "false": lambda allowed, allow_all: parse_boolean_literal(),
+            "while": parse_while_loop,
+        }
+
         return parse_all()
     
 if __name__ == "__main__":
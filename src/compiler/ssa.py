@@ -0,0 +1,260 @@
+from typing import Callable
+from compiler.cfg import ControlFlowGraph, build_cfg, dominance, dominator_tree
+from compiler.dataflow import Liveness, defined_var, liveness, rewrite, used_vars
+from compiler.objects.ir_variables import IRVar
+from compiler.objects.source_location import Source_location
+import compiler.objects.ir_instructions as ir
+
+
+def to_ssa(instructions: list[ir.Instruction]) -> ControlFlowGraph:
+    """Builds the control-flow graph of `instructions` in SSA form: every variable is
+    written by one instruction only, and where the values of several writes meet, a
+    Phi picks the one that flowed in.
+
+    Only variables written more than once are renamed, to `name.1`, `name.2`... Their
+    Phis are placed on the iterated dominance frontiers of the writes (Cytron et al.),
+    and only where the variable is live (pruned SSA). The writes are then renamed
+    walking the dominator tree. A read that no write reaches keeps the old name."""
+    cfg = build_cfg(instructions)
+    idom = cfg.dominators()
+    frontiers = cfg.dominance_frontiers(idom)
+    live = liveness(cfg)
+
+    def_blocks: dict[IRVar, list[int]] = {}
+    def_count: dict[IRVar, int] = {}
+    for block in cfg.blocks:
+        for insn in block.instructions:
+            dest = defined_var(insn)
+            if dest is not None:
+                def_count[dest] = def_count.get(dest, 0) + 1
+                blocks = def_blocks.setdefault(dest, [])
+                if not blocks or blocks[-1] != block.index:
+                    blocks.append(block.index)
+    renamed = {var for var, count in def_count.items() if count > 1}
+
+    # === Placing the Phis ===
+    phi_vars: list[list[IRVar]] = [[] for _ in cfg.blocks]
+    for var in def_blocks:
+        if var not in renamed or var not in live.numbers:
+            continue
+        bit = 1 << live.numbers[var]
+        has_phi: set[int] = set()
+        defines = set(def_blocks[var])
+        worklist = list(def_blocks[var])
+        while worklist:
+            for frontier in frontiers[worklist.pop()]:
+                if frontier in has_phi or not live.live_in[frontier] & bit:
+                    continue
+                has_phi.add(frontier)
+                phi_vars[frontier].append(var)
+                if frontier not in defines:
+                    defines.add(frontier)
+                    worklist.append(frontier)
+    for block in cfg.blocks:
+        if phi_vars[block.index]:
+            phis: list[ir.Instruction] = [
+                ir.Phi(block.instructions[0].location, [var] * len(block.preds), var) for var in phi_vars[block.index]]
+            start = 1 if block.label is not None else 0
+            block.instructions[start:start] = phis
+
+    # === Renaming ===
+    versions: dict[IRVar, int] = {}
+    stacks: dict[IRVar, list[IRVar]] = {var: [] for var in renamed}
+
+    def new_name(var: IRVar) -> IRVar:
+        versions[var] = versions.get(var, 0) + 1
+        name = IRVar(f"{var.name}.{versions[var]}")
+        stacks[var].append(name)
+        return name
+
+    def current(var: IRVar) -> IRVar:
+        stack = stacks.get(var)
+        return stack[-1] if stack else var
+
+    children = dominator_tree(idom)
+    # Each entry is a block and, once its instructions are renamed, the variables it
+    # pushed a name for, to pop once its subtree in the dominator tree is done.
+    work: list[tuple[int, list[IRVar] | None]] = [(0, None)] if cfg.blocks else []
+    while work:
+        index, pushed = work.pop()
+        if pushed is not None:
+            for var in pushed:
+                stacks[var].pop()
+            continue
+        block = cfg.blocks[index]
+        pushed = []
+        instructions = block.instructions
+        for position, insn in enumerate(instructions):
+            dest = defined_var(insn)
+            if isinstance(insn, ir.Phi):
+                instructions[position] = ir.Phi(insn.location, insn.args, new_name(insn.dest))
+                pushed.append(insn.dest)
+                continue
+            # The reads are renamed first, as `x = x` reads the old x.
+            insn = rewrite(insn, current)
+            if dest is not None and dest in renamed:
+                insn = rewrite(insn, lambda var: var, new_name(dest))
+                pushed.append(dest)
+            instructions[position] = insn
+        for succ in block.succs:
+            which = cfg.blocks[succ].preds.index(index)
+            for insn in cfg.blocks[succ].instructions:
+                if isinstance(insn, ir.Phi):
+                    var = insn.args[which]
+                    insn.args[which] = current(var)
+                elif not isinstance(insn, ir.Label):
+                    break
+        work.append((index, pushed))
+        work.extend((child, None) for child in reversed(children[index]))
+    return cfg
+
+
+def sequentialize(copies: list[tuple[IRVar, IRVar]], temporary: Callable[[], IRVar]) -> list[tuple[IRVar, IRVar]]:
+    """Orders the (dest, source) pairs of a parallel copy, where every source is read
+    before any dest is written, into copies that can run one after another. A copy
+    waits while its dest is still to be read; when only cycles are left, one value
+    is saved in a `temporary()` to break its cycle."""
+    pending = {dest: source for dest, source in copies if dest != source}
+    result: list[tuple[IRVar, IRVar]] = []
+    while pending:
+        reads: dict[IRVar, int] = {}
+        for source in pending.values():
+            reads[source] = reads.get(source, 0) + 1
+        ready = [dest for dest in pending if dest not in reads]
+        if ready:
+            for dest in ready:
+                result.append((dest, pending.pop(dest)))
+            continue
+        saved = next(iter(pending))
+        spare = temporary()
+        result.append((spare, saved))
+        for dest, source in pending.items():
+            if source == saved:
+                pending[dest] = spare
+    return result
+
+
+def coalesced(cfg: ControlFlowGraph, live: Liveness) -> dict[IRVar, IRVar]:
+    """Returns the variables that can be renamed to the Phi they are an argument of,
+    which makes the copy between them go away.
+
+    A value flowing into a Phi, like the `i + 1` near the end of a loop for the `i`
+    at its top, can take the Phi's variable if the old value of the Phi is not read
+    after the new one is computed: not later in the same block, not by the other Phis
+    of the block, and not in the blocks that come after. The value must be computed in
+    a block the Phi's block dominates, so that it is dead by the time control comes
+    back to the Phi, and only be read where its definition dominates."""
+    is_dominator = dominance(cfg.dominators())
+    definitions: dict[IRVar, tuple[int, int]] = {}
+    # Where each variable is read; a Phi reads its arguments at the ends of the predecessors.
+    uses: dict[IRVar, list[tuple[int, int]]] = {}
+    for block in cfg.blocks:
+        for position, insn in enumerate(block.instructions):
+            if isinstance(insn, ir.Phi):
+                for pred, var in zip(block.preds, insn.args):
+                    uses.setdefault(var, []).append((pred, len(cfg.blocks[pred].instructions)))
+                continue
+            dest = defined_var(insn)
+            if dest is not None:
+                definitions[dest] = (block.index, position)
+            for var in used_vars(insn):
+                uses.setdefault(var, []).append((block.index, position))
+
+    renamed: dict[IRVar, IRVar] = {}
+    for block in cfg.blocks:
+        phis = [insn for insn in block.instructions if isinstance(insn, ir.Phi)]
+        for phi in phis:
+            for pred, arg in zip(block.preds, phi.args):
+                if arg == phi.dest or arg in renamed or arg not in definitions:
+                    continue
+                defined, position = definitions[arg]
+                number = live.numbers.get(phi.dest)
+                if (not is_dominator(block.index, defined) or not is_dominator(defined, pred)
+                        or any(phi.dest in other.args for other in phis if other is not phi)
+                        or any(index == defined and at > position for index, at in uses.get(phi.dest, []))
+                        or number is not None and live.live_out[defined] >> number & 1 == 1
+                        or not all(at > position if index == defined else is_dominator(defined, index)
+                                   for index, at in uses.get(arg, []))):
+                    continue
+                renamed[arg] = phi.dest
+                break
+    return renamed
+
+
+def from_ssa(cfg: ControlFlowGraph) -> list[ir.Instruction]:
+    """Lowers a graph in SSA form back to an instruction list without Phis.
+
+    The Phis of a block become copies at the ends of its predecessors, one parallel
+    copy per edge, sequentialized. A predecessor with several successors gets a new
+    block on the edge for its copies (critical edge splitting), so they only run when
+    that edge is taken. The new blocks are placed after the last block, behind a jump
+    if the program would otherwise run into them. Backward edges, which close loops,
+    are not split when running their copies on the other edges too does no harm.
+    Values that can share the variable of the Phi they flow into do (see coalesced),
+    and need no copy at all."""
+    temporaries = 0
+    labels = 0
+
+    def temporary() -> IRVar:
+        nonlocal temporaries
+        temporaries += 1
+        return IRVar(f"t.{temporaries}")
+
+    def new_label(loc: Source_location) -> ir.Label:
+        nonlocal labels
+        labels += 1
+        return ir.Label(loc, f"E{labels}")
+
+    live = liveness(cfg)
+
+    def is_live_in(var: IRVar, block: int) -> bool:
+        number = live.numbers.get(var)
+        return number is not None and live.live_in[block] >> number & 1 == 1
+
+    renamed = coalesced(cfg, live)
+    blocks = [[rewrite(insn, lambda var: renamed.get(var, var), renamed.get(defined_var(insn)))  # type: ignore[arg-type]
+               for insn in block.instructions] for block in cfg.blocks]
+    split_blocks: list[list[ir.Instruction]] = []
+    for block in cfg.blocks:
+        phis = [insn for insn in blocks[block.index] if isinstance(insn, ir.Phi)]
+        if not phis:
+            continue
+        blocks[block.index] = [insn for insn in blocks[block.index] if not isinstance(insn, ir.Phi)]
+        for which, pred in enumerate(block.preds):
+            copies = sequentialize([(phi.dest, phi.args[which]) for phi in phis], temporary)
+            if not copies:
+                continue
+            loc = phis[0].location
+            moves: list[ir.Instruction] = [ir.Copy(loc, source, dest) for dest, source in copies]
+            pred_instructions = blocks[pred]
+            last = pred_instructions[-1] if pred_instructions else None
+            if isinstance(last, ir.CondJump) and pred >= block.index and not any(
+                    dest == last.cond or is_live_in(dest, succ)
+                    for dest, _ in copies for succ in cfg.blocks[pred].succs if succ != block.index):
+                # A jump back, closing a loop, is run on every iteration: rather than
+                # a block of its own, its copies go before the CondJump, when the
+                # values they overwrite are not needed on the other way out.
+                pred_instructions[-1:-1] = moves
+            elif isinstance(last, ir.CondJump):
+                target = block.instructions[0]
+                assert isinstance(target, ir.Label)
+                edge = new_label(loc)
+                split_blocks.append([edge, *moves, ir.Jump(loc, target)])
+                pred_instructions[-1] = ir.CondJump(
+                    last.location, last.cond,
+                    edge if last.then_label.name == target.name else last.then_label,
+                    edge if last.else_label.name == target.name else last.else_label)
+            elif isinstance(last, ir.Jump):
+                pred_instructions[-1:-1] = moves
+            else:
+                pred_instructions.extend(moves)
+
+    result = [insn for instructions in blocks for insn in instructions]
+    if split_blocks:
+        if result and not isinstance(result[-1], ir.Jump):
+            end = new_label(result[-1].location)
+            result.append(ir.Jump(end.location, end))
+            split_blocks.append([end])
+        for instructions in split_blocks:
+            result += instructions
+    return result
@@ -0,0 +1,292 @@
+from typing import Generator, Iterable, TypeVar, cast
+from compiler.objects.token import TokenLike
+from compiler.objects.token_stream import TokenStream
+from compiler.parser import binary_binding_powers
+import compiler.objects.ast as ast
+from compiler.objects.node_types import BasicType, Bool, Unit, Int
+
+T = TypeVar("T")
+# A parse step yields the steps it needs the results of and is resumed with each result,
+# finally returning a T. Steps reach their sub-steps through `sub`, which gives the
+# result its type back.
+Step = Generator["Step[object]", object, T]
+
+
+def sub(step: Step[T]) -> Generator[Step[object], object, T]:
+    """Waits for `step`; `result = yield from sub(step)` in a step."""
+    return cast(T, (yield step))
+
+
+class StackParser:
+    """Parser with the same grammar and results as Parser, but without Python recursion.
+
+    Every parse function is a generator that yields a sub-parse instead of calling it.
+    `run` keeps the suspended generators on an explicit stack and resumes the parent
+    with the child's result, so nesting depth is only limited by memory."""
+
+    @staticmethod
+    def parse(tokens: Iterable[TokenLike]) -> ast.Expression:
+        stream = TokenStream(tokens)
+        peek = stream.peek
+        peek_prev = stream.peek_prev
+
+        # The tokens allowed to follow an expression only ever come from a handful of
+        # terminators, so the sets are shared instead of growing a list per nesting level.
+        allowed_sets: dict[tuple[frozenset[str], str], frozenset[str]] = {}
+
+        def allowing(allowed: frozenset[str], text: str) -> frozenset[str]:
+            key = (allowed, text)
+            if key not in allowed_sets:
+                allowed_sets[key] = allowed | {text}
+            return allowed_sets[key]
+
+        top_level_allowed = frozenset([";", "ending"])
+        block_allowed = frozenset([";", "}"])
+
+        def consume(expected: str | None = None) -> TokenLike:
+            token = peek()
+            if expected is not None and token.text != expected:
+                raise Exception(f"{token.loc}: expected '{expected}'")
+            stream.advance()
+            return token
+
+        def parse_identifier() -> ast.Identifier:
+            if peek().type != "identifier":
+                raise Exception(f"{peek().loc}: expected an identifier")
+            token = consume()
+            return ast.Identifier(token.loc, token.text)
+
+        def parse_leaf() -> ast.Expression:
+            """Parses a boolean or integer literal or an identifier."""
+            token = peek()
+            if token.text == "true" or token.text == "false":
+                consume()
+                return ast.Boolean_literal(token.loc, "true" if token.text == "true" else "false")
+            if token.type == "int_literal":
+                consume()
+                return ast.Literal(loc=token.loc, value=int(token.text))
+            if token.type == "identifier":
+                return parse_identifier()
+            raise Exception(f"{token.loc}: expected an integer literal or and identifier")
+
+        def parse_all() -> Step[ast.Block]:
+            expressions = [(yield from sub(parse_expression_top(top_level_allowed, False)))]
+            while peek().text == ";" or peek_prev().text == "}":
+                if peek().text == ";":
+                    consume(";")
+                if peek().type == "end":
+                    break
+                expressions.append((yield from sub(parse_expression_top(top_level_allowed, False))))
+            if peek_prev().text == ";":
+                return ast.Block(peek_prev().loc, expressions, None)
+            return ast.Block(peek_prev().loc, expressions[:-1], expressions[-1])
+
+        def parse_expression_top(allowed: frozenset[str], allow_all: bool) -> Step[ast.Expression]:
+            """Returns the step parsing either a declaration or an expression."""
+            if peek().text == "var":
+                return parse_declaration(allowed, allow_all)
+            return parse_expression(allowed, allow_all)
+
+        def parse_declaration(allowed: frozenset[str], allow_all: bool) -> Step[ast.Declaration]:
+            location = peek().loc
+            consume("var")
+            declaration = yield from sub(parse_expression(allowing(allowed, ":"), allow_all))
+            if peek().text == ":":
+                consume(":")
+                typed = yield from sub(parse_type_expression())
+                consume("=")
+                dec_val = yield from sub(parse_expression(allowed, allow_all))
+                return ast.Declaration(location, variable(declaration), dec_val, typed)
+            if not isinstance(declaration, ast.BinaryOp):
+                raise Exception(f"{location}: expected an initial value for the variable")
+            return ast.Declaration(location, variable(declaration.left), declaration.right, None)
+
+        def variable(name: ast.Expression) -> ast.Identifier:
+            if not isinstance(name, ast.Identifier):
+                raise Exception(f"{name.loc}: expected a variable name")
+            return name
+
+        def parse_type_expression() -> Step[ast.FunctionTypeExpression | BasicType]:
+            if peek().text == "(":
+                location = peek().loc
+                consume("(")
+                parameters = [(yield from sub(parse_type_expression()))]
+                while peek().text == ",":
+                    parameters.append((yield from sub(parse_type_expression())))
+                consume(")")
+                consume("=>")
+                result = yield from sub(parse_type_expression())
+                # The AST declares the parts as expressions, though Int, Bool and Unit are plain types.
+                return ast.FunctionTypeExpression(
+                    loc=location, variable_types=cast(list[ast.Expression], parameters),
+                    result_type=cast(ast.Expression, result))
+            type_expression = parse_identifier()
+            if type_expression.name == "Int":
+                return Int
+            elif type_expression.name == "Bool":
+                return Bool
+            elif type_expression.name == "Unit":
+                return Unit
+            raise Exception(f"Invalid type: {type_expression.name}. Must be either Int, Bool or Unit.")
+
+        def parse_expression(allowed: frozenset[str], allow_all: bool) -> Step[ast.Expression]:
+            # Operator precedence is resolved with an operand and an operator stack
+            # (shunting-yard over the same binding powers as Parser), so only operands
+            # that are themselves compound expressions need a step of their own.
+            operands: list[ast.Expression] = []
+            operators: list[tuple[str, int]] = []
+            while True:
+                left: ast.Expression
+                if peek().text in unary_operators:
+                    left = yield from sub(parse_unary(allowed, allow_all))
+                else:
+                    step = parse_compound(allowed, allow_all)
+                    left = parse_leaf() if step is None else (yield from sub(step))
+                if peek().text == "(":
+                    arguments = yield from sub(parse_arguments(allowed, allow_all))
+                    left = ast.Function(left.loc, function_name(left), arguments)
+                while peek().text in ("*", "/"):
+                    operator = consume().text
+                    right: ast.Expression
+                    if peek().text in unary_operators:
+                        right = yield from sub(parse_unary(allowed, allow_all))
+                    else:
+                        step = parse_compound(allowed, allow_all)
+                        right = parse_leaf() if step is None else (yield from sub(step))
+                    left = ast.BinaryOp(left.loc, left, operator, right)
+                operands.append(left)
+
+                powers = binary_binding_powers.get(peek().text)
+                left_power = powers[0] if powers is not None else -1
+                while operators and operators[-1][1] > left_power:
+                    operator, _ = operators.pop()
+                    right = operands.pop()
+                    left = operands.pop()
+                    operands.append(ast.BinaryOp(left.loc, left, operator, right))
+                if powers is None:
+                    break
+                operators.append((consume().text, powers[1]))
+
+            if peek().type != "end" and peek().text not in allowed and not allow_all and peek_prev().text != "}":
+                raise Exception(f"{peek().loc}: unexpected term: {peek().text}")
+            return operands[0]
+
+        def function_name(function: ast.Expression) -> ast.Identifier:
+            if not isinstance(function, ast.Identifier):
+                raise Exception(f"{function.loc}: only named functions can be called")
+            return function
+
+        def parse_unary(allowed: frozenset[str], allow_all: bool) -> Step[ast.Expression]:
+            operator = peek().text
+            location = peek().loc
+            operators = []
+            while peek().text == operator:
+                operators.append(consume(operator).text)
+            step = parse_compound(allowed, allow_all)
+            factor = parse_leaf() if step is None else (yield from sub(step))
+            return ast.Unary(location, operators, factor)
+
+        def parse_compound(allowed: frozenset[str], allow_all: bool) -> Step[ast.Expression] | None:
+            """Returns the step parsing the expression started by the next token,
+            or None if it is a literal or an identifier."""
+            text = peek().text
+            if text == "(":
+                return parse_parenthesized(allowed, allow_all)
+            elif text == "{":
+                return parse_block()
+            elif text == "if":
+                return parse_if_clause(allowed, allow_all)
+            elif text == "var":
+                raise Exception(f"{peek().loc}: variable declaration only allowed in blocks or top-level")
+            elif text == "while":
+                return parse_while_loop(allowed, allow_all)
+            return None
+
+        def parse_parenthesized(allowed: frozenset[str], allow_all: bool) -> Step[ast.Expression]:
+            consume("(")
+            expr = yield from sub(parse_expression(allowing(allowed, ")"), allow_all))
+            consume(")")
+            return expr
+
+        def parse_while_loop(allowed: frozenset[str], allow_all: bool) -> Step[ast.While_loop]:
+            location = peek().loc
+            consume("while")
+            cond = yield from sub(parse_expression(allowing(allowed, "do"), allow_all))
+            consume("do")
+            itering = yield from sub(parse_expression(allowed, allow_all))
+            return ast.While_loop(location, cond, itering)
+
+        def parse_if_clause(allowed: frozenset[str], allow_all: bool) -> Step[ast.IfExpression]:
+            location = peek().loc
+            consume("if")
+            expr = yield from sub(parse_expression(allowing(allowed, "then"), allow_all))
+            consume("then")
+            then_expr = yield from sub(parse_expression(allowing(allowed, "else"), allow_all))
+            else_expr = None
+            if peek().text == "else":
+                consume("else")
+                else_expr = yield from sub(parse_expression(allowed, allow_all))
+            return ast.IfExpression(location, expr, then_expr, else_expr)
+
+        def parse_arguments(allowed: frozenset[str], allow_all: bool) -> Step[list[ast.Expression]]:
+            arguments = []
+            argument_allowed = allowing(allowing(allowed, ","), ")")
+            consume("(")
+            if peek().text != ")":
+                arguments.append((yield from sub(parse_expression(argument_allowed, allow_all))))
+                while peek().text == ",":
+                    consume(",")
+                    arguments.append((yield from sub(parse_expression(argument_allowed, allow_all))))
+            consume(")")
+            return arguments
+
+        def parse_block() -> Step[ast.Block]:
+            location = peek().loc
+            consume("{")
+            sequence = []
+            result = None
+            if peek().text != "}":
+                line = yield from sub(parse_expression_top(block_allowed, True))
+                if peek().text not in block_allowed and not isinstance(line, ast.Block) and not peek_prev().text == "}":
+                    raise Exception(f"Missing semicolon at {peek().loc}")
+                if peek().text != "}":
+                    while peek().text == ";" or isinstance(line, ast.Block) or peek_prev().text == "}":
+                        if peek().text == ";":
+                            consume(";")
+                        sequence.append(line)
+                        if peek().text != "}":
+                            line = yield from sub(parse_expression_top(block_allowed, True))
+                            if peek().text == "}":
+                                result = line
+                                break
+                        else:
+                            break
+                else:
+                    result = line
+            if peek().text != "}":
+                raise Exception(f"Missing semicolon at {peek().loc}")
+            consume("}")
+            if not result:
+                result = ast.Literal(None, None)
+            return ast.Block(location, sequence, result)
+
+        unary_operators = ("not", "-")
+
+        return StackParser.run(parse_all())
+
+    @staticmethod
+    def run(step: Step[ast.Expression]) -> ast.Expression:
+        """Runs `step` to completion, keeping the steps it waits on on an explicit stack."""
+        stack: list[Step[object]] = [step]
+        value: object = None
+        while stack:
+            try:
+                child = stack[-1].send(value)
+            except StopIteration as finished:
+                stack.pop()
+                value = finished.value
+                continue
+            stack.append(child)
+            value = None
+        assert isinstance(value, ast.Expression)
+        return value
@@ -1,79 +1,201 @@
+import codecs
 import re
+from array import array
+from bisect import bisect_left, bisect_right
+from mmap import mmap
+from typing import BinaryIO, Iterator, TextIO
 from compiler.objects.token import Token
 from compiler.objects.source_location import Source_location
+from compiler.objects.token_buffer import TokenBuffer, token_kind_codes, END
 
-identifier_keyword_re = re.compile(r"([a-z]|[A-Z]|_)([a-z]|[A-Z]|_|[0-9])*")
-integer_literal_re = re.compile(r"([1-9][0-9]*|[0-9])")
-whitespace_re = re.compile(r"[ \t\r\f\v]+")
-newline_re = re.compile(r"\n")
-operators_re = re.compile(r"(==|!=|<=|>=|=>|<|>|\+|-|\*|/|=|%|not)")
-punctuation_re = re.compile(r"(\(|\)|{|}|,|;|:)")
-oneline_comment_re = re.compile(r"(//|#).+($|\n)")
-multiline_comment_re = re.compile(r"/[*](\s|.)+?[*]/")
-
-
+# All lexemes are recognised by a single precompiled alternation. The order of the
+# alternatives is the order in which they were tried before, so e.g. "not" is still
+# an identifier and "//" still starts a comment instead of being two divisions.
+# Anything that matches none of the real lexemes is skipped one character at a time.
+token_re = re.compile(r"""
+    (?P<skip>[ \t\r\f\v\n]+|(?://|\#)[^\n]*|/\*[\s\S]+?\*/)
+  | (?P<identifier>[a-zA-Z_][a-zA-Z_0-9]*)
+  | (?P<int_literal>[1-9][0-9]*|[0-9])
+  | (?P<operator>==|!=|<=|>=|=>|<|>|\+|-|\*|/|=|%)
+  | (?P<punctuation>[(){},;:])
+  | (?P<unknown>.)
+""", re.VERBOSE)
 
 
 class Tokenizer:
     @staticmethod
-    def tokenize(source_code: str, file_name: str = "tester") -> list[str]:
+    def tokenize(source_code: str, file_name: str = "tester") -> list[Token]:
         tokens = []
         line = 1
-        indx = 0
-        column = 1
-        regexes = [(identifier_keyword_re, "identifier"), (integer_literal_re, "int_literal"), (operators_re, "operator"), (punctuation_re, "punctuation")]
-        
-        def regex_matcher():
-            nonlocal indx
-            nonlocal column
-            for regex in regexes:
-                match = regex[0].match(source_code, indx)
-                if match:
-                    source = Source_location(file_name, line, column)
-                    new_token = Token(source, regex[1], match.group())
-                    tokens.append(new_token)
-                    indx = match.end()
-                    column += len(match.group())
-                    return True
-            return False
-        
-        def line_matcher():
-            nonlocal indx
-            nonlocal column
-            nonlocal line
-            line_regexes = [newline_re, oneline_comment_re]
-            for regex in line_regexes:
-                match = regex.match(source_code, indx)
-                if match:
-                    column = 1
-                    line += 1
-                    indx = match.end()
-                    return True
-            return False
-
-        while indx < len(source_code):
-            whites = whitespace_re.match(source_code, indx)
-            if whites:
-                indx = whites.end()
-                column += len(whites.group())
-                continue
-            if line_matcher():
-                continue
-            multiline = multiline_comment_re.match(source_code, indx)
-            if multiline:
-                linesskips = len(newline_re.findall(source_code, indx, multiline.end()))
-                line += linesskips
-                indx = multiline.end()
-                column = 0
-                continue
-            if regex_matcher():
-                continue
-            indx += 1
-            column += 1
+        line_start = 0
+
+        for match in token_re.finditer(source_code):
+            kind = match.lastgroup
+            if kind == "skip":
+                # Whitespace and comments are the only lexemes that can span lines,
+                # so newlines are counted in bulk only for them.
+                text = match.group()
+                newlines = text.count("\n")
+                if newlines:
+                    line += newlines
+                    line_start = match.start() + text.rindex("\n") + 1
+            elif kind != "unknown":
+                start = match.start()
+                source = Source_location(file_name, line, start - line_start + 1)
+                tokens.append(Token(source, kind, match.group()))
         tokens.append(Token(Source_location(file_name, line + 1, 0), "end", "ending"))
         return tokens
 
+    @staticmethod
+    def tokenize_compact(source_code: str, file_name: str = "tester") -> TokenBuffer:
+        """Tokenizes like `tokenize`, but into a TokenBuffer instead of a list of Token objects."""
+        buffer = TokenBuffer(source_code, file_name)
+        Tokenizer.lex_into(buffer, 0, len(source_code))
+        buffer.kinds.append(END)
+        buffer.starts.append(len(source_code))
+        buffer.lengths.append(0)
+        return buffer
+
+    @staticmethod
+    def lex_into(buffer: TokenBuffer, start: int, end: int) -> None:
+        """Appends the tokens and line starts of `buffer.source[start:end]` to `buffer`."""
+        kinds = buffer.kinds
+        starts = buffer.starts
+        lengths = buffer.lengths
+        line_starts = buffer.line_starts
+        codes = token_kind_codes
+        for match in token_re.finditer(buffer.source, start, end):
+            kind = match.lastgroup
+            if kind == "skip":
+                match_start = match.start()
+                newline = buffer.source.find("\n", match_start, match.end())
+                while newline != -1:
+                    line_starts.append(newline + 1)
+                    newline = buffer.source.find("\n", newline + 1, match.end())
+            elif kind != "unknown":
+                match_start = match.start()
+                kinds.append(codes[kind])
+                starts.append(match_start)
+                lengths.append(match.end() - match_start)
+
+    @staticmethod
+    def relex(previous: TokenBuffer, offset: int, deleted: int, inserted: str) -> TokenBuffer:
+        """Returns the TokenBuffer of `previous.source` after replacing `deleted` characters
+        at `offset` with `inserted`, re-lexing only around the edit.
+
+        Lexing restarts at the start of the last token before the edit, moved further back
+        past any "/*" that is not closed before it, since inserting a "*/" can turn such an
+        opener and everything after it into a comment. Lexing stops as soon as a token starts
+        after the edit where an old token started at the same, shifted, position: from there
+        on the text and thus the tokens are the same, so the old ones are reused with their
+        offsets shifted."""
+        old_source = previous.source
+        source = old_source[:offset] + inserted + old_source[offset + deleted:]
+        shift = len(inserted) - deleted
+        edit_end = offset + len(inserted)
+
+        restart_index = max(bisect_left(previous.starts, offset) - 1, 0)
+        restart = previous.starts[restart_index] if restart_index else 0
+        opener = old_source.rfind("/*", 0, restart)
+        # A comment needs at least one character between "/*" and "*/".
+        while opener != -1 and old_source.find("*/", opener + 3, restart) == -1:
+            restart_index = max(bisect_right(previous.starts, opener) - 1, 0)
+            restart = previous.starts[restart_index] if restart_index else 0
+            opener = old_source.rfind("/*", 0, restart)
+
+        buffer = TokenBuffer(source, previous.file_name)
+        buffer.kinds = previous.kinds[:restart_index]
+        buffer.starts = previous.starts[:restart_index]
+        buffer.lengths = previous.lengths[:restart_index]
+        buffer.line_starts = previous.line_starts[:bisect_right(previous.line_starts, restart)]
+
+        # Every lexeme start is also a match start, so the old tokens can be resumed at the
+        # first new token (or the end of input) that lines up with an old token start.
+        resume = len(previous.kinds) - 1
+        resume_at = len(source)
+        codes = token_kind_codes
+        for match in token_re.finditer(source, restart):
+            kind = match.lastgroup
+            if kind == "skip" or kind == "unknown":
+                continue
+            start = match.start()
+            if start >= edit_end:
+                index = bisect_left(previous.starts, start - shift)
+                if index < len(previous.starts) and previous.starts[index] == start - shift:
+                    resume = index
+                    resume_at = start
+                    break
+            buffer.kinds.append(codes[kind])
+            buffer.starts.append(start)
+            buffer.lengths.append(match.end() - start)
+
+        newline = source.find("\n", restart, resume_at)
+        while newline != -1:
+            buffer.line_starts.append(newline + 1)
+            newline = source.find("\n", newline + 1, resume_at)
+        old_resume_at = resume_at - shift
+        buffer.kinds += previous.kinds[resume:]
+        buffer.lengths += previous.lengths[resume:]
+        buffer.starts += array("q", map(shift.__add__, previous.starts[resume:]))
+        buffer.line_starts += array("q", map(shift.__add__, previous.line_starts[bisect_right(previous.line_starts, old_resume_at):]))
+        return buffer
+
+    @staticmethod
+    def stream(source: TextIO | BinaryIO | mmap, file_name: str = "tester", chunk_size: int = 1 << 16) -> Iterator[Token]:
+        """Yields the same tokens as `tokenize`, reading `source` lazily in chunks.
+
+        `source` can be a text or binary file object or an mmap; bytes are decoded as UTF-8.
+        Only the unlexed tail of the input is kept in memory, except while inside a
+        `/* */` comment, which is buffered until it is closed."""
+        decoder = codecs.getincrementaldecoder("utf-8")()
+
+        def read(size: int) -> str:
+            while True:
+                chunk = source.read(size)
+                if not isinstance(chunk, bytes):
+                    return chunk
+                # A chunk can end in the middle of a multi-byte character.
+                text = decoder.decode(chunk, final=not chunk)
+                if text or not chunk:
+                    return text
+
+        buffer = ""
+        pos = 0
+        eof = False
+        line = 1
+        # Offset of the start of the current line, relative to the start of `buffer`.
+        line_start = 0
+
+        while True:
+            match = token_re.match(buffer, pos)
+            # A lexeme touching the end of the buffer might continue in the next chunk,
+            # and a "/" followed by "*" is an unclosed comment whose end is not read yet.
+            if not eof and (match is None or match.end() == len(buffer)
+                            or (match.group() == "/" and buffer.startswith("*", match.end()))):
+                # Grow the read size with the buffer so long comments are not rescanned quadratically.
+                chunk = read(max(chunk_size, len(buffer) - pos))
+                if chunk:
+                    buffer = buffer[pos:] + chunk
+                    line_start -= pos
+                    pos = 0
+                else:
+                    eof = True
+                continue
+            if match is None:
+                break
+            kind = match.lastgroup
+            if kind == "skip":
+                text = match.group()
+                newlines = text.count("\n")
+                if newlines:
+                    line += newlines
+                    line_start = match.start() + text.rindex("\n") + 1
+            elif kind != "unknown":
+                yield Token(Source_location(file_name, line, match.start() - line_start + 1), kind, match.group())
+            pos = match.end()
+        yield Token(Source_location(file_name, line + 1, 0), "end", "ending")
+
 
 if __name__ == "__main__":
     T = Tokenizer()
-    print(T.tokenize("123 # hello"))
\ No newline at end of file
+    print(T.tokenize("123 # hello"))
@@ -1,15 +1,24 @@
 import compiler.objects.ast as ast
 from compiler.objects.node_types import Int, Bool, Unit, Type, FunType
 from compiler.objects.sym_table import SymTab
+from compiler.objects.ast_walker import Evaluator, evaluate
+from compiler.name_resolver import resolve_names, GLOBAL
+from compiler.assets.builtins import builtin_types
 
-def typechecker(node: ast.Expression, top_level: SymTab = SymTab({"print_int": FunType([Int], Unit), "print_bool": FunType([Bool], Unit), "read_int": FunType([], Int)}, None)) -> Type:
+def typechecker(node: ast.Expression, top_level: SymTab | None = None) -> Type:
     lineType = ""
 
-    top_level_vars = top_level
+    # Each call gets its own scope over the shared builtins, so nothing is kept between calls.
+    top_level_vars = top_level if top_level is not None else builtin_types.overlay()
 
-    def binary_op_type(node: ast.BinaryOp, symbols: SymTab = SymTab({}, None)) -> Type:
-        t1 = typecheck(node.left, symbols)
-        t2 = typecheck(node.right, symbols)
+    # Identifiers are bound to their declarations up front, so the types of local
+    # variables are kept by binding instead of in a symbol table per block.
+    resolution = resolve_names(node)
+    local_types: dict[int, Type] = {}
+
+    def binary_op_type(node: ast.BinaryOp) -> Evaluator[Type]:
+        t1 = yield node.left
+        t2 = yield node.right
         if node.op in ["+", "-", "*", "/", "%"]:
             if t1 is not Int or t2 is not Int:
                 raise Exception(f"In {node} the operators were not of same type")
@@ -31,63 +40,62 @@ def typechecker(node: ast.Expression, top_level: SymTab = SymTab({"print_int": F
                 raise Exception(f"{node.left} and {node.right} are not both boolean")
             return Bool
         
-    def if_expression_type(node: ast.IfExpression, symbols: SymTab = SymTab({}, None)) -> Type:
-        t1 = typecheck(node.cond, symbols)
+    def if_expression_type(node: ast.IfExpression) -> Evaluator[Type]:
+        t1 = yield node.cond
         if t1 is not Bool:
             raise Exception(f"In {node} the condition is not of type Bool")
-        t2 = typecheck(node.then_clause, symbols)
+        t2 = yield node.then_clause
         if node.else_clause:
-            t3 = typecheck(node.else_clause, symbols)
+            t3 = yield node.else_clause
             if t2 != t3:
                 raise Exception(f"In {node} then and else were not of same type")
             return t2
         else:
             return Unit
         
-    def literal_type(node: ast.Literal, symbols: SymTab = SymTab({}, None)) -> Type:
+    def literal_type(node: ast.Literal) -> Type:
         if isinstance(node.value, int):
             return Int
         elif node.value == None:
-            return None
+            return Unit
         else:
             print(node)
             raise Exception(f"Unknown literal type: {node.value}")
 
-    def identifier_type(node: ast.Identifier, symbols: SymTab = SymTab({}, None)) -> Type:
-        if symbols:
-            if node.name in symbols.variables.keys():
-                return symbols.variables[node.name]
-            current_scope = symbols.parent
-            while(current_scope):
-                if node.name in current_scope.variables.keys():
-                    return current_scope.variables[node.name]
-                current_scope = current_scope.parent
+    def identifier_type(node: ast.Identifier) -> Type:
+        if node.binding != GLOBAL:
+            if node.binding in local_types:
+                return local_types[node.binding]
+        else:
+            global_type = top_level_vars.require(node.name)
+            if global_type is not None:
+                return global_type
         raise Exception(f"Variable referenced before declaration")
 
-    def declaration_type(node: ast.Declaration, symbols: SymTab = SymTab({}, None)) -> Type:
-        val = typecheck(node.value, symbols)
-        if node.variable.name in symbols.variables.keys():
+    def declaration_type(node: ast.Declaration) -> Evaluator[Type]:
+        val = yield node.value
+        if node.variable.binding in resolution.redeclared:
             raise Exception(f"{node.variable.name} already declared")
         if node.typed:
             typed_type = node.typed
             if val != typed_type:
                 raise Exception(f"{node.value} is not of type {typed_type}")
-        symbols.variables[node.variable.name] = val
+        local_types[node.variable.binding] = val
         return Unit
     
-    def unary_type(node: ast.Unary, symbols: SymTab = SymTab({}, None)) -> Type:
-        val = typecheck(node.exp, symbols)
+    def unary_type(node: ast.Unary) -> Evaluator[Type]:
+        val = yield node.exp
         return val
     
-    def boolean_literal_type(node: ast.Boolean_literal, symbols: SymTab = SymTab({}, None)) -> Type:
+    def boolean_literal_type(node: ast.Boolean_literal) -> Type:
         if node.boolean in ["true", "false"]:
             return Bool
         
-    def function_type(node: ast.Function, symbols: SymTab = SymTab({}, None)) -> Type:
+    def function_type(node: ast.Function) -> Evaluator[Type]:
         parameter_types = []
         for par in node.arguments:
-            parameter_types.append(typecheck(par, symbols))
-        res = typecheck(node.name, symbols)
+            parameter_types.append((yield par))
+        res = yield node.name
         if isinstance(res, FunType):
             for i in range(len(res.parameter_types)):
                 if parameter_types[i] != res.parameter_types[i]:
@@ -95,62 +103,43 @@ def typechecker(node: ast.Expression, top_level: SymTab = SymTab({"print_int": F
             return res.result_type
         return FunType(parameter_types, res)
 
-    def block_type(node: ast.Block, symbols: SymTab = SymTab({}, None)) -> Type:
-        new_level = SymTab({}, symbols)
+    def block_type(node: ast.Block) -> Evaluator[Type]:
         if len(node.sequence) == 0 and not node.result:
             return Unit
         for i in node.sequence:
-            typecheck(i, new_level)
+            yield i
         if node.result is not None and not (isinstance(node.result, ast.Literal) and node.result == ast.Literal(None, None)):
-            return typecheck(node.result, new_level)
+            return (yield node.result)
         else:
             return Unit
         
-    def while_loop_type(node: ast.While_loop, symbols: SymTab = SymTab({}, None)) -> Type:
-        cond = typecheck(node.condition, symbols)
+    def while_loop_type(node: ast.While_loop) -> Evaluator[Type]:
+        cond = yield node.condition
         if cond is not Bool:
             raise Exception(f"In {node} the condition is not of type Bool")
         return Unit
 
-    def typecheck(node: ast.Expression, symbols: SymTab = SymTab({}, None)) -> Type:
-        result = None
-        match node:
-            case ast.BinaryOp():
-                result = binary_op_type(node, symbols)
-            
-            case ast.IfExpression():
-                result = if_expression_type(node, symbols)
-            
-            case ast.Literal():
-                result = literal_type(node, symbols)
-
-            case ast.Identifier():
-                result = identifier_type(node, symbols)            
-            
-            case ast.Declaration():
-                result = declaration_type(node, symbols)
-            
-            case ast.Unary():
-                result = unary_type(node, symbols)
-
-            case ast.Boolean_literal():
-                result = boolean_literal_type(node, symbols)
-
-            case ast.Function():
-                result = function_type(node, symbols)
-
-            case ast.Block():
-                result = block_type(node, symbols)
-
-            case ast.While_loop():
-                result = while_loop_type(node, symbols)
-
+    # The compound nodes are checked by generators that yield the children to check, so
+    # that `evaluate` can check arbitrarily deep trees without recursion.
+    leaf_types = {
+        ast.Literal: literal_type,
+        ast.Identifier: identifier_type,
+        ast.Boolean_literal: boolean_literal_type,
+    }
+    compound_types = {
+        ast.BinaryOp: binary_op_type,
+        ast.IfExpression: if_expression_type,
+        ast.Declaration: declaration_type,
+        ast.Unary: unary_type,
+        ast.Function: function_type,
+        ast.Block: block_type,
+        ast.While_loop: while_loop_type,
+    }
+
+    def annotate(node: ast.Expression, result: Type) -> None:
         node.type = result
-        return result
-    
 
-                
-    lineType = typecheck(node, top_level_vars)
+    lineType = evaluate(node, leaf_types, compound_types, annotate)
 
     return lineType
                 
@@ -0,0 +1,60 @@
+from compiler.compact_parser import CompactParser
+from compiler.objects.ast_arena import AstArena, NodeView
+from compiler.parser import Parser
+from compiler.stack_parser import StackParser
+from compiler.tokenizer import Tokenizer
+import compiler.objects.ast as ast
+
+source = """var x: Int = 1;
+var f: (Int) => Unit = g;
+while x < 10 do {
+    x = x + - - 1;
+    if not done then print_int(x) else { };
+};
+if x == 10 then { true } else false;
+x"""
+
+
+def test_arena_round_trip() -> None:
+    tree = Parser.parse(Tokenizer.tokenize(source))
+    arena = AstArena.from_tree(tree)
+    assert repr(arena.to_tree()) == repr(tree)
+
+
+def test_compact_parse_matches_parse() -> None:
+    for code in [source, source + ";", "1", "{ 1 }\n{ 2 }"]:
+        buffer = Tokenizer.tokenize_compact(code)
+        assert repr(CompactParser.parse(buffer).to_tree()) == repr(Parser.parse(buffer))
+
+
+def test_payloads_are_shared() -> None:
+    arena = AstArena.from_tree(Parser.parse(Tokenizer.tokenize("x = x + x; y = x")))
+    assert arena.payloads.count("x") == 1
+    assert len(arena) == 9
+
+
+def test_node_views() -> None:
+    arena = CompactParser.parse(Tokenizer.tokenize_compact(source))
+    root = arena.view(arena.root)
+    assert root.kind is ast.Block
+    assert root.result.name == "x"
+    declaration = root.sequence[0]
+    assert declaration.kind is ast.Declaration
+    assert declaration.variable.name == "x"
+    assert declaration.value.value == 1
+    assert declaration.loc.line == 1 and declaration.loc.column == 1
+    loop = root.sequence[2]
+    assert loop.condition.op == "<"
+    assignment = loop.itering.sequence[0]
+    assert assignment.right.right.operators == ["-", "-"]
+    assert loop.itering.sequence[1].else_clause.result.value is None
+    assert isinstance(loop.condition.left, NodeView)
+    assert not hasattr(loop, "__dict__")
+
+
+def test_deep_tree_round_trip() -> None:
+    tree = StackParser.parse(Tokenizer.tokenize("(" * 50000 + "1" + ")" * 50000 + " + 2"))
+    arena = AstArena.from_tree(tree)
+    rebuilt = arena.to_tree()
+    assert isinstance(rebuilt, ast.Block) and isinstance(rebuilt.result, ast.BinaryOp)
+    assert rebuilt.result.right.value == 2
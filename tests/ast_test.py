@@ -0,0 +1,60 @@
+from compiler.parser import Parser
+from compiler.stack_parser import StackParser
+from compiler.tokenizer import Tokenizer
+from compiler.assets.test_source import L
+import compiler.objects.ast as ast
+
+
+def parse(code: str) -> ast.Expression:
+    return Parser.parse(Tokenizer.tokenize(code))
+
+
+def test_equality_is_structural() -> None:
+    assert parse("a + f(1, x)") == parse("a  +  f(1,x)")
+    assert (parse("a + b") == parse("a - b")) is False
+    assert (ast.Literal(L, 1) == ast.Identifier(L, "x")) is False
+    assert ast.Literal(L, 1) != ast.Literal(None, 2)
+    assert ast.Unary(L, ["-"], ast.Literal(L, 1)) != ast.Unary(L, ["-", "-"], ast.Literal(L, 1))
+
+
+def test_equal_nodes_hash_equal() -> None:
+    first = parse("var x = 1; while x < 10 do { x = x + 1 }; x")
+    second = parse("var x = 1;\n\nwhile x < 10 do {\n  x = x + 1\n};\nx")
+    assert hash(first) == hash(second)
+    assert {first: "program"}[second] == "program"
+    assert len({parse("1 + 2"), parse("1+2"), parse("2 + 1")}) == 2
+
+
+def test_deep_trees_hash_and_compare_without_recursion() -> None:
+    code = "if a then 1 else " * 50000 + "2"
+    first = StackParser.parse(Tokenizer.tokenize(code))
+    second = StackParser.parse(Tokenizer.tokenize(code))
+    assert hash(first) == hash(second)
+    assert first == second
+
+
+def test_hash_consing_shares_equal_subtrees() -> None:
+    table = ast.HashConsTable()
+    left = table.make(ast.BinaryOp, L, ast.Identifier(L, "a"), "*", ast.Literal(L, 2))
+    right = table.make(ast.BinaryOp, None, ast.Identifier(None, "a"), "*", ast.Literal(None, 2))
+    assert left is right
+
+    tree = table.share(parse("f(a * 2 + b, a * 2 + b); a * 2"))
+    assert isinstance(tree, ast.Block) and isinstance(tree.result, ast.BinaryOp)
+    call = tree.sequence[0]
+    assert isinstance(call, ast.Function)
+    assert call.arguments[0] is call.arguments[1]
+    assert tree.result is left
+
+
+def test_declarations_with_different_annotations_are_not_shared() -> None:
+    assert parse("var x: Int = 1") == parse("var x:Int = 1")
+    assert parse("var x: Int = 1") != parse("var x: Bool = 1")
+    assert parse("var x: Int = 1") != parse("var x = 1")
+    assert parse("var f: (Int) => Int = g") != parse("var f: (Bool) => Int = g")
+
+    table = ast.HashConsTable()
+    tree = table.share(parse("{ var x: Int = 1 }; { var x: Bool = 1 }; { var x = 1 }"))
+    assert isinstance(tree, ast.Block)
+    declarations = [block.result for block in tree.sequence + [tree.result] if isinstance(block, ast.Block)]
+    assert len(declarations) == 3 and len({id(declaration) for declaration in declarations}) == 3
@@ -0,0 +1,86 @@
+from compiler.objects.ast_arena import node_layouts
+from compiler.objects.ast_walker import Visitor, child_fields, children, walk, walk_postorder, walk_preorder
+from compiler.parser import Parser
+from compiler.stack_parser import StackParser
+from compiler.tokenizer import Tokenizer
+import compiler.objects.ast as ast
+
+
+def parse(code: str) -> ast.Expression:
+    return Parser.parse(Tokenizer.tokenize(code))
+
+
+def describe(node: ast.Expression) -> str:
+    match node:
+        case ast.Literal():
+            return str(node.value)
+        case ast.Identifier():
+            return node.name
+        case ast.BinaryOp():
+            return node.op
+        case _:
+            return type(node).__name__
+
+
+def test_children_in_evaluation_order() -> None:
+    tree = parse("if a then f(1, b) else { x; y }")
+    assert isinstance(tree, ast.Block) and isinstance(tree.result, ast.IfExpression)
+    assert [describe(child) for child in children(tree.result)] == ["a", "Function", "Block"]
+    assert [describe(child) for child in children(tree.result.then_clause)] == ["f", "1", "b"]
+    assert [describe(child) for child in children(tree.result.else_clause)] == ["x", "y"]  # type: ignore[arg-type]
+    assert [describe(child) for child in children(parse("if a then b").result)] == ["a", "b"]  # type: ignore[arg-type]
+
+
+def test_child_fields_are_derived_from_structure() -> None:
+    for cls, fields in child_fields.items():
+        assert [name for name in cls.structure if name in fields] == list(fields)
+    assert child_fields[ast.Unary] == ("exp",)
+    assert child_fields[ast.Declaration] == ("variable", "value")
+    assert node_layouts[ast.Block] == (("result",), "sequence", None)
+    assert node_layouts[ast.Declaration] == (("variable", "value"), None, "typed")
+    tree = parse("var f: (Int) => Int = g; f")
+    assert not any(isinstance(node, ast.FunctionTypeExpression) for node in walk_preorder(tree))
+
+
+def test_preorder_and_postorder() -> None:
+    tree = parse("var x = 1 + 2; x * 3")
+    assert [describe(node) for node in walk_preorder(tree)] == ["Block", "Declaration", "x", "+", "1", "2", "*", "x", "3"]
+    assert [describe(node) for node in walk_postorder(tree)] == ["x", "1", "2", "+", "Declaration", "x", "3", "*", "Block"]
+
+
+def test_walk_enter_leave_and_skip() -> None:
+    events = []
+
+    def enter(node: ast.Expression) -> bool:
+        events.append(f"enter {describe(node)}")
+        return not isinstance(node, ast.While_loop)
+
+    def leave(node: ast.Expression) -> None:
+        events.append(f"leave {describe(node)}")
+
+    walk(parse("{ a }; while b do c"), enter, leave)
+    assert events == ["enter Block", "enter Block", "enter a", "leave a", "leave Block", "enter While_loop", "leave Block"]
+
+
+def test_visitor_dispatch() -> None:
+    class CountNames(Visitor):
+        def __init__(self) -> None:
+            super().__init__()
+            self.names: list[str] = []
+            self.others = 0
+
+        def visit_Identifier(self, node: ast.Identifier) -> None:
+            self.names.append(node.name)
+
+        def generic_visit(self, node: ast.Expression) -> None:
+            self.others += 1
+
+    visitor = CountNames()
+    visitor.visit_postorder(parse("a = b + c; print_int(a)"))
+    assert visitor.names == ["a", "b", "c", "print_int", "a"]
+    assert visitor.others == 4
+
+
+def test_deep_tree_walk() -> None:
+    tree = StackParser.parse(Tokenizer.tokenize("if a then 1 else " * 100000 + "2"))
+    assert sum(1 for _ in walk_preorder(tree)) == sum(1 for _ in walk_postorder(tree)) == 300002
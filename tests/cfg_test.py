@@ -0,0 +1,52 @@
+from compiler.assets.builtins import rt_types
+from compiler.cfg import build_cfg, dominates, find_loops, NONE
+from compiler.ir_generator import generate_ir
+from compiler.parser import Parser
+from compiler.tokenizer import Tokenizer
+from compiler.typechecker import typechecker
+import compiler.objects.ir_instructions as ir
+
+
+def cfg_of(source: str):
+    tree = Parser.parse(Tokenizer.tokenize(source))
+    typechecker(tree)
+    instructions = generate_ir(rt_types, tree)
+    return instructions, build_cfg(instructions)
+
+
+def test_blocks_and_edges_of_a_loop() -> None:
+    instructions, cfg = cfg_of("var x = 0; while x < 3 do { x = x + 1 }; if x == 3 then print_int(x) else print_int(0)")
+    assert cfg.instructions() == instructions
+    assert [block.label for block in cfg.blocks] == [None, "L1", "L2", "L3", "L4", "L5", "L6"]
+    # entry -> header <-> body, header -> exit -> then | else -> end
+    assert [block.succs for block in cfg.blocks] == [[1], [2, 3], [1], [4, 5], [6], [6], []]
+    assert [block.preds for block in cfg.blocks] == [[], [0, 2], [1], [1], [3], [3], [4, 5]]
+    for block in cfg.blocks:
+        last = block.instructions[-1]
+        assert all(not isinstance(insn, (ir.Jump, ir.CondJump)) for insn in block.instructions[:-1])
+        if isinstance(last, ir.Jump):
+            assert len(block.succs) == 1
+
+
+def test_dominators() -> None:
+    _, cfg = cfg_of("var x = 0; while x < 3 do { x = x + 1 }; if x == 3 then print_int(x) else print_int(0)")
+    idom = cfg.dominators()
+    assert idom == [0, 0, 1, 1, 3, 3, 3]
+    assert dominates(idom, 1, 6) and dominates(idom, 0, 2) and not dominates(idom, 4, 6)
+    assert cfg.reverse_postorder() == [0, 1, 2, 3, 4, 5, 6]
+
+
+def test_unreachable_blocks_have_no_dominator() -> None:
+    cfg = build_cfg([
+        ir.Jump(None, ir.Label(None, "end")),
+        ir.Label(None, "dead"),
+        ir.Label(None, "end"),
+    ])
+    assert [block.succs for block in cfg.blocks] == [[2], [2], []]
+    assert cfg.dominators() == [0, NONE, 0]
+
+
+def test_nested_loops_come_inner_first() -> None:
+    _, cfg = cfg_of("var i = 0; while i < 3 do { var j = 0; while j < i do j = j + 1; i = i + 1 }; i")
+    loops = find_loops(cfg, cfg.dominators())
+    assert [(loop.header, sorted(loop.blocks), loop.latches) for loop in loops] == [(3, [3, 4], [4]), (1, [1, 2, 3, 4, 5], [5])]
@@ -0,0 +1,51 @@
+from compiler.assembly_generator import get_all_ir_variables
+from compiler.assets.builtins import rt_types
+from compiler.ir_generator import generate_ir
+from compiler.assets.test_source import L
+from compiler.objects.compact_ir import CompactIR, CALL
+from compiler.objects.ir_variables import IRVar
+from compiler.objects.node_types import Int
+from compiler.parser import Parser
+from compiler.tokenizer import Tokenizer
+from compiler.typechecker import typechecker
+
+source = """var x = read_int();
+var y = true;
+while x > 0 and y do {
+    if x % 2 == 0 then print_int(x) else y = not y;
+    x = x - 1;
+};
+x"""
+
+
+def generated() -> list:
+    tree = Parser.parse(Tokenizer.tokenize(source))
+    typechecker(tree)
+    return generate_ir(rt_types, tree)
+
+
+def test_compact_ir_round_trip() -> None:
+    instructions = generated()
+    compact = CompactIR.from_instructions(instructions, rt_types)
+    assert compact.to_instructions() == instructions
+    assert [str(i) for i in compact] == [str(i) for i in instructions]
+    assert compact.to_var_types() == dict(rt_types)
+
+
+def test_compact_ir_variables_match_get_all_ir_variables() -> None:
+    instructions = generated()
+    compact = CompactIR.from_instructions(instructions)
+    names = compact.names()
+    variables = [IRVar(names[var]) for var in compact.variables() if IRVar(names[var]) not in rt_types]
+    assert variables == get_all_ir_variables(instructions)
+
+
+def test_temporaries_are_named_apart_from_existing_variables() -> None:
+    compact = CompactIR()
+    x1 = compact.var("x1", Int)
+    temporary = compact.new_var(Int)
+    compact.call(L, compact.var("+"), [x1, x1], temporary)
+    assert compact.ops[0] == CALL and list(compact.call_args(0)) == [x1, x1]
+    assert compact.defined_var(0) == temporary and compact.used_vars(0) == [compact.var("+"), x1, x1]
+    assert [str(i) for i in compact] == ["Call(+, [x1, x1], x2)"]
+    assert compact.var_type(temporary) is Int
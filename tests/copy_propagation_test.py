@@ -0,0 +1,26 @@
+from compiler.ir_interpreter import interpret
+from compiler.optimizations.copy_propagation import propagate_copies
+from compiler.ssa import from_ssa, to_ssa
+import compiler.objects.ir_instructions as ir
+from tests.helpers import ir_of
+
+programs = [
+    "var x = read_int(); var y = x; var z = y; print_int(z + y); { var w = z; w }",
+    # Without the copies, the Phis of a and b read each other: the swap problem.
+    "var a = 1; var b = 2; var i = 0; while i < 5 do { var t = a; a = b; b = t; i = i + 1; print_int(a) }; b",
+    # And the value of x before the increment is still needed after the loop: the lost copy problem.
+    "var x = 0; var y = 0; while x < 4 do { y = x; x = x + 1 }; print_int(x); y",
+]
+
+
+def test_copies_are_removed() -> None:
+    cfg = propagate_copies(to_ssa(ir_of(programs[0])))
+    assert not any(isinstance(insn, ir.Copy) for insn in cfg.instructions())
+    assert interpret(from_ssa(cfg), [4]) == [8, 4]
+
+
+def test_behaviour_is_kept_through_phis() -> None:
+    for source in programs:
+        instructions = ir_of(source)
+        optimized = from_ssa(propagate_copies(to_ssa(instructions)))
+        assert interpret(optimized, [3]) == interpret(instructions, [3])
@@ -0,0 +1,59 @@
+from compiler.assets.builtins import rt_types
+from compiler.cfg import build_cfg
+from compiler.dataflow import liveness, reaching_definitions, solve
+from compiler.ir_generator import generate_ir
+from compiler.objects.ir_variables import IRVar
+from compiler.parser import Parser
+from compiler.tokenizer import Tokenizer
+from compiler.typechecker import typechecker
+import compiler.objects.ir_instructions as ir
+
+source = "var x = 0; var y = 5; while x < 3 do { x = x + 1 }; if x == 3 then print_int(y) else print_int(0)"
+
+
+def cfg_of(source: str):
+    tree = Parser.parse(Tokenizer.tokenize(source))
+    typechecker(tree)
+    return build_cfg(generate_ir(rt_types, tree))
+
+
+def test_liveness() -> None:
+    cfg = cfg_of(source)
+    live = liveness(cfg)
+    x, y = IRVar("x2"), IRVar("x4")
+    # x and y are live around the loop; y only until the then branch reads it.
+    assert live.vars_in(live.live_out[0]) == {x, y}
+    assert live.vars_in(live.live_in[1]) == {x, y}
+    assert live.vars_in(live.live_in[2]) == {x, y}
+    assert live.vars_in(live.live_out[3]) == {y}
+    assert live.vars_in(live.live_in[5]) == set()
+    assert live.vars_in(live.live_out[6]) == set()
+    # Temporaries used only in their own block get no bit at all.
+    assert IRVar("x1") not in live.numbers
+
+
+def test_reaching_definitions() -> None:
+    cfg = cfg_of(source)
+    reaching = reaching_definitions(cfg)
+    x = IRVar("x2")
+    at_header = reaching.defs_in(reaching.reach_in[1] & reaching.of_var[x])
+    # Both the declaration and the assignment in the loop body reach the loop header.
+    assert [block for block, _ in at_header] == [0, 2]
+    for block, position in at_header:
+        insn = cfg.blocks[block].instructions[position]
+        assert isinstance(insn, ir.Copy) and insn.dest == x
+
+
+def test_must_problem_meets_by_intersection() -> None:
+    cfg = build_cfg([
+        ir.CondJump(None, IRVar("c"), ir.Label(None, "a"), ir.Label(None, "b")),
+        ir.Label(None, "a"),
+        ir.Jump(None, ir.Label(None, "end")),
+        ir.Label(None, "b"),
+        ir.Label(None, "end"),
+    ])
+    # Only block 1 generates bit 1 and every block generates bit 0.
+    result = solve(cfg, [0b1, 0b11, 0b1, 0b1], [0, 0, 0, 0], forward=True, may=False, universe=0b11)
+    assert result.ins[3] == 0b1
+    result = solve(cfg, [0b1, 0b11, 0b1, 0b1], [0, 0, 0, 0], forward=True)
+    assert result.ins[3] == 0b11
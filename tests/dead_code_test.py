@@ -0,0 +1,25 @@
+from compiler.ir_interpreter import interpret
+from compiler.optimizations import optimize
+from compiler.optimizations.dead_code import eliminate_dead_code
+from compiler.ssa import from_ssa, to_ssa
+from tests.helpers import calls, ir_of
+
+
+def test_unread_results_are_deleted() -> None:
+    instructions = ir_of("var x = read_int(); var y = x * 3 + 1; var z = y < 2; read_int(); print_int(x - 1); x")
+    optimized = from_ssa(eliminate_dead_code(to_ssa(instructions)))
+    assert calls(optimized) == ["read_int", "read_int", "-", "print_int", "print_int"]
+    assert interpret(optimized, [5, 6]) == interpret(instructions, [5, 6]) == [4, 5]
+
+
+def test_values_only_feeding_themselves_are_deleted() -> None:
+    instructions = ir_of("var i = 0; var j = 0; while i < 3 do { i = i + 1; j = j * 2 + i }; print_int(i)")
+    optimized = from_ssa(eliminate_dead_code(to_ssa(instructions)))
+    assert calls(optimized) == ["<", "+", "print_int"]
+    assert interpret(optimized) == [3]
+
+
+def test_divisions_that_may_trap_are_kept() -> None:
+    optimized = optimize(ir_of("var x = read_int(); var a = 10 / x; var b = x % -1; var c = x / 3; var d = x % 7; 1"))
+    assert calls(optimized) == ["read_int", "/", "%", "print_int"]
+    assert interpret(optimized, [5]) == [1]
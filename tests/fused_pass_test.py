@@ -0,0 +1,42 @@
+import pytest
+from compiler.assets.builtins import rt_types
+from compiler.fused_pass import typecheck_and_generate_ir
+from compiler.ir_generator import generate_ir
+from compiler.parser import Parser
+from compiler.tokenizer import Tokenizer
+from compiler.typechecker import typechecker
+from compiler.objects.ast_walker import walk_preorder
+
+programs = [
+    "var x = 1; { var x = true; print_bool(x) }; x",
+    "var a: Int = 3 * (4 + 1) - 7 % 2; if a >= 2 and not (a == 5) then { a = a / 2; } else { print_int(a); } a",
+    "var n = read_int(); var i = 0; while i < n do { i = i + 1; print_int(-i); } i > 2 or false",
+    "var f = if 1 < 2 then 3 else 4; { f }",
+]
+
+
+def two_pass(source: str) -> tuple[list[str], list[str]]:
+    tree = Parser.parse(Tokenizer.tokenize(source))
+    typechecker(tree)
+    instructions = generate_ir(rt_types, tree)
+    return [str(i) for i in instructions], [repr(node.type) for node in walk_preorder(tree)]
+
+
+def fused(source: str) -> tuple[list[str], list[str]]:
+    tree = Parser.parse(Tokenizer.tokenize(source))
+    instructions = typecheck_and_generate_ir(rt_types, tree)
+    return [str(i) for i in instructions], [repr(node.type) for node in walk_preorder(tree)]
+
+
+def test_fused_pass_matches_two_passes() -> None:
+    for source in programs:
+        assert fused(source) == two_pass(source)
+
+
+def test_fused_pass_errors_match_two_passes() -> None:
+    for source in ["1 + true", "var x = 1; var x = 2", "y", "if 1 then 2", "var x: Bool = 1"]:
+        with pytest.raises(Exception) as two_pass_error:
+            two_pass(source)
+        with pytest.raises(Exception) as fused_error:
+            fused(source)
+        assert str(fused_error.value) == str(two_pass_error.value)
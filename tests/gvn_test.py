@@ -0,0 +1,29 @@
+from compiler.ir_interpreter import interpret
+from compiler.optimizations import optimize
+from compiler.optimizations.gvn import gvn
+from compiler.ssa import from_ssa, to_ssa
+import compiler.objects.ir_instructions as ir
+from tests.helpers import calls, ir_of
+
+
+def test_dominated_expressions_are_reused() -> None:
+    instructions = ir_of("var a = read_int(); var b = read_int(); print_int(a * b + a * b); if a > b then print_int(b * a) else print_int(a * b - 1); print_bool(b < a); a * b")
+    optimized = optimize(instructions)
+    assert calls(optimized).count("*") == 1
+    assert "<" not in calls(optimized)
+    for inputs in [[3, 4], [-3, 4]]:
+        assert interpret(optimized, inputs) == interpret(instructions, inputs)
+
+
+def test_expressions_from_other_branches_are_not_reused() -> None:
+    instructions = ir_of("var a = read_int(); var x = 0; if a > 0 then x = a - 2 else x = a - 2 + 1; print_int(a - 2); x")
+    optimized = optimize(instructions)
+    assert calls(optimized).count("-") == 3
+    assert interpret(optimized, [5]) == interpret(instructions, [5]) == [3, 3]
+
+
+def test_constants_are_loaded_once() -> None:
+    cfg = gvn(to_ssa(ir_of("var a = read_int(); print_int(a + 7); print_int(a * 7); print_bool(true); print_bool(true); 7")))
+    loads = [insn for insn in cfg.instructions() if isinstance(insn, (ir.LoadIntConst, ir.LoadBoolConst))]
+    assert [insn.value for insn in loads] == [7, "true"]
+    assert interpret(from_ssa(cfg), [2]) == [9, 14, 1, 1, 7]
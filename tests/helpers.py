@@ -0,0 +1,16 @@
+from compiler.assets.builtins import rt_types
+from compiler.ir_generator import generate_ir
+from compiler.parser import Parser
+from compiler.tokenizer import Tokenizer
+from compiler.typechecker import typechecker
+import compiler.objects.ir_instructions as ir
+
+
+def ir_of(source: str) -> list[ir.Instruction]:
+    tree = Parser.parse(Tokenizer.tokenize(source))
+    typechecker(tree)
+    return generate_ir(rt_types, tree)
+
+
+def calls(instructions: list[ir.Instruction]) -> list[str]:
+    return [insn.fun.name for insn in instructions if isinstance(insn, ir.Call)]
@@ -0,0 +1,43 @@
+import random
+from compiler.incremental_parser import IncrementalParser
+from compiler.parser import Parser
+from compiler.tokenizer import Tokenizer
+import compiler.objects.ast as ast
+
+
+def outcome(parse: object, buffer: object) -> str:
+    try:
+        return repr(parse(buffer))  # type: ignore[operator]
+    except Exception as e:
+        return f"error: {e}"
+
+
+def test_incremental_parse_matches_full_parse() -> None:
+    source = "var x = 1;\nwhile x < 10 do {\n  x = x + 1; print_int(x)\n};\nif x == 10 then { true } else false;\nx"
+    buffer = Tokenizer.tokenize_compact(source)
+    parser = IncrementalParser()
+    rng = random.Random(0)
+    pieces = ["x", "1", ";", "\n", "{", "}", "(", ")", " ", "+", "a = 2;", "var q = 3;"]
+    for _ in range(300):
+        assert outcome(parser.parse, buffer) == outcome(Parser.parse, buffer)
+        offset = rng.randint(0, len(buffer.source))
+        deleted = rng.randint(0, min(3, len(buffer.source) - offset))
+        buffer = Tokenizer.relex(buffer, offset, deleted, rng.choice(pieces))
+
+
+def test_only_edited_statement_is_reparsed() -> None:
+    source = "var a = 1;\nvar b = a + 2;\nprint_int(b);\nb * 2"
+    parser = IncrementalParser()
+    first = parser.parse(Tokenizer.tokenize_compact(source))
+    assert parser.reparsed == 4
+    assert isinstance(first, ast.Block)
+    unchanged = first.sequence[2]
+
+    # Inserting a line before the last statements moves them down without reparsing them.
+    edited = Tokenizer.relex(Tokenizer.tokenize_compact(source), source.index("var b"), 9, "\nvar b = 3")
+    second = parser.parse(edited)
+    assert parser.reparsed == 1
+    assert isinstance(second, ast.Block)
+    assert second.sequence[2] is unchanged
+    assert unchanged.loc is not None and unchanged.loc.line == 4
+    assert repr(second) == repr(Parser.parse(edited))
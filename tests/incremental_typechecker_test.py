@@ -0,0 +1,65 @@
+import random
+from compiler.incremental_parser import IncrementalParser
+from compiler.incremental_typechecker import IncrementalTypechecker
+from compiler.parser import Parser
+from compiler.tokenizer import Tokenizer
+from compiler.typechecker import typechecker
+from compiler.objects.ast_walker import walk_preorder
+
+
+def outcome(check: object, tree: object) -> object:
+    try:
+        result = check(tree)  # type: ignore[operator]
+    except Exception as e:
+        return f"error: {e}"
+    return result, [node.type for node in walk_preorder(tree)], [
+        node.binding for node in walk_preorder(tree) if hasattr(node, "binding")]  # type: ignore[attr-defined]
+
+
+def test_incremental_check_matches_full_check() -> None:
+    source = "var x = 1;\nvar y = x < 2;\nwhile y do {\n  x = x + 1; y = false\n};\nif y then { x } else 3"
+    buffer = Tokenizer.tokenize_compact(source)
+    parser = IncrementalParser()
+    checker = IncrementalTypechecker()
+    rng = random.Random(0)
+    pieces = ["x", "y", "1", "true", ";", "\n", "{", "}", " ", "+", "<", "x = 2;", "var x = 3;", "var y = 4;"]
+    for _ in range(300):
+        try:
+            tree = parser.parse(buffer)
+        except Exception:
+            tree = None
+        if tree is not None:
+            assert outcome(checker.check, tree) == outcome(typechecker, Parser.parse(buffer))
+        offset = rng.randint(0, len(buffer.source))
+        deleted = rng.randint(0, min(3, len(buffer.source) - offset))
+        buffer = Tokenizer.relex(buffer, offset, deleted, rng.choice(pieces))
+
+
+def test_only_statements_with_changed_environment_are_rechecked() -> None:
+    checker = IncrementalTypechecker()
+    checker.check(Parser.parse(Tokenizer.tokenize("var a = 1; var b = a; print_int(7); b")))
+    assert checker.rechecked == 4
+
+    checker.check(Parser.parse(Tokenizer.tokenize("var a = 5; var b = a; print_int(7); b")))
+    assert checker.rechecked == 1
+
+    # A declaration whose type changes invalidates the statements that read it.
+    checker.check(Parser.parse(Tokenizer.tokenize("var a = true; var b = a; print_int(7); b")))
+    assert checker.rechecked == 3
+
+
+def test_redeclaration_error_matches_full_check() -> None:
+    for source in ["var x = 1; var x: Bool = 2", "var x = 1; var x = true + 1"]:
+        tree = Parser.parse(Tokenizer.tokenize(source))
+        assert outcome(IncrementalTypechecker().check, tree) == outcome(typechecker, Parser.parse(Tokenizer.tokenize(source)))
+
+
+def test_changed_annotation_is_checked_again() -> None:
+    checker = IncrementalTypechecker()
+    first = "var x: Bool = true; x"
+    second = "var x: Int = true; x"
+    assert outcome(checker.check, Parser.parse(Tokenizer.tokenize(first))) == outcome(
+        typechecker, Parser.parse(Tokenizer.tokenize(first)))
+    result = outcome(checker.check, Parser.parse(Tokenizer.tokenize(second)))
+    assert result == outcome(typechecker, Parser.parse(Tokenizer.tokenize(second)))
+    assert isinstance(result, str) and "is not of type" in result
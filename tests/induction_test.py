@@ -0,0 +1,62 @@
+from compiler.cfg import ControlFlowGraph, find_loops
+from compiler.ir_interpreter import interpret
+from compiler.optimizations import optimize
+from compiler.optimizations.copy_propagation import propagate_copies
+from compiler.optimizations.induction import induction_variables, reduce_strength
+from compiler.optimizations.loops import hoist_invariants, preheader, rotate_loops
+from compiler.optimizations.simplify import simplify
+from compiler.ssa import from_ssa, to_ssa
+import compiler.objects.ir_instructions as ir
+from tests.helpers import ir_of
+
+
+def prepared(source: str) -> ControlFlowGraph:
+    return hoist_invariants(propagate_copies(simplify(to_ssa(rotate_loops(ir_of(source))))))
+
+
+def loop_calls(cfg: ControlFlowGraph) -> list[str]:
+    loop = find_loops(cfg, cfg.dominators())[0]
+    return [insn.fun.name for index in loop.blocks for insn in cfg.blocks[index].instructions
+            if isinstance(insn, ir.Call)]
+
+
+def test_induction_variables_are_found() -> None:
+    cfg = prepared("var i = 10; var j = 0; var k = 1; while i > 0 do { i = i - 2; j = j + 3; k = k * 2 }; print_int(j); k")
+    ints = {insn.dest: insn.value for insn in cfg.instructions() if isinstance(insn, ir.LoadIntConst)}
+    loop = find_loops(cfg, cfg.dominators())[0]
+    entry = preheader(cfg, loop)
+    assert entry is not None
+    assert sorted(iv.step for iv in induction_variables(cfg, loop, entry, ints)) == [-2, 3]
+
+
+def test_multiplications_by_the_counter_become_additions() -> None:
+    source = "var m = read_int(); var i = 0; var s = 0; while i < 10 do { s = s + i * m + i * 8; i = i + 2 }; s"
+    cfg = reduce_strength(prepared(source))
+    calls = loop_calls(cfg)
+    assert "*" not in calls and "<<" not in calls
+    for inputs in [[3], [-7], [0]]:
+        assert interpret(from_ssa(cfg), inputs) == interpret(ir_of(source), inputs)
+
+
+def test_multiplications_by_values_changing_in_the_loop_are_kept() -> None:
+    source = "var i = read_int(); var s = 0; while i < 10 do { s = s + i * i + i * s; i = i + 1 }; s"
+    cfg = reduce_strength(prepared(source))
+    assert loop_calls(cfg).count("*") == 2
+    for inputs in [[3], [-4], [20]]:
+        assert interpret(from_ssa(cfg), inputs) == interpret(ir_of(source), inputs)
+
+
+def test_counting_down_and_overflow() -> None:
+    source = "var i = read_int(); var s = 0; while i > -5 do { s = s + i * 4611686018427387904; i = i - 1; print_int(s) }; s"
+    for inputs in [[3], [-4], [-10]]:
+        assert interpret(optimize(ir_of(source)), inputs) == interpret(ir_of(source), inputs)
+
+
+def test_nested_loops_multiplying_both_counters() -> None:
+    for source in [
+        "var i = 0; while i < 3 do { var j = 0; while j < 3 do { print_int(i * j); j = j + 1 }; i = i + 1 }",
+        "var v1 = 2; while v1 < 6 do { var v2 = -3; while v2 < 4 do { var v3 = (v2 * (v1 + -0)); print_int({ (5 - v3) }); v2 = v2 + 1 }; v1 = v1 + 2 }",
+    ]:
+        expected = interpret(ir_of(source), [])
+        assert interpret(from_ssa(reduce_strength(prepared(source))), []) == expected
+        assert interpret(optimize(ir_of(source), unroll_factor=1), []) == expected
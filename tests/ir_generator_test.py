@@ -0,0 +1,31 @@
+from compiler.assets.builtins import rt_types
+from compiler.ir_generator import generate_ir
+from compiler.parser import Parser
+from compiler.stack_parser import StackParser
+from compiler.tokenizer import Tokenizer
+from compiler.typechecker import typechecker
+import compiler.objects.ir_instructions as ir
+
+
+def test_generate_ir_shadowing() -> None:
+    parsed = Parser.parse(Tokenizer.tokenize("var x = 1; { var x = true; print_bool(x) }; x"))
+    typechecker(parsed)
+    assert [str(instruction) for instruction in generate_ir(rt_types, parsed)] == [
+        "LoadIntConst(1, x1)",
+        "Copy(x1, x2)",
+        "LoadBoolConst(true, x3)",
+        "Copy(x3, x4)",
+        "Call(print_bool, [x4], x5)",
+        "Call(print_int, [x2], x6)",
+    ]
+
+
+def test_generate_ir_deep_trees() -> None:
+    parsed = Parser.parse(Tokenizer.tokenize("1" + " - 1" * 100000))
+    typechecker(parsed)
+    instructions = generate_ir(rt_types, parsed)
+    assert len(instructions) == 2 * 100000 + 2
+    parsed = StackParser.parse(Tokenizer.tokenize("var x = 1; " + "while x < 9 do { x = x + 1; " * 20000 + "x" + " }" * 20000))
+    typechecker(parsed)
+    instructions = generate_ir(rt_types, parsed)
+    assert sum(isinstance(instruction, ir.Label) for instruction in instructions) == 3 * 20000
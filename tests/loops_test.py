@@ -0,0 +1,93 @@
+from compiler.cfg import build_cfg, find_loops
+from compiler.ir_interpreter import interpret
+from compiler.optimizations import optimize
+from compiler.optimizations.loops import hoist_invariants, preheader, rotate_loops, unroll_loops
+from compiler.ssa import from_ssa, to_ssa
+import compiler.objects.ir_instructions as ir
+from tests.helpers import ir_of
+
+programs = [
+    "var n = read_int(); var i = 0; var s = 0; while i < n do { s = s + n * 3; i = i + 1 }; s",
+    "var i = 0; while i < 3 and i >= 0 do { var j = 0; while j < i do { print_int(i * 10 + j); j = j + 1 }; i = i + 1 }; i",
+    "while read_int() > 0 do print_int(1); 2",
+    "var x = read_int(); while { x = x - 1; x > 0 } do print_int(x); x",
+]
+
+
+def test_rotated_loops_jump_back_once_per_iteration() -> None:
+    for source in programs:
+        instructions = ir_of(source)
+        rotated = rotate_loops(instructions)
+        cfg = build_cfg(rotated)
+        for loop in find_loops(cfg, cfg.dominators()):
+            assert preheader(cfg, loop) is not None
+            assert len(loop.latches) == 1
+            assert isinstance(cfg.blocks[loop.latches[0]].instructions[-1], ir.CondJump)
+        for inputs in [[0, 0], [3, 2, 1, 0, 0]]:
+            assert interpret(rotated, inputs) == interpret(instructions, inputs)
+
+
+def test_loops_at_the_start_get_a_preheader() -> None:
+    rotated = rotate_loops([
+        ir.Label(None, "L1"),
+        ir.LoadBoolConst(None, "true", ir.IRVar("x")),
+        ir.Jump(None, ir.Label(None, "L1")),
+    ])
+    cfg = build_cfg(rotated)
+    assert [block.label for block in cfg.blocks] == ["P1", "L1"]
+    assert [preheader(cfg, loop) for loop in find_loops(cfg, cfg.dominators())] == [0]
+
+
+def test_invariants_are_hoisted() -> None:
+    instructions = ir_of(programs[0])
+    cfg = hoist_invariants(to_ssa(rotate_loops(instructions)))
+    loop = find_loops(cfg, cfg.dominators())[0]
+    in_loop = [insn for index in loop.blocks for insn in cfg.blocks[index].instructions]
+    assert not any(isinstance(insn, ir.Call) and insn.fun.name == "*" for insn in in_loop)
+    assert not any(isinstance(insn, ir.LoadIntConst) for insn in in_loop)
+    assert interpret(from_ssa(cfg), [4]) == interpret(instructions, [4]) == [48]
+
+
+def test_calls_with_effects_stay_in_the_loop() -> None:
+    instructions = ir_of("var n = read_int(); var i = 0; while i < 2 do { print_int(100 / n); print_int(n * 2); i = i + 1 }; i")
+    optimized = optimize(instructions)
+    first_label = next(index for index, insn in enumerate(optimized) if isinstance(insn, ir.Label) and insn.name.startswith("L"))
+    assert not any(isinstance(insn, ir.Call) and insn.fun.name == "/" for insn in optimized[:first_label])
+    assert interpret(optimized, [5]) == interpret(instructions, [5]) == [20, 10, 20, 10, 2]
+
+
+def test_short_counted_loops_are_unrolled_fully() -> None:
+    instructions = ir_of("var s = 0; var i = 1; while i <= 3 do { s = s + i; print_int(s); i = i + 1 }; s")
+    unrolled = unroll_loops(rotate_loops(instructions), 4)
+    cfg = build_cfg(unrolled)
+    assert find_loops(cfg, cfg.dominators()) == []
+    assert interpret(unrolled) == interpret(instructions) == [1, 3, 6, 6]
+    assert interpret(optimize(instructions)) == [1, 3, 6, 6]
+
+
+def test_counted_loops_are_unrolled_with_a_remainder_loop() -> None:
+    big = 2**63 - 1
+    # Each with bounds near the ends of the range, where the limit of the main loop wraps around.
+    cases = [
+        ("var n = read_int(); var i = read_int(); var s = 0; while i < n do { s = s * 3 + i; i = i + 2 }; print_int(i); s",
+         [[big, big - 6], [-big + 1, -big - 1]]),
+        ("var n = read_int(); var i = read_int(); var s = 0; while n <= i do { s = s + i % 5; i = i - 3 }; print_int(i); s",
+         [[big - 1, big], [-big + 1, -big + 3]]),
+    ]
+    for source, extremes in cases:
+        instructions = ir_of(source)
+        for factor in [2, 3, 4]:
+            unrolled = unroll_loops(rotate_loops(instructions), factor)
+            cfg = build_cfg(unrolled)
+            assert len(find_loops(cfg, cfg.dominators())) == 2
+            for values in [[10, 0], [11, 0], [0, 0], [-5, 3], [3, -5], *extremes]:
+                assert interpret(unrolled, values) == interpret(instructions, values)
+                assert interpret(optimize(instructions, factor), values) == interpret(instructions, values)
+
+
+def test_loops_that_are_not_counted_are_not_unrolled() -> None:
+    for source in [programs[2], "var i = 1; while i < 100 do i = i * 2 + read_int(); i"]:
+        rotated = rotate_loops(ir_of(source))
+        assert unroll_loops(rotated, 4) == rotated
+    rotated = rotate_loops(ir_of(programs[0]))
+    assert unroll_loops(rotated, 1) == rotated
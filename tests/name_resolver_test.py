@@ -0,0 +1,39 @@
+import pytest
+from compiler.name_resolver import GLOBAL, resolve_names
+from compiler.objects.ast_walker import walk_preorder
+from compiler.parser import Parser
+from compiler.tokenizer import Tokenizer
+from compiler.typechecker import typechecker
+import compiler.objects.ast as ast
+
+
+def bindings(code: str) -> list[tuple[str, int]]:
+    tree = Parser.parse(Tokenizer.tokenize(code))
+    resolve_names(tree)
+    return [(node.name, node.binding) for node in walk_preorder(tree) if isinstance(node, ast.Identifier)]
+
+
+def test_shadowing_and_scopes() -> None:
+    code = "var x = 1; { var x = x + 1; print_int(x) }; x"
+    assert bindings(code) == [("x", 0), ("x", 1), ("x", 0), ("print_int", GLOBAL), ("x", 1), ("x", 0)]
+
+
+def test_declaration_value_sees_outer_binding() -> None:
+    assert bindings("var a = 1; { var a = a }; a = 2") == [("a", 0), ("a", 1), ("a", 0), ("a", 0)]
+
+
+def test_undeclared_and_out_of_scope_names_are_global() -> None:
+    assert bindings("{ var y = 1 }; y; z") == [("y", 0), ("y", GLOBAL), ("z", GLOBAL)]
+
+
+def test_redeclarations_in_the_same_block() -> None:
+    tree = Parser.parse(Tokenizer.tokenize("var x = 1; { var x = 2 }; var x = 3"))
+    assert resolve_names(tree).redeclared == {2}
+    with pytest.raises(Exception, match="x already declared"):
+        typechecker(tree)
+
+
+def test_typechecker_uses_bindings() -> None:
+    with pytest.raises(Exception, match="referenced before declaration"):
+        typechecker(Parser.parse(Tokenizer.tokenize("{ var y = 1 }; y")))
+    assert str(typechecker(Parser.parse(Tokenizer.tokenize("var b = true; { var b = 1; b + 1 }; b")))) == "BasicType(name='Bool')"
@@ -0,0 +1,28 @@
+import copy
+import pickle
+from compiler.objects.node_types import BasicType, Bool, FunType, Int, Unit
+
+
+def test_types_are_interned() -> None:
+    assert BasicType("Int") is Int
+    assert FunType([Int, Bool], Unit) is FunType((Int, Bool), Unit)
+    assert FunType([Int], Unit) is not FunType([Bool], Unit)
+    assert FunType([Int], Unit).parameter_types == (Int,)
+
+
+def test_equality_is_identity() -> None:
+    assert (Int == Bool) is False
+    assert Int != Unit
+    assert FunType([], Int) == FunType([], Int)
+    assert FunType([Int], Int) != FunType([Int, Int], Int)
+
+
+def test_types_as_keys() -> None:
+    cache = {FunType([Int], Unit): "print_int", Int: "int"}
+    assert cache[FunType([BasicType("Int")], BasicType("Unit"))] == "print_int"
+    assert cache[BasicType("Int")] == "int"
+
+
+def test_copies_stay_canonical() -> None:
+    assert copy.deepcopy(FunType([Int], Bool)) is FunType([Int], Bool)
+    assert pickle.loads(pickle.dumps(Unit)) is Unit
@@ -1,6 +1,8 @@
+import io
 from compiler.objects.token import Token
 from compiler.objects.source_location import Source_location
 from compiler.parser import Parser
+from compiler.tokenizer import Tokenizer
 from compiler.assets.test_source import L
 import compiler.objects.ast as ast
 from compiler.objects.node_types import Bool
@@ -188,4 +190,21 @@ def test_typed_variable_dec() -> None:
 
 def test_multiple_top_level() -> None:
     code = [Token(L, "identifier", "var"), Token(L, "identifier", "a"), Token(L, "operator", "="), Token(L, "int_literal", "1"), Token(L, "punctuation", ";"), Token(L, "identifier", "print"), Token(L, "punctuation", "("), Token(L, "identifier", "a"), Token(L, "operator", "+"), Token(L, "int_literal", "2"), Token(L, "operator", "=="), Token(L, "int_literal", "3"), Token(L, "punctuation", ")")]
-    assert parse(code) == ast.Block(None, [ast.Declaration(L, ast.Identifier(L, "a"), ast.Literal(L, 1), None)], ast.Function(L, ast.Identifier(L, "print"), [ast.BinaryOp(L, ast.BinaryOp(L, ast.Identifier(L, "a"), "+", ast.Literal(L, 2)), "==", ast.Literal(L, 3))]))
\ No newline at end of file
+    assert parse(code) == ast.Block(None, [ast.Declaration(L, ast.Identifier(L, "a"), ast.Literal(L, 1), None)], ast.Function(L, ast.Identifier(L, "print"), [ast.BinaryOp(L, ast.BinaryOp(L, ast.Identifier(L, "a"), "+", ast.Literal(L, 2)), "==", ast.Literal(L, 3))]))
+
+def test_parse_token_stream() -> None:
+    source = "var a = 1; while a < 10 do { a = a + 1 }; if a == 10 then print_int(a)"
+    assert parse(Tokenizer.stream(io.StringIO(source), chunk_size=4)) == parse(Tokenizer.tokenize(source))
+
+def test_parse_compact_token_buffer() -> None:
+    source = "var a = 1;\nwhile a < 10 do { a = a + 1 };\nif a == 10 then print_int(a)"
+    parsed = parse(Tokenizer.tokenize_compact(source))
+    assert parsed == parse(Tokenizer.tokenize(source))
+    assert parsed.sequence[1].loc == Source_location("tester", 2, 1)
+
+def test_parse_binding_powers() -> None:
+    parsed = parse(Tokenizer.tokenize("a = b = 1 + 2 * 3 % 4 < 5 and x or y"))
+    product = ast.BinaryOp(L, ast.BinaryOp(L, ast.Literal(L, 2), "*", ast.Literal(L, 3)), "%", ast.Literal(L, 4))
+    comparison = ast.BinaryOp(L, ast.BinaryOp(L, ast.Literal(L, 1), "+", product), "<", ast.Literal(L, 5))
+    disjunction = ast.BinaryOp(L, ast.BinaryOp(L, comparison, "and", ast.Identifier(L, "x")), "or", ast.Identifier(L, "y"))
+    assert parsed == ast.Block(None, [], ast.BinaryOp(L, ast.Identifier(L, "a"), "=", ast.BinaryOp(L, ast.Identifier(L, "b"), "=", disjunction)))
@@ -0,0 +1,39 @@
+import pytest
+from compiler.ir_interpreter import interpret
+from compiler.optimizations import optimize
+from compiler.optimizations.sccp import sccp
+from compiler.ssa import from_ssa, to_ssa
+import compiler.objects.ir_instructions as ir
+from tests.helpers import calls, ir_of
+
+
+def test_operators_on_constants_are_folded() -> None:
+    optimized = from_ssa(sccp(to_ssa(ir_of("var x = 1 + 2 * 3; var y = x - 10; print_bool(-y > x and true); y % 4"))))
+    assert calls(optimized) == ["print_bool", "print_int"]
+    assert sum(isinstance(insn, ir.LoadIntConst) and insn.value == -3 for insn in optimized) > 0
+    assert interpret(optimized) == [0, -3]
+
+
+def test_constant_branches_are_resolved() -> None:
+    instructions = ir_of("var x = 3; if x > 2 then print_int(1) else print_int(2); while x < 3 do { print_int(x) }; x")
+    optimized = from_ssa(sccp(to_ssa(instructions)))
+    assert calls(optimized) == ["print_int", "print_int"]
+    assert not any(isinstance(insn, ir.CondJump) for insn in optimized)
+    assert interpret(optimized) == interpret(instructions) == [1, 3]
+
+
+def test_values_flow_only_along_executable_edges() -> None:
+    # The assignment in the dead branch does not make x unknown after the if.
+    optimized = optimize(ir_of("var x = 5; if false then { x = read_int() }; x * 2"))
+    assert calls(optimized) == ["print_int"]
+    assert interpret(optimized) == [10]
+
+
+def test_loops_and_traps_are_kept() -> None:
+    optimized = optimize(ir_of("var x = 3; while x < 10 do x = x + 1; x"), unroll_factor=1)
+    assert "<" in calls(optimized) and "+" in calls(optimized)
+    assert interpret(optimized) == [10]
+    optimized = optimize(ir_of("print_int(7 / 0)"))
+    assert "/" in calls(optimized)
+    with pytest.raises(Exception, match="trap"):
+        interpret(optimized)
@@ -0,0 +1,36 @@
+from compiler.ir_interpreter import interpret
+from compiler.optimizations import optimize
+from compiler.optimizations.simplify import power_of_two
+from tests.helpers import calls, ir_of
+
+
+def test_identities_are_removed() -> None:
+    instructions = ir_of("var x = read_int(); print_int(x + 0 - 0); print_int(1 * x * 1); print_int(0 * x); print_int(x - x); print_int(- - x); print_bool(not not (x > 2))")
+    optimized = optimize(instructions)
+    assert calls(optimized) == ["read_int", "print_int", "print_int", "print_int", "print_int", "print_int", ">", "print_bool"]
+    assert interpret(optimized, [5]) == interpret(instructions, [5]) == [5, 5, 0, 0, 5, 1]
+
+
+def test_negated_comparisons_and_booleans() -> None:
+    instructions = ir_of("var x = read_int(); var b = x < 0; print_bool(not (x >= 3)); print_bool(b == true); print_bool(false != b); print_bool(b != true); print_bool(x <= x)")
+    optimized = optimize(instructions)
+    assert calls(optimized) == ["read_int", "<", "<", "print_bool", "print_bool", "print_bool", "unary_not", "print_bool", "print_bool"]
+    for value in [-4, 2, 3]:
+        assert interpret(optimized, [value]) == interpret(instructions, [value])
+
+
+def test_powers_of_two_are_strength_reduced() -> None:
+    instructions = ir_of("var x = read_int(); print_int(x * 8); print_int(4 * x); print_int(x / 16); print_int(x % 16); print_int(x / 1 + x % 1); print_int(x / 6)")
+    optimized = optimize(instructions)
+    assert calls(optimized) == ["read_int", "<<", "print_int", "<<", "print_int", "div_pow2", "print_int", "mod_pow2", "print_int", "print_int", "/", "print_int"]
+    for value in [0, 37, -37, -16, 2**62, -2**63, 2**63 - 1]:
+        assert interpret(optimized, [value]) == interpret(instructions, [value])
+
+
+def test_calls_that_may_trap_are_kept() -> None:
+    optimized = optimize(ir_of("var x = read_int(); print_int(x / x); print_int(x % -1); print_int(x * 0 / 0)"))
+    assert calls(optimized).count("/") == 2 and "%" in calls(optimized)
+
+
+def test_power_of_two() -> None:
+    assert [power_of_two(value) for value in [None, -8, 0, 1, 2, 6, 1024, 2**62, 2**63]] == [None, None, None, None, 1, None, 10, 62, None]
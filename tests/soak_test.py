@@ -0,0 +1,42 @@
+import gc
+import os
+import resource
+import pytest
+from compiler.__main__ import compile_to_assembly
+from compiler.tokenizer import Tokenizer
+
+# Run with `pytest -m soak`; set SOAK_COMPILES to change the number of compilations.
+
+
+def resident_memory() -> int:
+    """Returns the resident set size of this process in bytes."""
+    try:
+        with open("/proc/self/statm") as statm:
+            return int(statm.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except OSError:
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+def program(index: int) -> str:
+    return (
+        f"var x = read_int(); var v{index} = x * {index} + 1;\n"
+        f"if v{index} > 10 then print_int(v{index}) else {{ var x = v{index}; while x > 0 do x = x - 3 }};\n"
+        f"x % 7 == {index % 7}"
+    )
+
+
+@pytest.mark.soak
+def test_memory_stays_flat_over_many_compilations() -> None:
+    compiles = int(os.environ.get("SOAK_COMPILES", "100000"))
+    warmup = min(1000, compiles // 10)
+    first = compile_to_assembly(Tokenizer.tokenize_compact(program(0)))
+    baseline = resident_memory()
+    for index in range(compiles):
+        if index == warmup:
+            gc.collect()
+            baseline = resident_memory()
+        # The same top-level names are declared by every program.
+        compile_to_assembly(Tokenizer.tokenize_compact(program(index)))
+    gc.collect()
+    assert resident_memory() - baseline < 16 * 1024 * 1024
+    assert compile_to_assembly(Tokenizer.tokenize_compact(program(0))) == first
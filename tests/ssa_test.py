@@ -0,0 +1,64 @@
+from compiler.assembly_generator import generate_assembly
+from compiler.dataflow import defined_var
+from compiler.ir_interpreter import interpret
+from compiler.objects.ir_variables import IRVar
+from compiler.optimizations.copy_propagation import propagate_copies
+from compiler.ssa import from_ssa, sequentialize, to_ssa
+import compiler.objects.ir_instructions as ir
+from tests.helpers import ir_of
+
+programs = [
+    "var x = read_int(); var s = 0; while x > 0 do { s = s + x; x = x - 1 }; s",
+    "var a = 1; var b = 2; var i = 0; while i < 5 do { var t = a; a = b; b = t; i = i + 1; print_int(a) }; b",
+    "var x = read_int(); var y = if x > 2 then x * 2 else { x = x + 1; x }; x = x; print_int(y); x > 1 and y < 10",
+]
+
+
+def test_every_variable_is_written_once() -> None:
+    for source in programs:
+        written = [defined_var(insn) for insn in to_ssa(ir_of(source)).instructions()]
+        written = [var for var in written if var is not None]
+        assert len(written) == len(set(written))
+
+
+def test_phis_are_placed_at_the_loop_header() -> None:
+    cfg = to_ssa(ir_of(programs[0]))
+    header = cfg.blocks[1]
+    assert header.label == "L1"
+    phis = [insn for insn in header.instructions if isinstance(insn, ir.Phi)]
+    assert [str(phi) for phi in phis] == ["Phi([x2.1, x2.3], x2.2)", "Phi([x4.1, x4.3], x4.2)"]
+    # The loop exit reads the values from the header, and nothing else needs a Phi.
+    assert sum(isinstance(insn, ir.Phi) for insn in cfg.instructions()) == 2
+
+
+def test_out_of_ssa_keeps_behaviour() -> None:
+    for source in programs:
+        instructions = ir_of(source)
+        lowered = from_ssa(to_ssa(instructions))
+        assert not any(isinstance(insn, ir.Phi) for insn in lowered)
+        for value in [-3, 0, 2, 7]:
+            assert interpret(lowered, [value]) == interpret(instructions, [value])
+        generate_assembly(lowered)
+
+
+def test_sequentialize_breaks_cycles() -> None:
+    a, b, c, d = IRVar("a"), IRVar("b"), IRVar("c"), IRVar("d")
+    spare = IRVar("spare")
+    # a and b swap, c gets a's old value and d stays.
+    copies = sequentialize([(a, b), (b, a), (c, a), (d, d)], lambda: spare)
+    values = {a: 1, b: 2, c: 3, d: 4}
+    for dest, source in copies:
+        values[dest] = values[source]
+    assert (values[a], values[b], values[c], values[d]) == (2, 1, 1, 4)
+    assert len(copies) == 4
+
+
+def test_loop_updates_write_the_phi_variable() -> None:
+    source = "var n = read_int(); var i = 0; var s = 0; while i < n do { var old = i; i = i + 1; s = s + old * i }; s"
+    instructions = ir_of(source)
+    lowered = from_ssa(propagate_copies(to_ssa(instructions)))
+    body = next(index for index, insn in enumerate(lowered) if isinstance(insn, ir.Label) and insn.name == "L2")
+    # The sum is updated in place, but the old value of i is still read after i + 1.
+    assert [str(insn) for insn in lowered[body:] if isinstance(insn, ir.Copy)] == ["Copy(x10, x4.2)"]
+    for value in [-1, 0, 1, 5]:
+        assert interpret(lowered, [value]) == interpret(instructions, [value])
@@ -0,0 +1,98 @@
+import sys
+from types import FrameType
+from compiler.parser import Parser
+from compiler.stack_parser import StackParser
+from compiler.tokenizer import Tokenizer
+import compiler.objects.ast as ast
+
+programs = [
+    "1 + 2 * 3 - 4 / 5 % 6",
+    "a = b = c or d and not e == -f",
+    "var x: Int = 1; var y = x * (x + 2); y",
+    "if a then { b; c } else if d then e else f;",
+    "while i < 10 do { i = i + 1; print_int(i) }",
+    "{ { a } b } { c; }",
+    "f(a, g(b, c), -d) * 2",
+    "- - x; not not y",
+]
+
+
+def parse_both(source: str) -> tuple[ast.Expression, ast.Expression]:
+    tokens = Tokenizer.tokenize(source)
+    return Parser.parse(tokens), StackParser.parse(tokens)
+
+
+def test_stack_parser_matches_parser() -> None:
+    for source in programs:
+        recursive, explicit = parse_both(source)
+        assert repr(recursive) == repr(explicit)
+
+
+def test_stack_parser_reports_same_errors() -> None:
+    for source in ["1 +", "a b", "{ a b }", "(1", "if a then var x = 1"]:
+        tokens = Tokenizer.tokenize(source)
+        messages = []
+        for parser in [Parser, StackParser]:
+            try:
+                parser.parse(tokens)
+                messages.append(None)
+            except Exception as e:
+                messages.append(str(e))
+        assert messages[0] is not None and messages[0] == messages[1]
+
+
+def depth(node: ast.Expression, child: str) -> int:
+    count = 0
+    while isinstance(getattr(node, child, None), ast.Expression):
+        node = getattr(node, child)
+        count += 1
+    return count
+
+
+def test_deeply_nested_parentheses() -> None:
+    n = 100_000
+    tree = StackParser.parse(Tokenizer.tokenize_compact("-(" * n + "1" + ")" * n))
+    assert depth(tree.result, "exp") == n
+
+
+def test_long_else_if_chain() -> None:
+    n = 100_000
+    tree = StackParser.parse(Tokenizer.tokenize_compact("if a then 1 else " * n + "0"))
+    assert depth(tree.result, "else_clause") == n
+
+
+def test_long_assignment_chain() -> None:
+    n = 100_000
+    tree = StackParser.parse(Tokenizer.tokenize_compact("a = " * n + "1"))
+    assert depth(tree.result, "right") == n
+
+
+def test_deeply_nested_blocks() -> None:
+    n = 100_000
+    tree = StackParser.parse(Tokenizer.tokenize_compact("{ " * n + "1" + " }" * n))
+    assert depth(tree.result, "result") == n
+
+
+def test_nesting_work_is_linear() -> None:
+    def calls(n: int) -> int:
+        """Counts the Python calls made while parsing `n` nested parentheses."""
+        tokens = Tokenizer.tokenize_compact("(" * n + "1" + ")" * n)
+        count = 0
+
+        def profile(frame: FrameType, event: str, arg: object) -> None:
+            nonlocal count
+            if event == "call":
+                count += 1
+
+        sys.setprofile(profile)
+        try:
+            StackParser.parse(tokens)
+        finally:
+            sys.setprofile(None)
+        return count
+
+    # The first parse also does one-off work, like filling caches.
+    calls(1)
+    none, some, twice = calls(0), calls(1000), calls(2000)
+    # Every level costs the same; a parser redoing work for the levels around it would not.
+    assert twice - some == some - none
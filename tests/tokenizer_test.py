@@ -1,3 +1,7 @@
+import random
+import io
+import mmap
+import tempfile
 from compiler.tokenizer import Tokenizer
 from compiler.assets.test_source import L
 from compiler.objects.token import Token
@@ -40,4 +44,61 @@ def test_oneline_comments_are_skipped() -> None:
     assert tokenize("// this is comment \n # this is another comment  \nthisshouldremain # this should not") == [Token(loc=Source_location("tester", 3, 1), type="identifier", text="thisshouldremain"), Token(loc=L, type="end", text="ending")]
 
 def test_multiline_comments_are_skipped() -> None:
-    assert tokenize("/* \n this \n is \n comment */ \nthisremains") == [Token(loc=Source_location("tester", 5, 1), type="identifier", text="thisremains"), Token(loc=L, type="end", text="ending")]
\ No newline at end of file
+    assert tokenize("/* \n this \n is \n comment */ \nthisremains") == [Token(loc=Source_location("tester", 5, 1), type="identifier", text="thisremains"), Token(loc=L, type="end", text="ending")]
+
+def test_stream_matches_tokenize_across_chunk_boundaries() -> None:
+    source = "var abc = 123 <= 45; // line comment\n/* multi\n line */ while x do { f(x, 7) }\n# end"
+    expected = tokenize(source)
+    for chunk_size in [1, 2, 3, 7, 64]:
+        streamed = list(Tokenizer.stream(io.StringIO(source), chunk_size=chunk_size))
+        assert [(t.type, t.text, t.loc.line, t.loc.column) for t in streamed] == [(t.type, t.text, t.loc.line, t.loc.column) for t in expected]
+
+def test_stream_decodes_bytes_and_mmap() -> None:
+    source = "/* äö */ x = 1;\nprint_int(x)"
+    expected = [(t.type, t.text, t.loc.line) for t in tokenize(source)]
+    streamed = Tokenizer.stream(io.BytesIO(source.encode()), chunk_size=3)
+    assert [(t.type, t.text, t.loc.line) for t in streamed] == expected
+    with tempfile.TemporaryFile() as f:
+        f.write(source.encode())
+        f.flush()
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            assert [(t.type, t.text, t.loc.line) for t in Tokenizer.stream(mapped, chunk_size=5)] == expected
+
+def test_compact_buffer_matches_tokenize() -> None:
+    source = "var abc = 123 <= 45; // line comment\n/* multi\n line */ while x do {\n\tf(x, 7) }\n# end"
+    expected = tokenize(source)
+    buffer = Tokenizer.tokenize_compact(source)
+    assert len(buffer) == len(expected)
+    assert list(buffer) == expected
+    assert [buffer.location(i) for i in range(len(buffer))] == [t.loc for t in expected]
+    assert buffer[-1].type == "end" and buffer[-1].text == "ending"
+
+def assert_relex_matches_full(source: str, offset: int, deleted: int, inserted: str) -> None:
+    relexed = Tokenizer.relex(Tokenizer.tokenize_compact(source), offset, deleted, inserted)
+    full = Tokenizer.tokenize_compact(source[:offset] + inserted + source[offset + deleted:])
+    assert (relexed.kinds, relexed.starts, relexed.lengths, relexed.line_starts) == (full.kinds, full.starts, full.lengths, full.line_starts)
+
+def test_relex_edits() -> None:
+    source = "var abc = 1;\nwhile abc < 10 do {\n  abc = abc + 1 // step\n};\nprint_int(abc) /* x"
+    assert_relex_matches_full(source, 7, 0, "d")
+    assert_relex_matches_full(source, 4, 3, "a")
+    assert_relex_matches_full(source, 12, 1, "")
+    assert_relex_matches_full(source, 38, 1, "\n")
+    assert_relex_matches_full(source, 48, 1, " ")
+    assert_relex_matches_full(source, len(source), 0, "*/ 1")
+    assert_relex_matches_full(source, 0, 0, "/*")
+    assert_relex_matches_full(source, 0, len(source), "")
+
+def test_relex_random_edits() -> None:
+    rng = random.Random(0)
+    pieces = ["/*", "*/", "//", "\n", "a", "12", " ", "x = 3;", "#", "{", "<", "="]
+    source = "var x = 1; /* a */ if x <= 2 then {\n f(x) } # c\nwhile x do x = x - 1"
+    buffer = Tokenizer.tokenize_compact(source)
+    for _ in range(300):
+        offset = rng.randint(0, len(source))
+        deleted = rng.randint(0, min(4, len(source) - offset))
+        inserted = "".join(rng.choice(pieces) for _ in range(rng.randint(0, 2)))
+        buffer = Tokenizer.relex(buffer, offset, deleted, inserted)
+        source = source[:offset] + inserted + source[offset + deleted:]
+        full = Tokenizer.tokenize_compact(source)
+        assert (buffer.kinds, buffer.starts, buffer.lengths, buffer.line_starts) == (full.kinds, full.starts, full.lengths, full.line_starts)
@@ -1,5 +1,6 @@
 from compiler.tokenizer import Tokenizer
 from compiler.parser import Parser
+from compiler.stack_parser import StackParser
 from compiler.typechecker import typechecker
 from compiler.objects.node_types import Int, Bool, Unit, Type, FunType
 from compiler.objects.sym_table import SymTab
@@ -75,4 +76,10 @@ def test_typechecker_block3() -> None:
 def test_typechecker_while() -> None:
     tokens = Tokenizer.tokenize("while true do 1")
     parsed = Parser.parse(tokens)
-    assert typechecker(parsed) == Unit
\ No newline at end of file
+    assert typechecker(parsed) == Unit
+
+def test_typechecker_deep_trees() -> None:
+    parsed = Parser.parse(Tokenizer.tokenize("1" + " + 1" * 100000))
+    assert typechecker(parsed) == Int
+    parsed = StackParser.parse(Tokenizer.tokenize("var x = true; " + "{ var y = 1; " * 30000 + "x" + " }" * 30000))
+    assert typechecker(parsed) == Bool